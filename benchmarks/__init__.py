@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Benchmarks embed and probe throwaway videos: keep them out of the media
+# probe index of the working directory (src/utils/media_probe.py)
+os.environ.setdefault(
+    "MEDIA_PROBE_INDEX",
+    os.path.join(tempfile.gettempdir(), "benchmarks_media_probe.json"),
+)
@@ -0,0 +1,161 @@
+"""
+Clip-level search vs video-scope search: latency and result quality.
+
+Builds a Milvus Lite collection (FLAT index) of synthetic videos, each made
+of a few scenes: clip vectors are noisy copies of their scene's vector, and the
+video vector is the normalized mean of its clips, like a whole-video
+embedding. Each query is a noisy copy of one clip ("find this moment"), so
+the video that contains it is the right answer and that clip the right
+time range. Reports recall@k and MRR of that video, how often the best
+returned range of that video is the queried clip, and search latency, for
+the client-side aggregation and for Milvus grouping (group_by).
+
+    python -m benchmarks.bench_clip_search --videos 2000 --queries 200 --k 10
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from loguru import logger
+
+from src.milvus import VIDEO_SCALAR_FIELDS, IndexSpec, MilvusDatabase
+from src.model import MultimodalEmbeddingModel
+from src.schemas.input import TaskInput
+
+COLLECTION = "video_embedding"
+CLIP_SEC = 6.0
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def make_rows(rng: np.random.Generator, n_videos: int, dim: int, noise: float):
+    """Rows of the video collection and the (video, clip) of every clip."""
+    rows, clips = [], []
+    for v in range(n_videos):
+        video = f"video_{v}.mp4"
+        scenes = normalize(rng.normal(size=(rng.integers(2, 6), dim)))
+        n_clips = int(rng.integers(4, 21))
+        scene_of_clip = np.sort(rng.integers(0, len(scenes), n_clips))
+        vectors = normalize(
+            scenes[scene_of_clip] + noise * rng.normal(size=(n_clips, dim)) / dim**0.5
+        )
+        for c, vector in enumerate(vectors):
+            rows.append({
+                "video": video,
+                "embedding_scope": "clip",
+                "embeddings_float": vector.tolist(),
+                "start_offset_sec": CLIP_SEC * c,
+                "end_offset_sec": CLIP_SEC * (c + 1),
+            })
+            clips.append((video, c, vector))
+        rows.append({
+            "video": video,
+            "embedding_scope": "video",
+            "embeddings_float": normalize(vectors.mean(axis=0)).tolist(),
+            "start_offset_sec": 0.0,
+            "end_offset_sec": CLIP_SEC * n_clips,
+        })
+    return rows, clips
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--noise", type=float, default=2.0)
+    parser.add_argument("--top-m", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        milvus = MilvusDatabase(os.path.join(tmp, "clips.db"))
+        milvus.create_collection(
+            COLLECTION,
+            IndexSpec("FLAT"),  # exact search: only the scoring differs
+            dimension=args.dim,
+            scalar_fields=VIDEO_SCALAR_FIELDS,
+            partition_by_scope=True,
+        )
+        rows, clips = make_rows(rng, args.videos, args.dim, args.noise)
+        for i in range(0, len(rows), 5000):
+            milvus.insert(COLLECTION, rows[i : i + 5000])
+        milvus.milvus_client.flush(COLLECTION)
+
+        queries = []
+        for i in rng.choice(len(clips), args.queries, replace=False):
+            video, clip, vector = clips[i]
+            query = normalize(
+                vector + args.noise * rng.normal(size=args.dim) / args.dim**0.5
+            )
+            queries.append((video, clip, query.astype(np.float32)))
+
+        model = MultimodalEmbeddingModel(client=object())
+        modes = {
+            "video scope": lambda input: model.retrieve_similarity_from_milvus(
+                input, milvus, COLLECTION, "", limit=args.k
+            ),
+        }
+        for group_by in [False, True]:
+            for aggregation in ["max", "mean", "top_m"]:
+                label = f"clips, {aggregation}" + (", group_by" if group_by else "")
+                modes[label] = (
+                    lambda input, aggregation=aggregation, group_by=group_by: (
+                        model.retrieve_clips_from_milvus(
+                            input,
+                            milvus,
+                            COLLECTION,
+                            limit=args.k,
+                            aggregation=aggregation,
+                            top_m=args.top_m,
+                            group_by=group_by,
+                        )
+                    )
+                )
+
+        print(
+            f"{args.videos} videos, {len(clips)} clips, dim {args.dim}, "
+            f"{args.queries} queries, k={args.k}"
+        )
+        print(
+            f"{'':<24}{'recall@k':>10}{'MRR':>8}{'range hit':>11}"
+            f"{'p50 ms':>9}{'p95 ms':>9}"
+        )
+        for label, search in modes.items():
+            search(TaskInput(video="warm-up", video_embedding=queries[0][2]))
+            found, reciprocal_ranks, range_hits, latencies = 0, [], 0, []
+            for video, clip, query in queries:
+                input = TaskInput(video="query", video_embedding=query)
+                start = time.perf_counter()
+                output = search(input)
+                latencies.append(time.perf_counter() - start)
+
+                rank = output.videos.index(video) if video in output.videos else None
+                reciprocal_ranks.append(0.0 if rank is None else 1 / (rank + 1))
+                if rank is None:
+                    continue
+                found += 1
+                segments = getattr(output, "segments", None)
+                if segments and segments[rank][0].start_offset_sec == CLIP_SEC * clip:
+                    range_hits += 1
+
+            latencies.sort()
+            range_hit = (
+                f"{range_hits / len(queries):11.2f}"
+                if "clips" in label
+                else f"{'-':>11}"
+            )
+            print(
+                f"{label:<24}{found / len(queries):10.2f}"
+                f"{statistics.mean(reciprocal_ranks):8.3f}{range_hit}"
+                f"{statistics.median(latencies) * 1000:9.1f}"
+                f"{latencies[int(0.95 * (len(latencies) - 1))] * 1000:9.1f}"
+            )
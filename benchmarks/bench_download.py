@@ -0,0 +1,135 @@
+"""
+Compare the old per-request download loop with the pooled download client.
+
+Serves a throwaway folder with the file server (production mode) and fetches
+a batch of small videos plus one large one, first like the original
+download_file (new connection per file, 8 KiB chunks), then with
+download_file (shared keep-alive session, large chunks, parallel ranges for
+the large file). Also kills a download halfway and resumes it.
+
+    python -m benchmarks.bench_download --small 40 --small-mb 2 --large-mb 256
+"""
+
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+from loguru import logger
+
+from benchmarks.bench_file_server import free_port, start_server
+from src.fastapi.client_example import DownloadProgress, download_file
+
+
+def legacy_download(uri: str, filename: str, local_path: str):
+    response = requests.get(f"{uri}/files/{filename}", stream=True)
+    with open(local_path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            if chunk:
+                f.write(chunk)
+
+
+def digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def interrupt_download(uri: str, filename: str, local_path: str) -> int:
+    """Start download_file in a child process and SIGKILL it halfway through."""
+    command = [
+        sys.executable,
+        "-c",
+        "from src.fastapi.client_example import download_file; "
+        f"download_file({uri!r}, {filename!r}, {local_path!r})",
+    ]
+    child = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while child.poll() is None:
+            progress = DownloadProgress.load(f"{local_path}.progress")
+            written = progress and progress.total - progress.missing_bytes
+            if written and written * 2 >= progress.total:
+                child.kill()
+                break
+            time.sleep(0.005)
+    finally:
+        child.kill()
+        child.wait()
+    progress = DownloadProgress.load(f"{local_path}.progress")
+    if progress is None:
+        raise RuntimeError("The download finished before it could be interrupted")
+    return progress.total - progress.missing_bytes
+
+
+def timed(fn, files, uri: str, out_dir: str) -> float:
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    for filename in files:
+        fn(uri, filename, os.path.join(out_dir, filename))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--small", type=int, default=40)
+    parser.add_argument("--small-mb", type=int, default=2)
+    parser.add_argument("--large-mb", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmp:
+        served = os.path.join(tmp, "served")
+        os.makedirs(served)
+        small = [f"small_{i}.mp4" for i in range(args.small)]
+        for filename in small:
+            with open(os.path.join(served, filename), "wb") as f:
+                f.write(os.urandom(args.small_mb * 1024 * 1024))
+        with open(os.path.join(served, "large.mp4"), "wb") as f:
+            for _ in range(args.large_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        port = free_port()
+        server = start_server("production", served, port, args.workers)
+        uri = f"http://127.0.0.1:{port}"
+        try:
+            results = {}
+            for name, fn in [("legacy", legacy_download), ("pooled", download_file)]:
+                out_dir = os.path.join(tmp, name)
+                results[name] = (
+                    timed(fn, small, uri, out_dir),
+                    timed(fn, ["large.mp4"], uri, out_dir),
+                )
+                for filename in small + ["large.mp4"]:
+                    assert digest(os.path.join(out_dir, filename)) == digest(
+                        os.path.join(served, filename)
+                    ), filename
+
+            # Kill a real download once half of the file is on disk, then
+            # resume it from its .etag/.progress sidecars
+            resumed_path = os.path.join(tmp, "resumed.mp4")
+            interrupted_at = interrupt_download(uri, "large.mp4", resumed_path)
+            start = time.perf_counter()
+            download_file(uri, "large.mp4", resumed_path)
+            resumed = time.perf_counter() - start
+            assert digest(resumed_path) == digest(os.path.join(served, "large.mp4"))
+        finally:
+            server.terminate()
+            server.wait()
+
+    small_mb = args.small * args.small_mb
+    print(f"small={args.small}x{args.small_mb}MiB large={args.large_mb}MiB")
+    for name, (small_sec, large_sec) in results.items():
+        print(
+            f"{name:<7}: small {small_sec:6.2f}s ({small_mb / small_sec:7.1f} MiB/s) "
+            f"large {large_sec:6.2f}s ({args.large_mb / large_sec:7.1f} MiB/s)"
+        )
+    print(
+        f"resume : killed with {interrupted_at / 1024**2:.0f}MiB written, "
+        f"rest of the large file in {resumed:6.2f}s"
+    )
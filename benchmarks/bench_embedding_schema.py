@@ -0,0 +1,117 @@
+"""
+Validation and serialization cost of List[float] vs float32 embedding fields.
+
+Builds the RetrievalOutput of one retrieval (k videos with 1024-d vectors)
+from Milvus-style float lists, dumps it as the app does, and round-trips it
+through JSON, once with the previous List[float] schema and once with the
+array-backed Embedding type.
+
+    python -m benchmarks.bench_embedding_schema --k 30 --repeat 200
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from src.schemas.output import RetrievalOutput
+from src.schemas.vector import Embedding
+
+
+class ListRetrievalOutput(BaseModel):
+    """RetrievalOutput as it was before the Embedding type."""
+
+    videos: List[str] = Field(default_factory=list)
+    text_list: List[str] = Field(default=[])
+    video_embeddings: List[List[float]] = Field(default_factory=list)
+    distances: List[float] = Field(default_factory=list)
+    milvus_uri: str
+
+
+class ListVideoAttributes(BaseModel):
+    video_path: str
+    video_embedding: List[float]
+
+
+class VideoAttributes(BaseModel):
+    video_path: str
+    video_embedding: Embedding
+
+
+def per_call_ms(fn: Callable, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--k", type=int, default=30)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    # What pymilvus hands back: plain Python floats
+    results = {
+        "videos": [f"video_{i}.mp4" for i in range(args.k)],
+        "video_embeddings": [
+            [random.random() for _ in range(args.dim)] for _ in range(args.k)
+        ],
+        "distances": [random.random() for _ in range(args.k)],
+        "milvus_uri": "http://localhost:19530",
+    }
+    # What a caller already holding vectors (session store, cache) passes in
+    arrays = dict(
+        results,
+        video_embeddings=[
+            np.asarray(v, dtype=np.float32) for v in results["video_embeddings"]
+        ],
+    )
+
+    print(f"k={args.k} dim={args.dim}, ms per retrieval")
+    print(f"{'':<22}{'List[float]':>12}{'Embedding':>12}")
+    rows = []
+    for name, schema, attributes in [
+        ("list", ListRetrievalOutput, ListVideoAttributes),
+        ("array", RetrievalOutput, VideoAttributes),
+    ]:
+        output = schema(**results)
+        dumped_json = output.model_dump_json()
+
+        def retrieval():
+            # Milvus results -> RetrievalOutput -> one VideoAttributes per video
+            # -> dumped into the UI state, as the distributed app does
+            retrieved = schema(**results)
+            return [
+                attributes(video_path=video, video_embedding=embedding).model_dump()
+                for video, embedding in zip(
+                    retrieved.videos, retrieved.video_embeddings
+                )
+            ]
+
+        rows.append([
+            per_call_ms(lambda: schema(**results), args.repeat),
+            per_call_ms(
+                lambda: schema(**(arrays if name == "array" else results)), args.repeat
+            ),
+            per_call_ms(output.model_dump, args.repeat),
+            per_call_ms(output.model_dump_json, args.repeat),
+            per_call_ms(lambda: schema.model_validate_json(dumped_json), args.repeat),
+            per_call_ms(retrieval, args.repeat),
+            len(dumped_json) / 1024,
+        ])
+    labels = [
+        "validate from lists",
+        "validate from arrays",
+        "model_dump",
+        "model_dump_json",
+        "model_validate_json",
+        "whole retrieval",
+        "JSON size (KiB)",
+    ]
+    for label, before, after in zip(labels, *rows):
+        print(f"{label:<22}{before:12.3f}{after:12.3f}")
@@ -0,0 +1,135 @@
+"""
+Concurrent byte-range reads against the video file server.
+
+Starts the file server on a throwaway directory, once on the threaded
+Werkzeug server and once in production mode (gunicorn + sendfile), and
+hammers both with random Range requests from several client threads. Every
+response is checked against the file on disk.
+
+    python -m benchmarks.bench_file_server --size-mb 64 --range-kb 1024 --clients 16
+"""
+
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import requests
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, base_dir: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, FILE_SERVER_BASE_DIR=base_dir)
+    if mode == "werkzeug":
+        command = [
+            sys.executable,
+            "-c",
+            "from src.fastapi.server.file_server import app; "
+            f"app.run(host='127.0.0.1', port={port}, threaded=True)",
+        ]
+    else:
+        command = [
+            sys.executable,
+            "-m",
+            "src.fastapi.server.file_server",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+        ]
+    server = subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"{mode} file server did not start")
+
+
+def check_conditional(url: str):
+    full = requests.get(url)
+    assert full.headers.get("Accept-Ranges") == "bytes", full.headers
+    not_modified = requests.get(url, headers={"If-None-Match": full.headers["ETag"]})
+    assert not_modified.status_code == 304, not_modified.status_code
+    since = requests.get(
+        url, headers={"If-Modified-Since": full.headers["Last-Modified"]}
+    )
+    assert since.status_code == 304, since.status_code
+
+
+def run_clients(url: str, data: bytes, range_size: int, clients: int, requests_each):
+    def client(seed: int) -> List[float]:
+        rng = random.Random(seed)
+        latencies = []
+        with requests.Session() as session:
+            for _ in range(requests_each):
+                start = rng.randrange(0, len(data) - range_size)
+                end = start + range_size - 1
+                t0 = time.perf_counter()
+                response = session.get(url, headers={"Range": f"bytes={start}-{end}"})
+                latencies.append(time.perf_counter() - t0)
+                assert response.status_code == 206, response.status_code
+                assert response.content == data[start : end + 1]
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = sorted(sum(executor.map(client, range(clients)), []))
+    return time.perf_counter() - start, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--range-kb", type=int, default=1024)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="per client")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    range_size = args.range_kb * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.urandom(args.size_mb * 1024 * 1024)
+        with open(os.path.join(tmp, "bench.mp4"), "wb") as file:
+            file.write(data)
+
+        print(
+            f"file={args.size_mb}MiB range={args.range_kb}KiB "
+            f"clients={args.clients} requests={args.clients * args.requests}"
+        )
+        for mode in ["werkzeug", "production"]:
+            port = free_port()
+            server = start_server(mode, tmp, port, args.workers)
+            try:
+                url = f"http://127.0.0.1:{port}/files/bench.mp4"
+                check_conditional(url)
+                elapsed, latencies = run_clients(
+                    url, data, range_size, args.clients, args.requests
+                )
+            finally:
+                server.terminate()
+                server.wait()
+
+            n = len(latencies)
+            print(
+                f"{mode:<10} : {n / elapsed:7.1f} req/s "
+                f"{n * range_size / elapsed / 1024**2:8.1f} MiB/s "
+                f"p50={latencies[n // 2] * 1000:.1f}ms "
+                f"p99={latencies[min(n - 1, int(n * 0.99))] * 1000:.1f}ms"
+            )
@@ -0,0 +1,93 @@
+"""
+Latency of the hybrid (video + text) search, sequential vs parallel.
+
+Builds a Milvus Lite database with FakeTwelveLabs embeddings and runs
+`retrieve_hybrid_from_milvus` with a single search worker (the video and
+text searches run one after the other, as before) and with the default
+pool (side by side). `--rtt` adds a simulated network round trip to every
+Milvus call, as with a remote Milvus server.
+
+    python -m benchmarks.bench_hybrid --videos 200 --queries 100 --rtt 20
+"""
+
+import argparse
+import functools
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from benchmarks.bench_ingest import make_items, new_milvus, run_sequential
+from benchmarks.fake_twelvelabs import FakeTwelveLabs
+from src.model import MultimodalEmbeddingModel
+from src.schemas.input import TaskInput
+
+
+def add_round_trip(client, rtt_sec: float):
+    def slow(method):
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            time.sleep(rtt_sec)
+            return method(*args, **kwargs)
+
+        return call
+
+    for name in ["search", "query"]:
+        setattr(client, name, slow(getattr(client, name)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rtt", type=float, default=20, help="milliseconds")
+    args = parser.parse_args()
+
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmp:
+        model = MultimodalEmbeddingModel(
+            client=FakeTwelveLabs(latency_sec=0, upload_sec=0, text_latency_sec=0)
+        )
+        milvus = new_milvus(tmp, "hybrid")
+        items = make_items(tmp, args.videos)
+        run_sequential(model, milvus, items)
+        milvus.milvus_client.flush("video_embedding")
+        milvus.milvus_client.flush("text_embedding")
+
+        seeds = [path for _, path in items[: args.queries]]
+        print(
+            f"{args.videos} videos, {len(seeds)} queries, k={args.k}, median ms "
+            f"(p95 ms)"
+        )
+        print(f"{'':<12}{'rtt 0 ms':>18}{f'rtt {args.rtt:g} ms':>18}")
+        rows = {}
+        for rtt in [0, args.rtt]:
+            if rtt:
+                add_round_trip(milvus.milvus_client, rtt / 1000)
+            for label, workers in [("sequential", 1), ("parallel", 8)]:
+                model.search_executor = ThreadPoolExecutor(max_workers=workers)
+                latencies = []
+                for i, seed in enumerate(seeds):
+                    # Every other query searches the seed's stored description
+                    text = f"video {(i * 7) % args.videos}" if i % 2 else None
+                    input = TaskInput(video=seed, text=text)
+                    model.seed_vector_cache.clear()
+                    start = time.perf_counter()
+                    model.retrieve_hybrid_from_milvus(
+                        input,
+                        milvus,
+                        "video_embedding",
+                        "text_embedding",
+                        limit=args.k,
+                    )
+                    latencies.append(time.perf_counter() - start)
+                latencies.sort()
+                rows.setdefault(label, []).append(
+                    f"{statistics.median(latencies) * 1000:.1f} "
+                    f"({latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f})"
+                )
+        for label, cells in rows.items():
+            print(f"{label:<12}" + "".join(f"{cell:>18}" for cell in cells))
@@ -0,0 +1,178 @@
+"""
+Load test of the retrieval service: latency percentiles and throughput at
+increasing concurrency.
+
+Builds a Milvus Lite database and feed snapshot, starts
+`src.fastapi.server.retrieval_server` on it and sends /retrieve requests for
+the feed videos from `concurrency` clients at once, with JSON and binary
+responses. The service runs once with a single request thread, which serves
+requests one at a time like a Gradio event handler with the default
+concurrency_limit=1, and once with the default pool. `--rtt` adds a
+simulated network round trip to every Milvus call, as with a remote Milvus
+server.
+
+    python -m benchmarks.bench_retrieval_server --videos 200 --requests 400 --rtt 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.bench_startup import build_fixture
+from src.schemas.frame import FRAME_MEDIA_TYPE, decode_frame
+from src.schemas.output import DistributedRetrievalOutput, FeedOutput
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = """
+import runpy, sys
+from benchmarks.bench_hybrid import add_round_trip
+from src import distributed_backend as backend
+if {rtt_sec}:
+    for milvus in backend.milvus_instances:
+        add_round_trip(milvus.milvus_client, {rtt_sec})
+sys.argv = ["retrieval_server", "--port", "{port}"]
+runpy.run_module("src.fastapi.server.retrieval_server", run_name="__main__")
+"""
+
+
+def start_server(env: dict, port: int, threads: int, rtt_sec: float, log_path: str):
+    log = open(log_path, "w")
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(rtt_sec=rtt_sec, port=port)],
+        cwd=ROOT,
+        env=dict(env, RETRIEVAL_SERVER_THREADS=str(threads)),
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited:\n{open(log_path).read()[-2000:]}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Server did not start")
+
+
+async def load(
+    base_url: str, bodies: List[dict], n_requests: int, concurrency: int, binary: bool
+):
+    """Latencies of `n_requests` /retrieve calls from `concurrency` clients."""
+    headers = {"Accept": FRAME_MEDIA_TYPE if binary else "application/json"}
+    latencies: List[float] = []
+    sent = 0
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal sent
+        while sent < n_requests:
+            body = bodies[sent % len(bodies)]
+            sent += 1
+            start = time.perf_counter()
+            response = await http.post("/retrieve", json=body, headers=headers)
+            response.raise_for_status()
+            if binary:
+                output = DistributedRetrievalOutput.model_validate(
+                    decode_frame(response.content)
+                )
+            else:
+                output = DistributedRetrievalOutput.model_validate_json(
+                    response.content
+                )
+            assert output.videos, "empty result"
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return sorted(latencies), elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--port", type=int, default=5699)
+    parser.add_argument("--rtt", type=float, default=0, help="milliseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup = multiprocessing.get_context("spawn").Process(
+            target=build_fixture, args=(tmp, args.videos)
+        )
+        setup.start()
+        setup.join()
+
+        db_url = os.path.join(tmp, "startup.db")
+        env = dict(
+            os.environ,
+            DB_URL=db_url,
+            DB_URLs=db_url,
+            FEED_SNAPSHOT_PATH=os.path.join(tmp, "feed_snapshot.bin"),
+            FEED_SNAPSHOT_REFRESH_SEC="0",
+            REPLICA_CACHE_INDEX=os.path.join(tmp, "replica_cache.json"),
+            TWELVE_LABS_API_KEY=os.environ.get("TWELVE_LABS_API_KEY") or "dummy",
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+
+        print(
+            f"{args.videos} videos, {args.requests} requests per row, k={args.k}, "
+            f"Milvus rtt {args.rtt:g} ms, {os.cpu_count()} CPUs"
+        )
+        print(
+            f"{'threads':>8}{'format':>8}{'clients':>9}{'p50 ms':>9}{'p99 ms':>9}"
+            f"{'req/s':>8}"
+        )
+        for threads in [1, 32]:
+            server = start_server(
+                env,
+                args.port,
+                threads,
+                args.rtt / 1000,
+                os.path.join(tmp, "server.log"),
+            )
+            try:
+                feed = FeedOutput.model_validate_json(
+                    httpx.get(f"{base_url}/feed?n={args.videos}", timeout=60).content
+                )
+                bodies = [
+                    {
+                        "video_path": v.video_path,
+                        "video_embedding": v.model_dump(mode="json")["video_embedding"],
+                        "k": args.k,
+                    }
+                    for v in feed.videos
+                    if v is not None
+                ]
+                for binary in [False, True]:
+                    asyncio.run(load(base_url, bodies, 20, 1, binary))  # warm-up
+                    for concurrency in args.concurrency:
+                        latencies, elapsed = asyncio.run(
+                            load(base_url, bodies, args.requests, concurrency, binary)
+                        )
+                        print(
+                            f"{threads:>8}{'binary' if binary else 'json':>8}"
+                            f"{concurrency:>9}"
+                            f"{statistics.median(latencies) * 1000:9.1f}"
+                            f"{latencies[int(0.99 * (len(latencies) - 1))] * 1000:9.1f}"
+                            f"{len(latencies) / elapsed:8.0f}"
+                        )
+            finally:
+                server.terminate()
+                server.wait()
@@ -0,0 +1,129 @@
+"""
+Throughput of concurrent similarity searches, with and without micro-batching.
+
+Builds a Milvus Lite collection of random video vectors and runs
+`retrieve_similarity_from_milvus` from `concurrency` threads at once, each
+with its own seed, first with one Milvus search per request and then through
+a MilvusSearchBatcher that merges concurrent searches into multi-vector
+requests. `--rtt` adds a simulated network round trip to every Milvus call,
+as with a remote Milvus server.
+
+    python -m benchmarks.bench_search_batching --videos 5000 --requests 800 --rtt 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+from benchmarks.bench_hybrid import add_round_trip
+from src.milvus import VIDEO_SCALAR_FIELDS, IndexSpec, MilvusDatabase
+from src.model import MultimodalEmbeddingModel
+from src.schemas.input import TaskInput
+
+COLLECTION = "video_embedding"
+
+
+def run(model, milvus, seeds, n_requests: int, concurrency: int, k: int):
+    """Latencies and elapsed time of `n_requests` searches from `concurrency` threads."""
+
+    def search(i: int) -> float:
+        video, vector = seeds[i % len(seeds)]
+        start = time.perf_counter()
+        output = model.retrieve_similarity_from_milvus(
+            TaskInput(video=video, video_embedding=vector),
+            milvus,
+            COLLECTION,
+            "",
+            limit=k,
+        )
+        assert len(output.videos) == k and video not in output.videos
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        latencies = sorted(executor.map(search, range(n_requests)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--requests", type=int, default=800)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--rtt", type=float, default=0, help="milliseconds")
+    args = parser.parse_args()
+
+    logger.remove()
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        milvus = MilvusDatabase(os.path.join(tmp, "batching.db"))
+        milvus.create_collection(
+            COLLECTION,
+            IndexSpec("FLAT"),
+            dimension=args.dim,
+            scalar_fields=VIDEO_SCALAR_FIELDS,
+            partition_by_scope=True,
+        )
+        vectors = rng.normal(size=(args.videos, args.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        rows = [
+            {
+                "video": f"video_{i}.mp4",
+                "embedding_scope": "video",
+                "embeddings_float": vector.tolist(),
+                "start_offset_sec": 0.0,
+                "end_offset_sec": 10.0,
+            }
+            for i, vector in enumerate(vectors)
+        ]
+        for i in range(0, len(rows), 5000):
+            milvus.insert(COLLECTION, rows[i : i + 5000])
+        milvus.milvus_client.flush(COLLECTION)
+        if args.rtt:
+            add_round_trip(milvus.milvus_client, args.rtt / 1000)
+
+        model = MultimodalEmbeddingModel(client=object())
+        seeds = [(f"video_{i}.mp4", vectors[i]) for i in range(min(args.videos, 1000))]
+        run(model, milvus, seeds, 20, 1, args.k)  # warm-up
+
+        print(
+            f"{args.videos} videos, dim {args.dim}, FLAT, k={args.k}, "
+            f"{args.requests} requests per row, window {args.window_ms:g} ms, "
+            f"max batch {args.max_batch}, Milvus rtt {args.rtt:g} ms, "
+            f"{os.cpu_count()} CPUs"
+        )
+        print(
+            f"{'':<12}{'threads':>8}{'QPS':>8}{'p50 ms':>9}{'p99 ms':>9}"
+            f"{'batch size':>12}"
+        )
+        for concurrency in args.concurrency:
+            for label in ["unbatched", "batched"]:
+                milvus.enable_search_batching(
+                    args.window_ms if label == "batched" else 0, args.max_batch
+                )
+                latencies, elapsed = run(
+                    model, milvus, seeds, args.requests, concurrency, args.k
+                )
+                batcher = milvus.search_batcher
+                batch_size = (
+                    f"{batcher.total_searches / batcher.total_batches:12.1f}"
+                    if batcher
+                    else f"{1:12.1f}"
+                )
+                print(
+                    f"{label:<12}{concurrency:>8}{len(latencies) / elapsed:8.0f}"
+                    f"{statistics.median(latencies) * 1000:9.1f}"
+                    f"{latencies[int(0.99 * (len(latencies) - 1))] * 1000:9.1f}"
+                    f"{batch_size}"
+                )
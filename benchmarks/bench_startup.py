@@ -0,0 +1,111 @@
+"""
+Startup time of the serve-only distributed app.
+
+Builds a small Milvus Lite database and home feed snapshot, then starts
+`gradio_main_distributed` in fresh interpreters and times import + init().
+"lazy" is the normal serve-only path; "eager" additionally creates the
+TwelveLabs client, opens every Milvus connection and imports cv2/ffmpeg right
+away, as the app used to at import time. The first retrieval is timed too,
+since that is where the lazy path pays for its Milvus connection.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from loguru import logger
+
+from benchmarks.bench_ingest import make_items, new_milvus, run_sequential
+from benchmarks.fake_twelvelabs import FakeTwelveLabs
+from src.feed_snapshot import build_feed_snapshot
+from src.model import MultimodalEmbeddingModel
+
+HEAVY_MODULES = ["pymilvus", "twelvelabs", "cv2", "ffmpeg"]
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import gradio_main_distributed as app
+if {eager}:
+    app.model.video_embedding_model.twelvelabs_client
+    app.model.text_embedding_model.twelvelabs_client
+    for milvus in app.milvus_instances:
+        milvus.milvus_client
+    import cv2, ffmpeg
+feed = app.init(5)
+ready = time.perf_counter()
+modules = [m for m in {modules} if m in sys.modules]
+app.retrieve(feed[0].video_path, feed[0].video_embedding, k=4)
+first_retrieval = time.perf_counter()
+print(json.dumps({{
+    "startup": ready - start,
+    "first_retrieval": first_retrieval - ready,
+    "modules": modules,
+}}))
+"""
+
+
+def build_fixture(folder: str, n_videos: int):
+    """Database and feed snapshot; run in a child so its Lite lock is released."""
+    logger.remove()
+    milvus = new_milvus(folder, "startup")
+    model = MultimodalEmbeddingModel(client=FakeTwelveLabs(latency_sec=0))
+    run_sequential(model, milvus, make_items(folder, n_videos))
+    milvus.milvus_client.flush("video_embedding")
+    snapshot = build_feed_snapshot([milvus], "video_embedding")
+    snapshot.save(os.path.join(folder, "feed_snapshot.bin"))
+
+
+def run_app(eager: bool, env: dict) -> dict:
+    code = CHILD.format(eager=eager, modules=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"App failed to start:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--videos", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup = multiprocessing.get_context("spawn").Process(
+            target=build_fixture, args=(tmp, args.videos)
+        )
+        setup.start()
+        setup.join()
+
+        snapshot_path = os.path.join(tmp, "feed_snapshot.bin")
+        db_url = os.path.join(tmp, "startup.db")
+        env = dict(
+            os.environ,
+            DB_URL=db_url,
+            DB_URLs=db_url,
+            FEED_SNAPSHOT_PATH=snapshot_path,
+            FEED_SNAPSHOT_REFRESH_SEC="0",
+            REPLICA_CACHE_INDEX=os.path.join(tmp, "replica_cache.json"),
+            TWELVE_LABS_API_KEY=os.environ.get("TWELVE_LABS_API_KEY") or "dummy",
+        )
+
+        print(f"{args.runs} runs, median seconds")
+        print(f"{'':<8}{'startup':>10}{'first retrieval':>18}  modules at startup")
+        for mode in ["eager", "lazy"]:
+            runs = [run_app(mode == "eager", env) for _ in range(args.runs)]
+            startup = statistics.median(run["startup"] for run in runs)
+            first = statistics.median(run["first_retrieval"] for run in runs)
+            modules = ", ".join(runs[-1]["modules"]) or "-"
+            print(f"{mode:<8}{startup:10.3f}{first:18.3f}  {modules}")
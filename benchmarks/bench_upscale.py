@@ -0,0 +1,121 @@
+"""
+Frames/sec of the ffmpeg upscaler vs the previous OpenCV frame loop.
+
+Generates low-resolution test videos (with an audio track), upscales them
+with the per-frame cv2.VideoCapture -> cv2.resize -> mp4v loop the project
+used before, then with the single-process ffmpeg pipeline: with the same
+MPEG-4 Part 2 codec as the loop, with H.264 (the default), and with H.264
+across the preprocessing worker pool.
+
+    python -m benchmarks.bench_upscale --videos 4 --seconds 10 --size 320x180
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from loguru import logger
+
+from src.utils.media_probe import probe_media
+from src.utils.process_video import preprocess_videos, upscale_video_resolution
+
+
+def make_video(path: str, seconds: float, size: str, fps: int):
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc=duration={seconds}:size={size}:rate={fps}",
+            "-f", "lavfi", "-i", f"sine=duration={seconds}",
+            "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path,
+        ],
+        check=True,
+    )  # fmt: skip
+
+
+def opencv_upscale(video_path: str, output_path: str, min_side: int = 360):
+    """The previous implementation: decode, resize and re-encode in Python."""
+    import cv2
+
+    video = cv2.VideoCapture(video_path)
+    width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = video.get(cv2.CAP_PROP_FPS)
+    target_height = min_side
+    target_width = int(target_height * width / height)
+    out = cv2.VideoWriter(
+        output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (target_width, target_height)
+    )
+    while video.isOpened():
+        ret, frame = video.read()
+        if not ret:
+            break
+        out.write(
+            cv2.resize(
+                frame, (target_width, target_height), interpolation=cv2.INTER_LINEAR
+            )
+        )
+    video.release()
+    out.release()
+
+
+def describe(path: str) -> str:
+    info = probe_media(path)
+    return f"{info.width}x{info.height}, audio={info.audio_codec or 'none'}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--size", default="320x180")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmp:
+        videos = []
+        for i in range(args.videos):
+            path = os.path.join(tmp, f"video_{i}.mp4")
+            make_video(path, args.seconds, args.size, args.fps)
+            videos.append(path)
+        frames = sum(probe_media(video).frame_count for video in videos)
+
+        start = time.perf_counter()
+        for i, video in enumerate(videos):
+            opencv_upscale(video, os.path.join(tmp, f"opencv_{i}.mp4"))
+        opencv_sec = time.perf_counter() - start
+
+        ffmpeg_sec = {}
+        for vcodec in ["mpeg4", "libx264"]:
+            start = time.perf_counter()
+            for video in videos:
+                upscale_video_resolution(
+                    video, os.path.join(tmp, vcodec), vcodec=vcodec
+                )
+            ffmpeg_sec[vcodec] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        preprocess_videos(
+            videos,
+            max_workers=args.workers,
+            output_dir_relative=os.path.join(tmp, "pool"),
+        )
+        pool_sec = time.perf_counter() - start
+
+        print(
+            f"{args.videos} videos x {args.seconds:g}s at {args.size}, "
+            f"{frames} frames, {os.cpu_count()} CPUs"
+        )
+        print(f"{'':<32}{'frames/s':>10}{'seconds':>10}  output")
+        for label, seconds, output in [
+            ("opencv loop", opencv_sec, os.path.join(tmp, "opencv_0.mp4")),
+            ("ffmpeg mpeg4", ffmpeg_sec["mpeg4"], os.path.join(tmp, "mpeg4", "video_0.mp4")),
+            ("ffmpeg libx264", ffmpeg_sec["libx264"], os.path.join(tmp, "libx264", "video_0.mp4")),
+            (f"ffmpeg libx264, {args.workers} workers", pool_sec, os.path.join(tmp, "pool", "video_0.mp4")),
+        ]:  # fmt: skip
+            print(
+                f"{label:<32}{frames / seconds:10.0f}{seconds:10.2f}  {describe(output)}"
+            )
@@ -0,0 +1,114 @@
+"""
+In-process stand-in for the TwelveLabs client.
+
+It implements the subset of the SDK used by `src.models` (`embed.create` and
+`embed.task.create/status/retrieve`) and simulates upload and processing
+latency, so the ingest and retrieval code can be exercised without an API key.
+Embeddings are deterministic per video/text, which keeps cache and dedup
+behaviour realistic.
+"""
+
+import hashlib
+import itertools
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+DIMENSION = 1024
+
+
+def fake_vector(key: str, dimension: int = DIMENSION) -> List[float]:
+    rng = random.Random(hashlib.sha256(key.encode()).digest())
+    return [rng.uniform(-1, 1) for _ in range(dimension)]
+
+
+class _FakeTask(SimpleNamespace):
+    def wait_for_done(self, sleep_interval: float = 5.0, callback=None, **kwargs):
+        while self._resource.status(self.id).status not in ("ready", "failed"):
+            time.sleep(min(sleep_interval, self._resource.latency_sec))
+        self.status = self._resource.status(self.id).status
+        if callback is not None:
+            callback(self)
+        return self.status
+
+
+class _FakeTaskResource:
+    def __init__(self, latency_sec: float, upload_sec: float, clips_per_video: int):
+        self.latency_sec = latency_sec
+        self.upload_sec = upload_sec
+        self.clips_per_video = clips_per_video
+        self._ids = itertools.count()
+        self._tasks: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def create(self, model_name: str, video_file=None, video_url=None, **kwargs):
+        time.sleep(self.upload_sec)
+        with self._lock:
+            task_id = f"task-{next(self._ids)}"
+            self._tasks[task_id] = {
+                "video": str(video_file or video_url),
+                "ready_at": time.monotonic() + self.latency_sec,
+            }
+            self.created += 1
+        return _FakeTask(
+            _resource=self, id=task_id, model_name=model_name, status="processing"
+        )
+
+    def status(self, task_id: str):
+        ready = time.monotonic() >= self._tasks[task_id]["ready_at"]
+        return SimpleNamespace(id=task_id, status="ready" if ready else "processing")
+
+    def retrieve(self, task_id: str):
+        video = self._tasks[task_id]["video"]
+        segments = [
+            SimpleNamespace(
+                embeddings_float=fake_vector(f"{video}#clip{i}"),
+                start_offset_sec=6.0 * i,
+                end_offset_sec=6.0 * (i + 1),
+                embedding_scope="clip",
+            )
+            for i in range(self.clips_per_video)
+        ]
+        segments.append(
+            SimpleNamespace(
+                embeddings_float=fake_vector(video),
+                start_offset_sec=0.0,
+                end_offset_sec=6.0 * self.clips_per_video,
+                embedding_scope="video",
+            )
+        )
+        return SimpleNamespace(
+            id=task_id,
+            status="ready",
+            video_embedding=SimpleNamespace(segments=segments),
+        )
+
+
+class _FakeEmbed:
+    def __init__(self, task: _FakeTaskResource, text_latency_sec: float):
+        self.task = task
+        self.text_latency_sec = text_latency_sec
+        self.text_calls = 0
+
+    def create(self, model_name: str, text: str, **kwargs):
+        time.sleep(self.text_latency_sec)
+        self.text_calls += 1
+        segment = SimpleNamespace(embeddings_float=fake_vector(f"text:{text}"))
+        return SimpleNamespace(text_embedding=SimpleNamespace(segments=[segment]))
+
+
+class FakeTwelveLabs:
+    def __init__(
+        self,
+        latency_sec: float = 1.0,
+        upload_sec: float = 0.05,
+        text_latency_sec: float = 0.02,
+        clips_per_video: int = 3,
+    ):
+        self.embed = _FakeEmbed(
+            _FakeTaskResource(latency_sec, upload_sec, clips_per_video),
+            text_latency_sec,
+        )
@@ -1,22 +1,30 @@
 import json
 import os
 import random
-from itertools import chain
-from typing import Generator, Tuple
+from typing import Generator, List, Optional, Tuple
 
 import yaml  # Add YAML import
 from loguru import logger
 from tqdm import tqdm
 
-from src.milvus import MilvusDatabase, insert_task_output_to_milvus
+from src.ingest import EmbeddingIngestPipeline, IngestCheckpoint
+from src.milvus import (
+    TEXT_SCALAR_FIELDS,
+    VIDEO_SCALAR_FIELDS,
+    MilvusDatabase,
+    index_spec_from_env,
+)
 from src.model import MultimodalEmbeddingModel
+from src.models.embedding_cache import EmbeddingCache
 from src.schemas.base import VideoMetadata
-from src.schemas.input import TaskInput
+from src.utils.media_probe import media_probe
 
 VIDEO_FETCH_AND_TRIM_FOLDER_PATH = "video-fetch-and-trim"
 DB_URL = os.environ.get("DB_URL", "milvus_embedding.db")
 VIDEO_COLLECTION_NAME = os.environ.get("VIDEO_COLLECTION_NAME", "video_embedding")
 TEXT_COLLECTION_NAME = os.environ.get("TEXT_COLLECTION_NAME", "text_embedding")
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", 1 << 30))
 
 
 def load_config(config_path: str):
@@ -24,10 +32,7 @@ def load_config(config_path: str):
         return yaml.safe_load(file)
 
 
-def get_videos_and_descriptions(
-    config: dict,
-) -> Generator[Tuple[VideoMetadata, str], None, None]:
-    metadata_folder_path = os.path.join(config["base_dir"], config["metadata_path"])
+def list_video_files(config: dict) -> List[str]:
     videos_folder_path = os.path.join(config["base_dir"], config["videos_path"])
     video_files = [
         os.path.join(videos_folder_path, file)
@@ -38,6 +43,16 @@ def get_videos_and_descriptions(
     # [Note] hardcoded for testing -> remove later
     if os.environ.get("ENVIRONMENT") == "test":
         video_files = random.choices(video_files, k=min(10, len(video_files)))
+    return video_files
+
+
+def get_videos_and_descriptions(
+    config: dict,
+    video_files: Optional[List[str]] = None,
+) -> Generator[Tuple[VideoMetadata, str], None, None]:
+    metadata_folder_path = os.path.join(config["base_dir"], config["metadata_path"])
+    if video_files is None:
+        video_files = list_video_files(config)
 
     for video_file in tqdm(video_files):
         metadata_file_name = os.path.basename(video_file)
@@ -60,36 +75,48 @@ def get_videos_and_descriptions(
         )
 
 
-def main_build_database(milvus: MilvusDatabase, config: dict):
-    # Define embedding model
-    model = MultimodalEmbeddingModel()
+def main_build_database(
+    milvus: MilvusDatabase,
+    config: dict,
+    max_in_flight: int = 8,
+    checkpoint: Optional[IngestCheckpoint] = None,
+    probe_workers: Optional[int] = None,
+):
+    # Define embedding model. Embeddings are cached by video content, so a
+    # rebuild only pays for videos that were never embedded before.
+    embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES)
+    model = MultimodalEmbeddingModel(embedding_cache=embedding_cache)
 
     # Store data into vector database Milvus. The following code will create
     # milvus database in Lite version, create two collections named
     # "video_embedding" and "text_embedding to store embeddings"
 
-    # Define input data (video + description pairs).
-    loader_ = get_videos_and_descriptions(config)
-
-    for metadata, video_path in chain(loader_):
-        # Define input data (video + description pairs).
-        input_ = TaskInput(
-            video=video_path,
-            text=metadata["description"],
-        )
+    # Probe the videos to embed up front with a process pool (only the sample
+    # with ENVIRONMENT=test); the embedding tasks then read their durations
+    # from the probe index instead of running ffprobe
+    video_files = list_video_files(config)
+    media_probe.probe_many(video_files, probe_workers)
 
-        try:
-            # Calculate embeddings
-            output = model.generate_embedding(input_)
-        except Exception as e:
-            logger.info(f"Error processing video {video_path}: {e}")
-            continue
-
-        # Insert data into collections
-        insert_task_output_to_milvus(
-            milvus, output, VIDEO_COLLECTION_NAME, TEXT_COLLECTION_NAME
+    # Define input data (video + description pairs).
+    loader_ = get_videos_and_descriptions(config, video_files)
+
+    # Keep up to `max_in_flight` embedding tasks running and buffer the rows of
+    # each finished video; the write buffer inserts them in batches. Flushed
+    # videos are recorded in the checkpoint so an interrupted build resumes
+    # where it stopped.
+    with milvus.buffered_writer() as write_buffer:
+        pipeline = EmbeddingIngestPipeline(
+            model,
+            milvus,
+            VIDEO_COLLECTION_NAME,
+            TEXT_COLLECTION_NAME,
+            checkpoint=checkpoint,
+            max_in_flight=max_in_flight,
+            write_buffer=write_buffer,
         )
+        pipeline.run(loader_)
 
+    embedding_cache.log_stats()
     logger.info("Build database successfully")
 
 
@@ -109,19 +136,50 @@ if __name__ == "__main__":
         action="store_true",
         help="Rebuild the database by recreating collections.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of embedding tasks running at the same time.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default="build_database.checkpoint",
+        help="File recording finished videos, used to resume an interrupted build.",
+    )
+    parser.add_argument(
+        "--probe-workers",
+        type=int,
+        default=None,
+        help="Processes probing video metadata before embedding (default: CPU count).",
+    )
     args = parser.parse_args()
 
     config = load_config(args.config)
 
     milvus = MilvusDatabase(DB_URL)
+    index = index_spec_from_env()
+    checkpoint = IngestCheckpoint(args.checkpoint)
     if args.rebuild or not milvus.milvus_client.has_collection(
         collection_name=VIDEO_COLLECTION_NAME
     ):
-        milvus.create_collection(VIDEO_COLLECTION_NAME)
+        milvus.create_collection(
+            VIDEO_COLLECTION_NAME,
+            index,
+            scalar_fields=VIDEO_SCALAR_FIELDS,
+            partition_by_scope=True,
+        )
+        # A new collection holds no videos, so every video is embedded again
+        checkpoint.reset()
     if args.rebuild or not milvus.milvus_client.has_collection(
         collection_name=TEXT_COLLECTION_NAME
     ):
-        milvus.create_collection(TEXT_COLLECTION_NAME)
+        milvus.create_collection(
+            TEXT_COLLECTION_NAME, index, scalar_fields=TEXT_SCALAR_FIELDS
+        )
 
     logger.info(f"Building database with config: {config}")
-    main_build_database(milvus, config)
+    main_build_database(
+        milvus, config, args.concurrency, checkpoint, args.probe_workers
+    )
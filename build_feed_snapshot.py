@@ -0,0 +1,53 @@
+import os
+
+from loguru import logger
+
+from src.feed_snapshot import FeedSnapshot, build_feed_snapshot
+from src.milvus import MilvusDatabase
+
+# Same node list as gradio_main_distributed.py, or the single DB_URL
+DB_URLs = os.environ.get("DB_URLs", os.environ.get("DB_URL", "milvus_embedding.db"))
+VIDEO_COLLECTION_NAME = os.environ.get("VIDEO_COLLECTION_NAME", "video_embedding")
+FEED_SNAPSHOT_PATH = os.environ.get("FEED_SNAPSHOT_PATH", "feed_snapshot.bin")
+FEED_SNAPSHOT_SIZE = int(os.environ.get("FEED_SNAPSHOT_SIZE", 100))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Build the home feed snapshot read by the Gradio apps at startup."
+    )
+    parser.add_argument(
+        "--db-urls",
+        type=str,
+        default=DB_URLs,
+        help="Comma separated Milvus URLs to build the feed from.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=FEED_SNAPSHOT_PATH,
+        help="Snapshot file to write (FEED_SNAPSHOT_PATH of the app).",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=FEED_SNAPSHOT_SIZE,
+        help="Maximum number of videos taken from each Milvus instance.",
+    )
+    args = parser.parse_args()
+
+    milvus_instances = [MilvusDatabase(url.strip()) for url in args.db_urls.split(",")]
+    snapshot = build_feed_snapshot(milvus_instances, VIDEO_COLLECTION_NAME, args.limit)
+    if not len(snapshot):
+        # Keep the previous snapshot rather than replacing it with an empty feed
+        raise SystemExit(f"No videos found, {args.output} left unchanged")
+    snapshot.save(args.output)
+
+    # Read it back as the apps do
+    loaded = FeedSnapshot.load(args.output)
+    logger.info(
+        f"Wrote feed snapshot {args.output}: {len(loaded)} videos, "
+        f"{os.path.getsize(args.output) / 1024:.0f} KiB"
+    )
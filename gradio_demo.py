@@ -40,25 +40,20 @@ custom_js = """
 }
 """
 
-# Global index to track the current video
-current_index = 0
 
-
-def select_video(selected_video: str):
-    """Update the current index based on the selected video and return that video."""
-    global current_index
+def select_video(selected_video: str, video_list: list):
+    """Index of the selected video in this session's list, and that video."""
     try:
         current_index = video_list.index(selected_video)
     except ValueError:
         current_index = 0
-    return video_list[current_index]
+    return video_list[current_index], current_index
 
 
-def get_next_video():
-    """Cycle to the next video and return it."""
-    global current_index
+def get_next_video(video_list: list, current_index: int):
+    """Cycle to the next video of this session's list and return it."""
     current_index = (current_index + 1) % len(video_list)
-    return video_list[current_index]
+    return video_list[current_index], current_index
 
 
 def update_display_video(video_url: str):
@@ -66,14 +61,13 @@ def update_display_video(video_url: str):
 
 
 def retrieve_related_videos(video_url: str):
-    global video_list
-
     retrieved_videos = main(video_url=video_url)
     video_list = retrieved_videos.videos
 
     video_list = list(dict.fromkeys(video_list))  # remove duplicate
 
-    return [
+    # The new list replaces this session's list, from its start
+    return [video_list, 0] + [
         gr.update(elem_id=f"recommended-video-{i}", value=None)
         if i >= len(video_list)
         else gr.update(elem_id=f"recommended-video-{i}", value=video_list[i])
@@ -88,6 +82,10 @@ def retrieve_related_videos(video_url: str):
 
 with gr.Blocks(js=custom_js) as demo:
     gr.Markdown("## TikTok2 Simulator Recommended Videos")
+    # Per-session playlist and position, instead of module globals shared by
+    # every user
+    session_video_list = gr.State(video_list)
+    current_index = gr.State(0)
 
     with gr.Row():
         video_display = gr.Video(
@@ -128,11 +126,15 @@ with gr.Blocks(js=custom_js) as demo:
                 )
 
     # When the next button is clicked, display the next video.
-    next_button.click(fn=get_next_video, outputs=video_display)
+    next_button.click(
+        fn=get_next_video,
+        inputs=[session_video_list, current_index],
+        outputs=[video_display, current_index],
+    )
     video_display.change(
         fn=retrieve_related_videos,
         inputs=[video_display],
-        outputs=recommended_videos_display,
+        outputs=[session_video_list, current_index] + recommended_videos_display,
     )
 
 if __name__ == "__main__":
@@ -1,11 +1,8 @@
 import os
 from loguru import logger
 import gradio as gr
-from typing import Dict
-from gradio_main_distributed import main, init
-
-# from src.schemas.output import RetrievalOutput
-from gradio_main_distributed import VideoAttributes
+from src.fastapi.retrieval_client import RetrievalClient
+from src.vector_store import SessionVectorStore
 
 # Paths can be a list of strings or pathlib.Path objects
 # corresponding to filenames or directories.
@@ -15,7 +12,10 @@ gr.set_static_paths(paths=["video-fetch-and-trim/videos/"])
 
 
 N_SIMILAR_VIDEOS = 4
-video_attributes_list = init(
+# Retrieval runs in the retrieval service (src/fastapi/server/retrieval_server.py)
+client = RetrievalClient()
+client.wait_until_ready()
+video_attributes_list = client.feed(
     n_videos=1 + N_SIMILAR_VIDEOS
 )  # the main and recommended videos
 recommended_video_list = [
@@ -34,6 +34,11 @@ logger.info(
     f"Trending videos: {[v.video_path for v in video_attributes_list if v is not None]}"
 )
 
+# Copied into every session by gr.State
+initial_store = SessionVectorStore()
+for v in video_attributes_list:
+    initial_store.add(v.video_path, v.video_embedding, v.uri)
+
 # This JS will be injected once and run when the app loads
 custom_js = """
 () => {
@@ -54,10 +59,6 @@ custom_js = """
 }
 """
 
-# Global index to track the current video
-current_index = 0
-
-
 # def select_video(selected_video: str):
 #     """Update the current index based on the selected video and return that video."""
 #     global current_index
@@ -68,10 +69,9 @@ current_index = 0
 #     return video_attributes_list[current_index]
 
 
-def get_next_video():
-    """Cycle to the next video and return it."""
-    global recommended_video_list
-    return recommended_video_list[0]
+def get_next_video(recommended_videos: list):
+    """Play the first video recommended to this session."""
+    return recommended_videos[0]
 
 
 def update_display_video(video_url: str):
@@ -85,42 +85,63 @@ def update_category(video_url: str):
 
 
 def retrieve_related_videos(
-    local_video_path: str, embedding_dict: Dict[str, VideoAttributes]
-):  # -> embedding_dict, recommended_videos_display: List[gr.Video]:
-    global current_index, recommended_video_list
-
-    """Retrieve related videos based on the current video and update the embedding dictionary."""
+    local_video_path: str, embedding_store: SessionVectorStore
+):  # -> embedding_store, recommended_videos, recommended_videos_display: List[gr.Video]:
+    """Retrieve related videos based on the current video and update the embedding store."""
     if local_video_path is None or local_video_path == "":
         gr.Error("No video path provided.")
-    if local_video_path not in embedding_dict:
-        gr.Error(f"Video path {local_video_path} not found in embedding dictionary.")
+    if local_video_path not in embedding_store:
+        gr.Error(f"Video path {local_video_path} not found in embedding store.")
+    embedding_store.mark_seen(local_video_path)
 
-    retrieved_videos = main(
+    retrieval = client.retrieve(
         video_url=local_video_path,
-        video_embedding=embedding_dict[local_video_path].video_embedding,
+        video_embedding=embedding_store.get(local_video_path),
+        # Extra candidates to replace the videos this session has already seen
+        k=2 * N_SIMILAR_VIDEOS,
     )
+    if retrieval.timed_out_shards or retrieval.failed_shards:
+        gr.Warning(
+            "Partial results, no answer from: "
+            f"{', '.join(retrieval.timed_out_shards + retrieval.failed_shards)}"
+        )
+    retrieved_videos = retrieval.videos
     for retrieved_video in retrieved_videos:
-        if retrieved_video.video_path not in embedding_dict:
-            embedding_dict[retrieved_video.video_path] = retrieved_video
-
-    # Update the current index to the first video in the retrieved list
-    current_index = 0
+        embedding_store.add(
+            retrieved_video.video_path,
+            retrieved_video.video_embedding,
+            retrieved_video.uri,
+        )
 
-    # Update the video list with the new retrieved videos
+    # Update the video list with the new retrieved videos, unseen ones first
     recommended_video_list = [
-        v.video_path for v in retrieved_videos[:N_SIMILAR_VIDEOS] if v is not None
-    ]
+        v.video_path
+        for v in retrieved_videos
+        if v.video_path not in embedding_store.seen
+    ][:N_SIMILAR_VIDEOS]
+    if len(recommended_video_list) < N_SIMILAR_VIDEOS:
+        # Not enough new results (or shards down): more like this from the
+        # videos this session already knows, no Milvus round trip
+        local_matches = embedding_store.top_k(
+            local_video_path,
+            N_SIMILAR_VIDEOS - len(recommended_video_list),
+            exclude=recommended_video_list,
+            exclude_seen=True,
+        )
+        recommended_video_list += [path for path, _ in local_matches]
     logger.info(
         f"Retrieved videos: {[v.video_path for v in retrieved_videos if v is not None]} for {local_video_path}"
     )
-    return [embedding_dict] + recommended_video_list
+    return [embedding_store, recommended_video_list] + recommended_video_list
 
 
 with gr.Blocks(js=custom_js) as demo:
     gr.Markdown("## TikTok2 Simulator Recommended Videos")
-    embedding_store = gr.State({
-        v.video_path: v for v in video_attributes_list if v is not None
-    })  ####### !IMPORTANT. This is in memory vector database ##########################
+    embedding_store = gr.State(
+        initial_store
+    )  ####### !IMPORTANT. This is in memory vector database ##########################
+    # Videos recommended to this session, played by "Next"
+    recommended_videos = gr.State(recommended_video_list)
     with gr.Row():
         video_display = gr.Video(
             value=video_attributes_list[0].video_path,  # type:ignore
@@ -191,12 +212,13 @@ with gr.Blocks(js=custom_js) as demo:
     # When the next button is clicked, display the next video.
     next_button.click(
         fn=get_next_video,
+        inputs=[recommended_videos],
         outputs=[video_display],
     )
     video_display.change(
         fn=retrieve_related_videos,
         inputs=[video_display, embedding_store],
-        outputs=[embedding_store] + recommended_videos_display,
+        outputs=[embedding_store, recommended_videos] + recommended_videos_display,
     )
 
 if __name__ == "__main__":
@@ -3,15 +3,28 @@ from loguru import logger
 from src.schemas.input import TaskInput
 from src.model import MultimodalEmbeddingModel
 from src.milvus import MilvusDatabase
+from src.feed_snapshot import FeedSnapshotRefresher, build_feed_snapshot
 
 DB_URL = os.environ.get("DB_URL", "milvus_embedding.db")
 VIDEO_COLLECTION_NAME = os.environ.get("VIDEO_COLLECTION_NAME", "video_embedding")
 TEXT_COLLECTION_NAME = os.environ.get("TEXT_COLLECTION_NAME", "text_embedding")
+# Home feed read at startup, built with build_feed_snapshot.py (or on first run)
+FEED_SNAPSHOT_PATH = os.environ.get("FEED_SNAPSHOT_PATH", "feed_snapshot.bin")
+FEED_SNAPSHOT_REFRESH_SEC = float(os.environ.get("FEED_SNAPSHOT_REFRESH_SEC", 600))
+FEED_SNAPSHOT_SIZE = int(os.environ.get("FEED_SNAPSHOT_SIZE", 100))
+# First retry of a rebuild that found no videos, doubled on every failure
+FEED_SNAPSHOT_RETRY_SEC = float(os.environ.get("FEED_SNAPSHOT_RETRY_SEC", 10))
 
 logger.info(f"Retrieving data from Milvus database: {DB_URL}")
 
 model = MultimodalEmbeddingModel()
 milvus = MilvusDatabase(DB_URL)
+feed = FeedSnapshotRefresher(
+    FEED_SNAPSHOT_PATH,
+    lambda: build_feed_snapshot([milvus], VIDEO_COLLECTION_NAME, FEED_SNAPSHOT_SIZE),
+    refresh_sec=FEED_SNAPSHOT_REFRESH_SEC,
+    retry_sec=FEED_SNAPSHOT_RETRY_SEC,
+)
 
 sample_videos = [
     # "https://commondatastorage.googleapis.com/gtv-videos-bucket/sample/BigBuckBunny.mp4",# too long :v
@@ -48,16 +61,26 @@ def main(video_url: str):
     return results
 
 
-def init(n_videos: int):
-    """Return list of trending videos"""
-    results = milvus.query(
-        collection_name=VIDEO_COLLECTION_NAME, limit=20, output_fields=["video"]
+def search_text(query: str, k: int = 10):
+    """Videos that best match a text query, with their similarity scores."""
+    return model.retrieve_videos_by_text(query, milvus, VIDEO_COLLECTION_NAME, limit=k)
+
+
+def retrieve_hybrid(video_url: str, text: str | None = None, k: int = 10):
+    """
+    Videos similar to `video_url` and to `text` (or the video's description),
+    fused into one ranking.
+    """
+    input_ = TaskInput(video=video_url, text=text)
+    return model.retrieve_hybrid_from_milvus(
+        input_, milvus, VIDEO_COLLECTION_NAME, TEXT_COLLECTION_NAME, limit=k
     )
-    video_list = [res["video"] for res in results]
 
-    # TODO fix it: why it duplicate here
-    video_list = list(dict.fromkeys(video_list))  # remove duplicate
-    video_list = video_list[:n_videos] + [None] * abs(
+
+def init(n_videos: int):
+    """Return list of trending videos"""
+    video_list = [item.video for item, _ in feed.snapshot.top(n_videos)]
+    video_list = video_list + [None] * abs(
         n_videos - len(video_list)
     )  # pad with None if not enough videos
     return video_list
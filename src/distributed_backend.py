@@ -0,0 +1,343 @@
+import os
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from .fastapi.prefetch import VideoPrefetcher
+from .fastapi.replica_cache import VideoReplicaCache
+from .feed_snapshot import FeedSnapshotRefresher, build_feed_snapshot
+from .milvus import MilvusDatabase, index_spec_from_env
+from .model import MultimodalEmbeddingModel
+from .retrieval import (
+    CLIP_AGGREGATIONS,
+    ShardFanout,
+    merge_top_k,
+    parse_replicas,
+)
+from .schemas.input import TaskInput
+from .schemas.output import (
+    DistributedClipRetrievalOutput,
+    DistributedRetrievalOutput,
+    RetrievalOutput,
+    VideoAttributes,
+    VideoClipAttributes,
+)
+from .schemas.vector import Embedding
+
+# Retrieval across the Milvus shards of every node, shared by the retrieval
+# service (src/fastapi/server/retrieval_server.py) and gradio_main_distributed
+
+# Load multiple DB URLs from environment
+DB_URLs = os.environ.get("DB_URLs", "http://localhost:19530").split(",")
+
+VIDEO_COLLECTION_NAME = os.environ.get("VIDEO_COLLECTION_NAME", "video_embedding")
+TEXT_COLLECTION_NAME = os.environ.get("TEXT_COLLECTION_NAME", "text_embedding")
+# Ranking direction of the merged shard results, from the INDEX_METRIC the
+# collections were built with, so no request waits on a shard to describe it
+HIGHER_IS_BETTER = index_spec_from_env().higher_is_better
+SHARD_LIMIT_MARGIN = int(os.environ.get("SHARD_LIMIT_MARGIN", 2))
+# Per-shard deadline; slower shards are reported and left out of the response
+SHARD_TIMEOUT_SEC = float(os.environ.get("SHARD_TIMEOUT_SEC", 2.0))
+# Optional replicas for hedged requests: "primary=replica1|replica2,..."
+DB_REPLICAS = parse_replicas(os.environ.get("DB_REPLICAS", ""))
+HEDGE_REQUESTS = os.environ.get("HEDGE_REQUESTS", "true").lower() == "true"
+# Remote videos are downloaded in the background; only the first N results
+# (the ones on screen) are waited for
+EAGER_FETCH_TOP_N = int(os.environ.get("EAGER_FETCH_TOP_N", 5))
+EAGER_FETCH_TIMEOUT_SEC = float(os.environ.get("EAGER_FETCH_TIMEOUT_SEC", 10.0))
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 4))
+# Copies of remote videos are tracked in an index and bounded in size
+REPLICA_CACHE_INDEX = os.environ.get("REPLICA_CACHE_INDEX", "replica_cache.json")
+REPLICA_CACHE_MAX_BYTES = int(os.environ.get("REPLICA_CACHE_MAX_BYTES", 2 * 1024**3))
+REPLICA_REVALIDATE_SEC = os.environ.get("REPLICA_REVALIDATE_SEC")
+# Access times of cache hits are written to the index at most this often
+REPLICA_INDEX_SAVE_SEC = float(os.environ.get("REPLICA_INDEX_SAVE_SEC", 30))
+# Home feed read at startup, built with build_feed_snapshot.py (or on first run)
+FEED_SNAPSHOT_PATH = os.environ.get(
+    "FEED_SNAPSHOT_PATH", "feed_snapshot_distributed.bin"
+)
+FEED_SNAPSHOT_REFRESH_SEC = float(os.environ.get("FEED_SNAPSHOT_REFRESH_SEC", 600))
+FEED_SNAPSHOT_SIZE = int(os.environ.get("FEED_SNAPSHOT_SIZE", 100))
+# First retry of a rebuild that found no videos, doubled on every failure
+FEED_SNAPSHOT_RETRY_SEC = float(os.environ.get("FEED_SNAPSHOT_RETRY_SEC", 10))
+
+logger.info(f"Retrieving data from Milvus instances: {DB_URLs}")
+
+model = MultimodalEmbeddingModel()
+milvus_instances = [MilvusDatabase(url.strip()) for url in DB_URLs]
+replica_instances = {
+    primary: [MilvusDatabase(url) for url in urls]
+    for primary, urls in DB_REPLICAS.items()
+}
+# Long-lived pool shared by every request instead of one pool per call
+shard_fanout = ShardFanout(
+    milvus_instances,
+    replica_instances,
+    timeout_sec=SHARD_TIMEOUT_SEC,
+    hedge=HEDGE_REQUESTS,
+)
+replica_cache = VideoReplicaCache(
+    REPLICA_CACHE_INDEX,
+    max_bytes=REPLICA_CACHE_MAX_BYTES,
+    revalidate_after_sec=float(REPLICA_REVALIDATE_SEC)
+    if REPLICA_REVALIDATE_SEC
+    else None,
+    save_interval_sec=REPLICA_INDEX_SAVE_SEC,
+)
+video_prefetcher = VideoPrefetcher(max_workers=PREFETCH_WORKERS, cache=replica_cache)
+feed = FeedSnapshotRefresher(
+    FEED_SNAPSHOT_PATH,
+    lambda: build_feed_snapshot(
+        milvus_instances, VIDEO_COLLECTION_NAME, FEED_SNAPSHOT_SIZE
+    ),
+    refresh_sec=FEED_SNAPSHOT_REFRESH_SEC,
+    retry_sec=FEED_SNAPSHOT_RETRY_SEC,
+)
+
+sample_videos = [
+    "video-fetch-and-trim/videos/education_0.mp4",  # local
+    "video-fetch-and-trim/videos/education_2.mp4",  # local
+    "video-fetch-and-trim/videos/news & politics_0.mp4",  # local
+    "video-fetch-and-trim/videos/news & politics_1.mp4",  # local
+]
+
+
+def is_remote(uri: str) -> bool:
+    return uri != os.environ.get("DB_URL")
+
+
+def fetch_remote_videos(
+    videos: List[VideoAttributes | VideoClipAttributes], eager_top_n: int
+):
+    """Download remote videos in display order, waiting only for the top ones."""
+    remote = [(v.uri, v.video_path) for v in videos if is_remote(v.uri)]
+    n_eager = sum(1 for v in videos[:eager_top_n] if is_remote(v.uri))
+    video_prefetcher.prefetch(
+        remote, eager_top_n=n_eager, timeout_sec=EAGER_FETCH_TIMEOUT_SEC
+    )
+
+
+def merge_shard_outputs(
+    outputs: List[Tuple[MilvusDatabase, RetrievalOutput]], k: int
+) -> List[VideoAttributes]:
+    """Global top-k of per-shard results, whichever shard answered first."""
+    for milvus_ins, res in outputs:
+        # The instance that answered (a replica for hedged shards) serves the files
+        res.milvus_uri = milvus_ins.uri
+    ranked_videos = merge_top_k(
+        [res for _, res in outputs], k, higher_is_better=HIGHER_IS_BETTER
+    )
+    return [
+        VideoAttributes(
+            video_path=ranked.video,
+            video_embedding=ranked.embedding,
+            uri=ranked.milvus_uri,
+            distance=ranked.distance,
+        )
+        for ranked in ranked_videos
+    ]
+
+
+def main(
+    video_url: str, video_embedding: Embedding, k: int = 30
+) -> List[VideoAttributes]:
+    """Return the `k` most similar videos across all Milvus instances."""
+    return retrieve(video_url, video_embedding, k).videos
+
+
+def retrieve(
+    video_url: str,
+    video_embedding: Embedding,
+    k: int = 30,
+    timeout_sec: Optional[float] = None,
+) -> DistributedRetrievalOutput:
+    """Like `main`, but also reports the shards that timed out or failed."""
+    input_ = TaskInput(
+        video=video_url,
+        video_embedding=video_embedding,
+        text=None,
+    )
+    # Every shard only needs to return its own top-k: anything below that
+    # cannot make it into the global top-k. A small margin covers videos that
+    # are stored on several shards and get deduplicated by the merge.
+    shard_limit = k + SHARD_LIMIT_MARGIN
+
+    def query_from_instance(milvus_instance):
+        return model.retrieve_similarity_from_milvus(
+            input_,
+            milvus_instance,
+            VIDEO_COLLECTION_NAME,
+            TEXT_COLLECTION_NAME,
+            limit=shard_limit,
+        )
+
+    fanout = shard_fanout.run(query_from_instance, timeout_sec)
+    for uri, error in fanout.failed.items():
+        logger.error(f"Query failed from instance {uri}: {error}")
+    video_list = merge_shard_outputs(list(fanout.results.values()), k)
+    fetch_remote_videos(video_list, EAGER_FETCH_TOP_N)
+
+    logger.info(
+        f"Retrieved top {len(video_list)} videos for {video_url} from Milvus "
+        f"instances {DB_URLs}: {[v.video_path for v in video_list]}"
+    )
+    return DistributedRetrievalOutput(
+        videos=video_list,
+        timed_out_shards=fanout.timed_out,
+        failed_shards=list(fanout.failed),
+    )
+
+
+def retrieve_batch(
+    seeds: List[VideoAttributes],
+    k: int = 30,
+    timeout_sec: Optional[float] = None,
+) -> List[DistributedRetrievalOutput]:
+    """
+    `retrieve` for many seed videos (watch history, recommended tiles, feed
+    warm-up): one multi-vector search per shard instead of one per seed.
+    """
+    inputs = [
+        TaskInput(video=seed.video_path, video_embedding=seed.video_embedding)
+        for seed in seeds
+    ]
+    shard_limit = k + SHARD_LIMIT_MARGIN
+
+    def query_from_instance(milvus_instance):
+        return model.retrieve_similarity_batch(
+            inputs, milvus_instance, VIDEO_COLLECTION_NAME, limit=shard_limit
+        )
+
+    fanout = shard_fanout.run(query_from_instance, timeout_sec)
+    outputs_per_seed: List[list] = [[] for _ in seeds]
+    for milvus_ins, per_seed in fanout.results.values():
+        for outputs, res in zip(outputs_per_seed, per_seed):
+            outputs.append((milvus_ins, res))
+    for uri, error in fanout.failed.items():
+        logger.error(f"Batch query failed from instance {uri}: {error}")
+
+    results = []
+    for outputs in outputs_per_seed:
+        results.append(
+            DistributedRetrievalOutput(
+                videos=merge_shard_outputs(outputs, k),
+                timed_out_shards=fanout.timed_out,
+                failed_shards=list(fanout.failed),
+            )
+        )
+    logger.info(
+        f"Retrieved top {k} videos for {len(seeds)} seeds from Milvus "
+        f"instances {DB_URLs}"
+    )
+    return results
+
+
+def search_text(
+    query: str, k: int = 30, timeout_sec: Optional[float] = None
+) -> DistributedRetrievalOutput:
+    """The `k` videos that best match a text query across all Milvus instances."""
+    # Embedded once (or read from the query cache) before the fan-out, so the
+    # shards never call the embedding API
+    model.embed_query_text(query)
+    shard_limit = k + SHARD_LIMIT_MARGIN
+
+    def query_from_instance(milvus_instance):
+        return model.retrieve_videos_by_text(
+            query, milvus_instance, VIDEO_COLLECTION_NAME, limit=shard_limit
+        )
+
+    fanout = shard_fanout.run(query_from_instance, timeout_sec)
+    for uri, error in fanout.failed.items():
+        logger.error(f"Text query failed from instance {uri}: {error}")
+    video_list = merge_shard_outputs(list(fanout.results.values()), k)
+    fetch_remote_videos(video_list, EAGER_FETCH_TOP_N)
+
+    logger.info(
+        f"Retrieved top {len(video_list)} videos for {query!r}: "
+        f"{[v.video_path for v in video_list]}"
+    )
+    return DistributedRetrievalOutput(
+        videos=video_list,
+        timed_out_shards=fanout.timed_out,
+        failed_shards=list(fanout.failed),
+    )
+
+
+def retrieve_clips(
+    video_url: str,
+    video_embedding: Embedding,
+    k: int = 30,
+    aggregation: str = "max",
+    timeout_sec: Optional[float] = None,
+) -> DistributedClipRetrievalOutput:
+    """
+    Videos whose clips best match the seed video, with the matching time
+    ranges, across all Milvus instances (see `retrieve_clips_from_milvus`).
+    """
+    if aggregation not in CLIP_AGGREGATIONS:
+        # Checked before the fan-out, so it is not reported as failed shards
+        raise ValueError(
+            f"Unsupported aggregation {aggregation}, use one of {CLIP_AGGREGATIONS}"
+        )
+    input_ = TaskInput(video=video_url, video_embedding=video_embedding)
+    shard_limit = k + SHARD_LIMIT_MARGIN
+
+    def query_from_instance(milvus_instance):
+        return model.retrieve_clips_from_milvus(
+            input_,
+            milvus_instance,
+            VIDEO_COLLECTION_NAME,
+            limit=shard_limit,
+            aggregation=aggregation,
+        )
+
+    fanout = shard_fanout.run(query_from_instance, timeout_sec)
+    candidates = []
+    for milvus_ins, res in fanout.results.values():
+        for video, distance, segments in zip(res.videos, res.distances, res.segments):
+            candidates.append(
+                VideoClipAttributes(
+                    video_path=video,
+                    uri=milvus_ins.uri,
+                    distance=distance,
+                    segments=segments,
+                )
+            )
+    for uri, error in fanout.failed.items():
+        logger.error(f"Clip query failed from instance {uri}: {error}")
+
+    # Aggregated scores are comparable across shards: same query, same metric
+    candidates.sort(key=lambda v: v.distance, reverse=HIGHER_IS_BETTER)
+    video_list, seen = [], set()
+    for candidate in candidates:
+        if candidate.video_path not in seen and len(video_list) < k:
+            seen.add(candidate.video_path)
+            video_list.append(candidate)
+    fetch_remote_videos(video_list, EAGER_FETCH_TOP_N)
+
+    logger.info(
+        f"Retrieved top {len(video_list)} videos by clips ({aggregation}) for "
+        f"{video_url}: {[v.video_path for v in video_list]}"
+    )
+    return DistributedClipRetrievalOutput(
+        videos=video_list,
+        timed_out_shards=fanout.timed_out,
+        failed_shards=list(fanout.failed),
+    )
+
+
+def init(n_videos: int) -> List[VideoAttributes | None]:
+    """Return list of trending videos"""
+    # Vectors are rows of the memory-mapped snapshot, read on first use
+    video_list = [
+        VideoAttributes(video_path=item.video, video_embedding=vector, uri=item.uri)
+        for item, vector in feed.snapshot.top(n_videos)
+    ]
+    logger.info(
+        f"Home feed: {len(video_list)} of {len(feed.snapshot)} snapshot videos, "
+        f"snapshot {feed.snapshot.age_sec:.0f}s old"
+    )
+    # Only the videos that are actually shown need to be on disk
+    fetch_remote_videos(video_list, n_videos)
+    video_list = video_list + [None] * abs(max(n_videos - len(video_list), 0))
+    return video_list
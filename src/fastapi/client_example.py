@@ -1,15 +1,65 @@
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
 import requests
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # TODO: Replace with destination server's IP
 SERVER_IP = "10.130.92.78"
 PORT = 5678
 SERVER_URL = f"http://{SERVER_IP}:{PORT}"
 
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+# Files of at least this size are fetched as DOWNLOAD_PARTS parallel ranges
+PARALLEL_DOWNLOAD_MIN_BYTES = int(
+    os.environ.get("PARALLEL_DOWNLOAD_MIN_BYTES", 16 * 1024 * 1024)
+)
+DOWNLOAD_PARTS = int(os.environ.get("DOWNLOAD_PARTS", 4))
+DOWNLOAD_RETRIES = int(os.environ.get("DOWNLOAD_RETRIES", 3))
+DOWNLOAD_BACKOFF_SEC = float(os.environ.get("DOWNLOAD_BACKOFF_SEC", 0.5))
+DOWNLOAD_TIMEOUT_SEC = float(os.environ.get("DOWNLOAD_TIMEOUT_SEC", 30.0))
+# Keep-alive connections kept per file server
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 16))
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Shared session for the host of `url`, so requests reuse keep-alive
+    connections instead of opening a new TCP connection per file. Connection
+    errors and 429/5xx answers are retried with exponential backoff.
+    """
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            retry = Retry(
+                total=DOWNLOAD_RETRIES,
+                backoff_factor=DOWNLOAD_BACKOFF_SEC,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("HEAD", "GET"),
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
 
 def list_files(path=""):
-    response = requests.get(f"{SERVER_URL}/list/{path}")
+    response = get_session(SERVER_URL).get(f"{SERVER_URL}/list/{path}")
     if response.status_code == 200:
         return response.json()
     else:
@@ -17,32 +67,266 @@ def list_files(path=""):
         return None
 
 
-def download_file(uri: str, filename: str, local_path):
+def file_server_url(uri: str) -> str:
+    # Replace from the default port 19530 of Milvus to the file server port 5678
+    return uri.replace(":19530", f":{PORT}")
+
+
+def file_headers(uri: str, filename: str) -> Optional[Dict[str, str]]:
+    """HEAD a file on the file server of `uri` (size, ETag, Last-Modified)."""
+    url = f"{file_server_url(uri)}/files/{filename}"
+    response = get_session(url).head(url, timeout=5)
+    if response.status_code != 200:
+        return None
+    return dict(response.headers)
+
+
+class DownloadProgress:
+    """
+    Byte ranges of a download and how far each of them has been written.
+
+    Kept next to the partial file as `<local_path>.progress` and rewritten
+    after every chunk that reaches the file, so an interrupted download is
+    resumed from the bytes actually written. The file size says nothing about
+    that: parallel ranges leave holes in the middle of the file.
+    """
+
+    def __init__(self, path: str, total: int, ranges: List[List[int]]):
+        self.path = path
+        self.total = total
+        self.ranges = ranges  # [next byte to write, end) of each range
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DownloadProgress"]:
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            ranges = [[int(start), int(end)] for start, end in data["ranges"]]
+            return cls(path, int(data["total"]), ranges)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @property
+    def remaining(self) -> List[int]:
+        """Indices of the ranges that are not complete yet."""
+        return [i for i, (start, end) in enumerate(self.ranges) if start < end]
+
+    @property
+    def missing_bytes(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+    def advance(self, index: int, position: int):
+        with self._lock:
+            self.ranges[index][0] = position
+            self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"total": self.total, "ranges": self.ranges}, f)
+        os.replace(temp_path, self.path)
+
+
+def _remove_files(*paths: str):
+    for path in paths:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def download_file(
+    uri: str,
+    filename: str,
+    local_path,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    parts: int = DOWNLOAD_PARTS,
+) -> Optional[Dict[str, str]]:
     """
     uri = http://ip:port, same to each of db_url from DB_URLs
+
+    If `local_path` is a download interrupted earlier (its `.etag` and
+    `.progress` files are still next to it) of the same file, only the missing
+    byte ranges are requested. Large files are fetched as `parts` byte ranges
+    in parallel. Broken transfers are resumed from the last written byte, up
+    to DOWNLOAD_RETRIES times. A file whose length the server does not send
+    is streamed in one piece and cannot be resumed.
+
+    Returns the response headers on success (Content-Length is the size of
+    the whole file), None otherwise.
     """
-    # Replace from the default port 19530 of Milvus to the file server port 5678
-    uri = uri.replace(
-        ":19530", ":5678"
-    )  # Ensure the port is correct for the file server
-    logger.info(f"Downloading file from {uri}/files/{filename} to {local_path}")
-    response = requests.get(f"{uri}/files/{filename}", stream=True)
+    uri = file_server_url(uri)  # Ensure the port is correct for the file server
+    url = f"{uri}/files/{filename}"
+    session = get_session(url)
+    folder = os.path.dirname(local_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    etag_path = f"{local_path}.etag"
+    progress_path = f"{local_path}.progress"
+    etag = None
+    progress = None
+    if os.path.isfile(local_path) and os.path.isfile(etag_path):
+        with open(etag_path, "r") as f:
+            etag = f.read().strip() or None
+        progress = DownloadProgress.load(progress_path)
+
+    request_headers = {}
+    if etag and progress is not None and progress.remaining:
+        # Resume; If-Range makes the server send the whole file if it changed
+        start, end = progress.ranges[progress.remaining[0]]
+        request_headers = {"Range": f"bytes={start}-{end - 1}", "If-Range": etag}
+        logger.info(
+            f"Resuming {local_path}, {progress.missing_bytes} of "
+            f"{progress.total} bytes left"
+        )
+    else:
+        progress = None
+    logger.info(f"Downloading file from {url} to {local_path}")
+    response = session.get(
+        url, headers=request_headers, stream=True, timeout=DOWNLOAD_TIMEOUT_SEC
+    )
     logger.info(f"Response status code: {response.status_code}")
+    if response.status_code == 416 and progress is not None:
+        # The partial file does not belong to the file on the server
+        response.close()
+        _remove_files(local_path, etag_path, progress_path)
+        return download_file(uri, filename, local_path, chunk_size, parts)
+    if response.status_code not in (200, 206):
+        logger.error(
+            f"Download of {url} failed: {response.status_code} - {response.reason}"
+        )
+        response.close()
+        return None
+
     if response.status_code == 200:
-        folder = os.path.dirname(local_path)
-        os.makedirs(folder, exist_ok=True)
-        with open(local_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
+        length = response.headers.get("Content-Length")
+        if length is None:
+            # Unknown length: nothing to split into ranges or to resume later
+            _remove_files(etag_path, progress_path)
+            with response, open(local_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
                     f.write(chunk)
-        print(f"File downloaded to {local_path}")
-    else:
-        print(f"Error: {response.status_code} - {response.json()['description']}")
+                total = f.tell()
+            logger.info(f"File downloaded to {local_path} ({total} bytes)")
+            return _result_headers(response, total)
+
+        total = int(length)
+        etag = response.headers.get("ETag")
+        if etag:
+            with open(etag_path, "w") as f:
+                f.write(etag)
+        else:
+            _remove_files(etag_path)
+        ranges = [[0, total]]
+        if (
+            parts > 1
+            and total >= PARALLEL_DOWNLOAD_MIN_BYTES
+            and response.headers.get("Accept-Ranges") == "bytes"
+        ):
+            part_size = -(-total // parts)
+            ranges = [
+                [start, min(start + part_size, total)]
+                for start in range(0, total, part_size)
+            ]
+        progress = DownloadProgress(progress_path, total, ranges)
+        progress.save()
+        open(local_path, "wb").close()
+
+    # The open response serves the first missing range; the others get
+    # requests of their own on the pooled connections
+    remaining = progress.remaining
+    with response, ThreadPoolExecutor(max_workers=max(len(remaining), 1)) as executor:
+        futures = [
+            executor.submit(
+                _download_range,
+                session,
+                url,
+                local_path,
+                progress,
+                index,
+                etag,
+                chunk_size,
+                response if i == 0 else None,
+            )
+            for i, index in enumerate(remaining)
+        ]
+        for future in futures:
+            future.result()
+
+    _remove_files(etag_path, progress_path)
+    logger.info(f"File downloaded to {local_path}")
+    return _result_headers(response, progress.total)
+
+
+def _result_headers(response: requests.Response, total: int) -> Dict[str, str]:
+    headers = dict(response.headers)
+    headers["Content-Length"] = str(total)
+    headers.pop("Content-Range", None)
+    return headers
+
+
+def _download_range(
+    session: requests.Session,
+    url: str,
+    local_path: str,
+    progress: DownloadProgress,
+    index: int,
+    etag: Optional[str],
+    chunk_size: int,
+    response: Optional[requests.Response] = None,
+):
+    """Write range `index` of `progress` into `local_path`, resuming on errors."""
+    position, end = progress.ranges[index]
+    attempt = 0
+    with open(local_path, "r+b") as f:
+        while position < end:
+            try:
+                if response is None:
+                    headers = {"Range": f"bytes={position}-{end - 1}"}
+                    if etag:
+                        headers["If-Range"] = etag
+                    response = session.get(
+                        url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT_SEC
+                    )
+                    if response.status_code != 206:
+                        raise IOError(
+                            f"Range request for {url} failed "
+                            f"({response.status_code}), file changed on the server?"
+                        )
+                f.seek(position)
+                with response:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        chunk = chunk[: end - position]
+                        f.write(chunk)
+                        f.flush()
+                        position += len(chunk)
+                        progress.advance(index, position)
+                        if position >= end:
+                            break
+                if position < end:
+                    raise requests.ConnectionError(f"Connection closed at {position}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                attempt += 1
+                if attempt > DOWNLOAD_RETRIES:
+                    raise
+                delay = DOWNLOAD_BACKOFF_SEC * 2 ** (attempt - 1)
+                logger.warning(
+                    f"Download of {url} interrupted at byte {position} ({e}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+            finally:
+                response = None
 
 
-def stream_file(server_ip, file_path, chunk_size=8192):
+def stream_file(server_ip, file_path, chunk_size=DOWNLOAD_CHUNK_SIZE):
     server_url = f"http://{server_ip}:{PORT}"
-    response = requests.get(f"{server_url}/files/{file_path}", stream=True)
+    url = f"{server_url}/files/{file_path}"
+    response = get_session(url).get(url, stream=True)
     if response.status_code == 200:
         return response.iter_content(chunk_size=chunk_size)
     else:
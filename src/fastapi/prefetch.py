@@ -0,0 +1,132 @@
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import Future, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from .client_example import download_file
+from .replica_cache import VideoReplicaCache
+
+
+class VideoPrefetcher:
+    """
+    Background download pool for videos stored on other nodes.
+
+    Retrieval returns metadata right away and hands the remote videos to the
+    pool in display order. Lower ranks are downloaded first, and a newer
+    request's videos go ahead of everything still queued from older ones.
+    Files that already exist locally are never downloaded again. With a
+    `cache`, downloads go through the replica cache instead, which bounds the
+    disk used by copies and re-downloads replicas that no longer validate.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        download: Callable[[str, str, str], Optional[Dict[str, str]]] = download_file,
+        cache: Optional[VideoReplicaCache] = None,
+    ):
+        self.download = download
+        self.cache = cache
+        self._queue: "queue.PriorityQueue[Tuple[int, int, int, str]]" = (
+            queue.PriorityQueue()
+        )
+        self._jobs: Dict[str, Tuple[str, Future]] = {}  # local path -> (uri, future)
+        self._lock = threading.Lock()
+        self._generation = itertools.count()
+        self._sequence = itertools.count()
+
+        for i in range(max_workers):
+            threading.Thread(
+                target=self._worker, name=f"video-prefetch-{i}", daemon=True
+            ).start()
+
+    def prefetch(
+        self,
+        videos: Iterable[Tuple[str, str]],
+        eager_top_n: int = 0,
+        timeout_sec: Optional[float] = None,
+    ) -> List[Future]:
+        """
+        Queue `(uri, local_path)` pairs, ranked by their order in `videos`.
+
+        Blocks until the first `eager_top_n` of them (the visible ones) are on
+        disk, or `timeout_sec` passes; the rest keep downloading in the
+        background.
+        """
+        generation = next(self._generation)
+        futures = [
+            self.submit(uri, local_path, rank, generation)
+            for rank, (uri, local_path) in enumerate(videos)
+        ]
+        if eager_top_n and futures:
+            wait(futures[:eager_top_n], timeout=timeout_sec)
+        return futures
+
+    def submit(
+        self, uri: str, local_path: str, rank: int = 0, generation: int = 0
+    ) -> Future:
+        with self._lock:
+            job = self._jobs.get(local_path)
+        # Checked without the lock: a replica check may send a HEAD request to
+        # the node the video came from
+        if job is None and self._is_available(local_path):
+            future: Future = Future()
+            future.set_result(local_path)
+            return future
+        with self._lock:
+            job = self._jobs.get(local_path)
+            if job is None:
+                future = Future()
+                self._jobs[local_path] = (uri, future)
+            else:
+                future = job[1]
+                if future.done():
+                    return future
+        # Newest request first, then by display rank. A video queued again by
+        # a newer request is simply pushed with the better priority.
+        self._queue.put((-generation, rank, next(self._sequence), local_path))
+        return future
+
+    def _worker(self):
+        while True:
+            _, _, _, local_path = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(local_path)
+                if job is None or job[1].running() or job[1].done():
+                    continue  # already handled through a higher priority entry
+                uri, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+            try:
+                self._fetch(uri, local_path)
+                future.set_result(local_path)
+            except Exception as e:
+                logger.error(f"Prefetch of {local_path} from {uri} failed: {e}")
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._jobs.pop(local_path, None)
+
+    def _is_available(self, local_path: str) -> bool:
+        if self.cache is not None and local_path in self.cache:
+            return self.cache.get(local_path) is not None
+        # Not a replica, so either a local original or not fetched yet
+        return os.path.isfile(local_path)
+
+    def _fetch(self, uri: str, local_path: str):
+        if self.cache is not None:
+            self.cache.fetch(uri, local_path)
+            return
+        if os.path.isfile(local_path):
+            return
+        # Download next to the target and rename, so the UI never picks up a
+        # half-written file
+        temp_path = f"{local_path}.part"
+        headers = self.download(uri, os.path.basename(local_path), temp_path)
+        if headers is None or not os.path.isfile(temp_path):
+            raise FileNotFoundError(f"Download of {local_path} from {uri} failed")
+        os.replace(temp_path, local_path)
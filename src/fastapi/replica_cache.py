@@ -0,0 +1,233 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+from .client_example import download_file, file_headers
+
+
+@dataclass
+class ReplicaEntry:
+    uri: str
+    size: int
+    etag: Optional[str]
+    last_access: float
+    validated_at: float
+
+
+class VideoReplicaCache:
+    """
+    Managed on-disk cache for videos copied from other nodes.
+
+    Replicas are stored at their usual local path (so Gradio can serve them)
+    and tracked in a JSON index, which is all a restart needs to load: there
+    is no directory rescan. Only files the cache downloaded itself are ever
+    evicted; once the replicas exceed `max_bytes`, the least recently used
+    ones are deleted. Downloads go to a `.part` file that is renamed into
+    place, and a cached copy is only used while its size matches the index
+    (and, every `revalidate_after_sec`, the remote size/ETag).
+
+    Downloads save the index right away; access times of hits are saved at
+    most every `save_interval_sec`, and at exit.
+    """
+
+    def __init__(
+        self,
+        index_path: str = "replica_cache.json",
+        max_bytes: int = 2 * 1024**3,
+        revalidate_after_sec: Optional[float] = None,
+        download: Callable[[str, str, str], Optional[Dict[str, str]]] = download_file,
+        save_interval_sec: float = 30.0,
+    ):
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.revalidate_after_sec = revalidate_after_sec
+        self.download = download
+        self.save_interval_sec = save_interval_sec
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+        self._lock = threading.RLock()
+        self._entries: Dict[str, ReplicaEntry] = self._load_index()
+        # Whether the index file is behind the entries, and when it was written
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        atexit.register(self.flush_index)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def __contains__(self, local_path: str) -> bool:
+        return local_path in self._entries
+
+    def get(self, local_path: str) -> Optional[str]:
+        """Return `local_path` if a valid replica is cached, counting a hit."""
+        with self._lock:
+            entry = self._entries.get(local_path)
+            if entry is None:
+                return None
+            checked = replace(entry)
+
+        # Checked on a copy without holding the lock: revalidating is a HEAD
+        # request to the node the replica came from
+        valid = self._is_valid(local_path, checked)
+
+        with self._lock:
+            current = self._entries.get(local_path)
+            if current is None:
+                return None
+            if current is entry:
+                if not valid:
+                    logger.info(f"Dropping stale replica {local_path}")
+                    del self._entries[local_path]
+                    self._index_changed()
+                    return None
+                entry.validated_at = checked.validated_at
+            # Otherwise a download replaced the entry meanwhile; use the new copy
+            current.last_access = time.time()
+            self.hits += 1
+            self.bytes_saved += current.size
+            self._index_changed()
+            return local_path
+
+    def fetch(self, uri: str, local_path: str) -> str:
+        """Return the cached replica of `local_path`, downloading it if needed."""
+        if self.get(local_path) is not None:
+            return local_path
+
+        with self._lock:
+            self.misses += 1
+
+        # A partial download left by a crash is resumed by download_file
+        temp_path = f"{local_path}.part"
+        headers = self.download(uri, os.path.basename(local_path), temp_path)
+        if headers is None:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise FileNotFoundError(f"Download of {local_path} from {uri} failed")
+        size = os.path.getsize(temp_path)
+        expected = headers.get("Content-Length")
+        if expected is not None and int(expected) != size:
+            os.remove(temp_path)
+            raise IOError(
+                f"Truncated download of {local_path}: {size}/{expected} bytes"
+            )
+        os.replace(temp_path, local_path)
+
+        now = time.time()
+        with self._lock:
+            self._entries[local_path] = ReplicaEntry(
+                uri=uri,
+                size=size,
+                etag=headers.get("ETag"),
+                last_access=now,
+                validated_at=now,
+            )
+            self.bytes_downloaded += size
+            self._evict(keep=local_path)
+            self.save_index()
+        return local_path
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "bytes_downloaded": self.bytes_downloaded,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+        }
+
+    def save_index(self):
+        with self._lock:
+            data = {path: asdict(entry) for path, entry in self._entries.items()}
+            folder = os.path.dirname(self.index_path) or "."
+            os.makedirs(folder, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=folder, prefix=".replica-index-")
+            with os.fdopen(fd, "w") as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.index_path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+    def flush_index(self):
+        """Save the index if access times or drops have not been saved yet."""
+        with self._lock:
+            if self._dirty:
+                self.save_index()
+
+    def _index_changed(self):
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.save_interval_sec:
+            self.save_index()
+
+    def _load_index(self) -> Dict[str, ReplicaEntry]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable replica index {self.index_path}: {e}")
+            return {}
+        entries = {path: ReplicaEntry(**entry) for path, entry in data.items()}
+        logger.info(f"Loaded {len(entries)} cached replicas from {self.index_path}")
+        return entries
+
+    def _is_valid(self, local_path: str, entry: ReplicaEntry) -> bool:
+        try:
+            valid = os.path.getsize(local_path) == entry.size
+        except OSError:
+            valid = False
+
+        if valid and self.revalidate_after_sec is not None:
+            if time.time() - entry.validated_at >= self.revalidate_after_sec:
+                valid = self._revalidate(local_path, entry)
+        return valid
+
+    def _revalidate(self, local_path: str, entry: ReplicaEntry) -> bool:
+        try:
+            headers = file_headers(entry.uri, os.path.basename(local_path))
+        except Exception as e:
+            # Keep serving the local copy while its origin is unreachable
+            logger.warning(f"Could not revalidate {local_path}: {e}")
+            return True
+        if headers is None:
+            return False
+        etag_matches = entry.etag is None or headers.get("ETag") == entry.etag
+        size = headers.get("Content-Length")
+        size_matches = size is None or int(size) == entry.size
+        entry.validated_at = time.time()
+        return etag_matches and size_matches
+
+    def _evict(self, keep: str):
+        total = self.total_bytes
+        for path, entry in sorted(
+            self._entries.items(), key=lambda item: item[1].last_access
+        ):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            del self._entries[path]
+            total -= entry.size
+            self.evictions += 1
+            logger.info(f"Evicted replica {path} ({entry.size} bytes)")
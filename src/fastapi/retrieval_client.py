@@ -0,0 +1,146 @@
+import os
+import time
+from typing import List, Optional, Type, TypeVar
+
+import numpy as np
+import requests
+from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+
+from src.schemas.frame import FRAME_MEDIA_TYPE, decode_frame
+from src.schemas.output import (
+    BatchRetrievalOutput,
+    DistributedClipRetrievalOutput,
+    DistributedRetrievalOutput,
+    FeedOutput,
+    VideoAttributes,
+)
+from src.schemas.vector import embedding_to_base64
+
+RETRIEVAL_SERVER_URL = os.environ.get("RETRIEVAL_SERVER_URL", "http://127.0.0.1:5679")
+RETRIEVAL_TIMEOUT_SEC = float(os.environ.get("RETRIEVAL_TIMEOUT_SEC", 30.0))
+# Binary frames instead of JSON with base64 vectors
+RETRIEVAL_BINARY = os.environ.get("RETRIEVAL_BINARY", "true").lower() == "true"
+# How long a front end waits for the service to come up before giving up
+RETRIEVAL_STARTUP_WAIT_SEC = float(os.environ.get("RETRIEVAL_STARTUP_WAIT_SEC", 60.0))
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class RetrievalClient:
+    """
+    Client of the retrieval service (src/fastapi/server/retrieval_server.py),
+    with the same calls as gradio_main_distributed. Holds no session state,
+    so one client can be shared by every user of a front end.
+    """
+
+    def __init__(
+        self,
+        base_url: str = RETRIEVAL_SERVER_URL,
+        timeout_sec: float = RETRIEVAL_TIMEOUT_SEC,
+        binary: bool = RETRIEVAL_BINARY,
+        pool_size: int = 16,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_sec = timeout_sec
+        self.binary = binary
+        # Keep-alive connections, one per concurrent request
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+
+    def _call(
+        self, method: str, path: str, model: Type[M], body: Optional[dict] = None
+    ) -> M:
+        response = self.session.request(
+            method,
+            f"{self.base_url}{path}",
+            json=body,
+            headers={"Accept": FRAME_MEDIA_TYPE if self.binary else "application/json"},
+            timeout=self.timeout_sec,
+        )
+        if response.status_code >= 400:
+            raise ValueError(
+                f"Retrieval service {path} failed ({response.status_code}): "
+                f"{response.text}"
+            )
+        if response.headers.get("content-type", "").startswith(FRAME_MEDIA_TYPE):
+            return model.model_validate(decode_frame(response.content))
+        return model.model_validate_json(response.content)
+
+    def wait_until_ready(
+        self, timeout_sec: float = RETRIEVAL_STARTUP_WAIT_SEC, interval_sec: float = 1.0
+    ):
+        """
+        Poll /health until the service answers, so a front end started
+        together with the service does not fail on its first call.
+        """
+        deadline = time.monotonic() + timeout_sec
+        while True:
+            try:
+                self.session.get(f"{self.base_url}/health", timeout=interval_sec)
+                return
+            except requests.RequestException as e:
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(
+                        f"Retrieval service at {self.base_url} is not reachable "
+                        f"after {timeout_sec:.0f}s ({e}). Start it with "
+                        "`python -m src.fastapi.server.retrieval_server` or set "
+                        "RETRIEVAL_SERVER_URL."
+                    ) from None
+            time.sleep(interval_sec)
+
+    def feed(self, n_videos: int) -> List[Optional[VideoAttributes]]:
+        """Trending videos, padded with None to `n_videos`."""
+        return self._call("GET", f"/feed?n={n_videos}", FeedOutput).videos
+
+    def retrieve(
+        self,
+        video_url: str,
+        video_embedding: Optional[np.ndarray] = None,
+        k: int = 30,
+        timeout_sec: Optional[float] = None,
+    ) -> DistributedRetrievalOutput:
+        body = {"video_path": video_url, "k": k, "timeout_sec": timeout_sec}
+        if video_embedding is not None:
+            body["video_embedding"] = embedding_to_base64(video_embedding)
+        return self._call("POST", "/retrieve", DistributedRetrievalOutput, body)
+
+    def retrieve_batch(
+        self,
+        seeds: List[VideoAttributes],
+        k: int = 30,
+        timeout_sec: Optional[float] = None,
+    ) -> List[DistributedRetrievalOutput]:
+        body = {
+            "seeds": [seed.model_dump(mode="json") for seed in seeds],
+            "k": k,
+            "timeout_sec": timeout_sec,
+        }
+        return self._call("POST", "/retrieve/batch", BatchRetrievalOutput, body).results
+
+    def search_text(
+        self, query: str, k: int = 30, timeout_sec: Optional[float] = None
+    ) -> DistributedRetrievalOutput:
+        body = {"query": query, "k": k, "timeout_sec": timeout_sec}
+        return self._call("POST", "/search/text", DistributedRetrievalOutput, body)
+
+    def retrieve_clips(
+        self,
+        video_url: str,
+        video_embedding: Optional[np.ndarray] = None,
+        k: int = 30,
+        aggregation: str = "max",
+        timeout_sec: Optional[float] = None,
+    ) -> DistributedClipRetrievalOutput:
+        body = {
+            "video_path": video_url,
+            "k": k,
+            "aggregation": aggregation,
+            "timeout_sec": timeout_sec,
+        }
+        if video_embedding is not None:
+            body["video_embedding"] = embedding_to_base64(video_embedding)
+        return self._call(
+            "POST", "/retrieve/clips", DistributedClipRetrievalOutput, body
+        )
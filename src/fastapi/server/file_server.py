@@ -1,4 +1,5 @@
-from flask import Flask, send_file, jsonify, abort
+from flask import Flask, send_file, jsonify, abort, request
+import argparse
 import os
 import socket
 from pathlib import Path
@@ -8,8 +9,16 @@ app = Flask(__name__)
 
 # Configure the directory to serve files from
 # TODO: CHANGE THIS
-BASE_DIR = Path(__file__).parent.parent.parent.parent / "video-fetch-and-trim/videos"
+BASE_DIR = Path(
+    os.environ.get(
+        "FILE_SERVER_BASE_DIR",
+        Path(__file__).parent.parent.parent.parent / "video-fetch-and-trim/videos",
+    )
+)
 PORT = 5678
+# Videos never change in place, so clients may reuse them without asking
+FILE_MAX_AGE_SEC = int(os.environ.get("FILE_MAX_AGE_SEC", 3600))
+FILE_SERVER_WORKERS = int(os.environ.get("FILE_SERVER_WORKERS", 4))
 
 logger.info(f"Serving files from {BASE_DIR}")
 
@@ -30,12 +39,59 @@ def get_file(file_path):
 
     file_full_path = os.path.join(BASE_DIR, file_path)
     if os.path.isfile(file_full_path):
-        return send_file(file_full_path)
+        # Handles Range (206), If-None-Match / If-Modified-Since (304) and HEAD
+        response = send_file(
+            file_full_path, conditional=True, etag=True, max_age=FILE_MAX_AGE_SEC
+        )
+        return sendfile_ranges(response, file_full_path)
     else:
         logger.warning(f"File not found: {file_full_path}")
         abort(404, description="Not a file")
 
 
+class RangeFile:
+    """File positioned at the start of a byte range, read up to its end."""
+
+    def __init__(self, file, start: int, length: int):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def sendfile_ranges(response, path: str):
+    """
+    Let the WSGI server sendfile() byte ranges as well as whole files.
+
+    Werkzeug serves a range by reading the file chunk by chunk in Python. When
+    the server provides `wsgi.file_wrapper` (gunicorn), `path` is instead
+    opened again and handed back wrapped and positioned at the start of the
+    range, so the server copies the Content-Length bytes from there with
+    sendfile(), without the data passing through userspace.
+    """
+    file_wrapper = request.environ.get("wsgi.file_wrapper")
+    if response.status_code != 206 or file_wrapper is None:
+        return response
+    range_file = RangeFile(
+        open(path, "rb"), response.content_range.start, response.content_length
+    )
+    response.response.close()  # the file opened by send_file
+    response.response = file_wrapper(range_file)
+    return response
+
+
 @app.route("/list/<path:dir_path>", methods=["GET"])
 def list_files(dir_path):
     """List files in a directory"""
@@ -69,10 +125,49 @@ def index():
     return jsonify({"server": hostname, "ip": ip_address, "base_path": BASE_DIR})
 
 
+def run_production(host: str, port: int, workers: int):
+    """Serve with gunicorn worker processes, which use sendfile() for files."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.warning(
+            "gunicorn is not installed (pip install gunicorn), "
+            "falling back to the threaded Werkzeug server"
+        )
+        app.run(host=host, port=port, debug=False, threaded=True)
+        return
+
+    class FileServerApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", 8)
+
+        def load(self):
+            return app
+
+    FileServerApplication().run()
+
+
 if __name__ == "__main__":
-    # Get local IP address
-    hostname = socket.gethostname()
-    ip_address = socket.gethostbyname(hostname)
+    parser = argparse.ArgumentParser(description="Serve videos to other nodes")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Run the Werkzeug development server with the debugger and reloader",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=FILE_SERVER_WORKERS,
+        help="Worker processes in production mode",
+    )
+    args = parser.parse_args()
 
     # Run server on all interfaces
-    app.run(host="0.0.0.0", port=PORT, debug=True)
+    if args.debug:
+        app.run(host="0.0.0.0", port=args.port, debug=True)
+    else:
+        run_production("0.0.0.0", args.port, args.workers)
@@ -0,0 +1,164 @@
+"""
+Retrieval service: the model and the Milvus shards behind an asyncio HTTP API.
+
+The Gradio apps (and any other front end) call this service instead of
+querying Milvus themselves. Requests carry all their state (seed video,
+embedding, k), so one process serves any number of users concurrently;
+session state such as the seen videos stays in the client. The endpoints
+are plain functions, so FastAPI runs the blocking Milvus and embedding calls
+on its thread pool (RETRIEVAL_SERVER_THREADS threads), and every retrieval
+fans out to the shards in parallel (`ShardFanout`).
+
+Responses are JSON, with vectors as base64, or binary frames
+(`src.schemas.frame`) when the request sends `Accept: application/octet-stream`.
+
+    DB_URLs=http://localhost:19530 python -m src.fastapi.server.retrieval_server
+"""
+
+import argparse
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import uvicorn
+from anyio import to_thread
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from src import distributed_backend as backend
+from src.schemas.frame import FRAME_MEDIA_TYPE, encode_frame
+from src.schemas.output import (
+    BatchRetrievalOutput,
+    DistributedClipRetrievalOutput,
+    DistributedRetrievalOutput,
+    FeedOutput,
+    VideoAttributes,
+)
+from src.schemas.vector import Embedding
+
+PORT = int(os.environ.get("RETRIEVAL_SERVER_PORT", 5679))
+# Requests served at the same time; more wait in the event loop
+RETRIEVAL_SERVER_THREADS = int(os.environ.get("RETRIEVAL_SERVER_THREADS", 32))
+# Concurrent searches of the service are micro-batched (see MilvusSearchBatcher)
+RETRIEVAL_SEARCH_BATCH_WINDOW_MS = float(
+    os.environ.get("RETRIEVAL_SEARCH_BATCH_WINDOW_MS", 2)
+)
+# Largest `k` (or feed `n`) a request may ask for; larger ones get a 422
+RETRIEVAL_MAX_K = int(os.environ.get("RETRIEVAL_MAX_K", 1000))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Size of the thread pool that runs the (sync) endpoints
+    to_thread.current_default_thread_limiter().total_tokens = RETRIEVAL_SERVER_THREADS
+    replicas = [r for rs in backend.replica_instances.values() for r in rs]
+    for milvus in backend.milvus_instances + replicas:
+        milvus.enable_search_batching(RETRIEVAL_SEARCH_BATCH_WINDOW_MS)
+    yield
+
+
+app = FastAPI(title="Video retrieval service", lifespan=lifespan)
+
+
+class RetrieveRequest(BaseModel):
+    video_path: str
+    # Seed vector, if the client has it (feed and earlier results carry one);
+    # otherwise it is read from Milvus
+    video_embedding: Optional[Embedding] = None
+    k: int = Field(30, gt=0, le=RETRIEVAL_MAX_K)
+    timeout_sec: Optional[float] = None
+
+
+class BatchRetrieveRequest(BaseModel):
+    seeds: List[VideoAttributes]
+    k: int = Field(30, gt=0, le=RETRIEVAL_MAX_K)
+    timeout_sec: Optional[float] = None
+
+
+class TextSearchRequest(BaseModel):
+    query: str
+    k: int = Field(30, gt=0, le=RETRIEVAL_MAX_K)
+    timeout_sec: Optional[float] = None
+
+
+class ClipRetrieveRequest(RetrieveRequest):
+    aggregation: str = "max"
+
+
+def respond(request: Request, output: BaseModel) -> Response:
+    """Binary frame if the client accepts it, JSON otherwise."""
+    if FRAME_MEDIA_TYPE in request.headers.get("accept", ""):
+        return Response(encode_frame(output), media_type=FRAME_MEDIA_TYPE)
+    return Response(output.model_dump_json(), media_type="application/json")
+
+
+@app.exception_handler(ValueError)
+async def bad_request(request: Request, e: ValueError):
+    return JSONResponse(status_code=400, content={"detail": str(e)})
+
+
+@app.get("/health")
+def health():
+    return {
+        "shards": backend.DB_URLs,
+        "feed_videos": len(backend.feed.snapshot),
+        "feed_age_sec": round(backend.feed.snapshot.age_sec),
+    }
+
+
+@app.get("/feed")
+def feed(request: Request, n: int = Query(5, ge=1, le=RETRIEVAL_MAX_K)):
+    """Trending videos for the home feed, padded with null to `n`."""
+    videos = backend.init(n)
+    return respond(request, FeedOutput(videos=videos))
+
+
+@app.post("/retrieve")
+def retrieve(body: RetrieveRequest, request: Request):
+    output: DistributedRetrievalOutput = backend.retrieve(
+        body.video_path,
+        body.video_embedding,
+        body.k,
+        body.timeout_sec,
+    )
+    return respond(request, output)
+
+
+@app.post("/retrieve/batch")
+def retrieve_batch(body: BatchRetrieveRequest, request: Request):
+    results = backend.retrieve_batch(body.seeds, body.k, body.timeout_sec)
+    return respond(request, BatchRetrievalOutput(results=results))
+
+
+@app.post("/search/text")
+def search_text(body: TextSearchRequest, request: Request):
+    output: DistributedRetrievalOutput = backend.search_text(
+        body.query, body.k, body.timeout_sec
+    )
+    return respond(request, output)
+
+
+@app.post("/retrieve/clips")
+def retrieve_clips(body: ClipRetrieveRequest, request: Request):
+    output: DistributedClipRetrievalOutput = backend.retrieve_clips(
+        body.video_path,
+        body.video_embedding,
+        body.k,
+        body.aggregation,
+        body.timeout_sec,
+    )
+    return respond(request, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve video retrieval over HTTP")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    logger.info(f"Retrieval service on port {args.port}, shards {backend.DB_URLs}")
+    # One process: the model caches, shard pool and feed are shared by all
+    # requests, and the event loop handles the concurrency
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,254 @@
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from itertools import zip_longest
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from .milvus import MilvusDatabase
+
+_MAGIC = b"FEEDSNP1"
+_HEADER_LENGTH = struct.Struct("<I")
+# The matrix starts on an aligned offset so it can be mapped as is
+_ALIGNMENT = 64
+
+
+@dataclass
+class FeedItem:
+    video: str
+    uri: str  # Milvus instance holding the video
+    category: str = ""
+    local: bool = False  # video file present when the snapshot was built
+
+
+class FeedSnapshot:
+    """
+    Materialized home feed: ranked videos and their float32 vectors.
+
+    On disk it is one file: a magic string, a JSON header with the items, and
+    the vectors as a row-major little-endian float32 matrix. `load` parses the
+    header and memory-maps the matrix, so app startup reads no vectors until
+    they are used and needs no Milvus query at all.
+    """
+
+    def __init__(
+        self,
+        items: List[FeedItem],
+        vectors: np.ndarray,
+        created_at: Optional[float] = None,
+    ):
+        if len(items) != len(vectors):
+            raise ValueError(f"{len(items)} items but {len(vectors)} vectors")
+        self.items = items
+        self.vectors = vectors
+        self.created_at = time.time() if created_at is None else created_at
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def age_sec(self) -> float:
+        return time.time() - self.created_at
+
+    def top(self, n: int) -> List[Tuple[FeedItem, np.ndarray]]:
+        """The first `n` items of the feed with their vectors."""
+        return list(zip(self.items[:n], self.vectors[:n]))
+
+    def save(self, path: str):
+        """Write the snapshot atomically, readers never see a partial file."""
+        vectors = np.ascontiguousarray(self.vectors, dtype="<f4")
+        header = json.dumps({
+            "created_at": self.created_at,
+            "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "items": [asdict(item) for item in self.items],
+        }).encode()
+        offset = len(_MAGIC) + _HEADER_LENGTH.size + len(header)
+        padding = -offset % _ALIGNMENT
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(_MAGIC)
+                file.write(_HEADER_LENGTH.pack(len(header)))
+                file.write(header)
+                file.write(b"\0" * padding)
+                file.write(vectors.tobytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "FeedSnapshot":
+        with open(path, "rb") as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a feed snapshot")
+            (header_length,) = _HEADER_LENGTH.unpack(file.read(_HEADER_LENGTH.size))
+            header = json.loads(file.read(header_length))
+        offset = len(_MAGIC) + _HEADER_LENGTH.size + header_length
+        offset += -offset % _ALIGNMENT
+
+        items = [FeedItem(**item) for item in header["items"]]
+        shape = (len(items), header["dim"])
+        if items:
+            vectors = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=shape)
+        else:
+            vectors = np.zeros(shape, dtype=np.float32)
+        return cls(items, vectors, header["created_at"])
+
+
+def rank_feed(items: List[FeedItem]) -> List[FeedItem]:
+    """
+    Order the feed: videos already on disk first, so the first screen needs no
+    download, and categories interleaved so it is not a single topic.
+    """
+    ranked = []
+    for local in (True, False):
+        by_category: Dict[str, List[FeedItem]] = {}
+        for item in items:
+            if item.local == local:
+                by_category.setdefault(item.category, []).append(item)
+        for row in zip_longest(*by_category.values()):
+            ranked.extend(item for item in row if item is not None)
+    return ranked
+
+
+def build_feed_snapshot(
+    milvus_instances: Sequence[MilvusDatabase],
+    collection_name: str,
+    limit_per_instance: int = 100,
+) -> FeedSnapshot:
+    """
+    Build the feed from the video-level rows of every instance. A video stored
+    on several instances is kept once, from the first instance that has it.
+    """
+    items: List[FeedItem] = []
+    vectors: Dict[str, np.ndarray] = {}
+    for milvus in milvus_instances:
+        try:
+            if milvus.partitioned_by_scope(collection_name):
+                scope = {"partition_names": ["video"]}
+            else:
+                scope = {"filter": 'embedding_scope=="video"'}
+            rows = milvus.query(
+                collection_name=collection_name,
+                limit=limit_per_instance,
+                output_fields=["video", "category", "embeddings_float"],
+                **scope,
+            )
+        except Exception as e:
+            logger.error(f"Feed query failed from instance {milvus.uri}: {e}")
+            continue
+        for row in rows:
+            if row["video"] in vectors:
+                continue
+            vectors[row["video"]] = np.asarray(row["embeddings_float"], np.float32)
+            items.append(
+                FeedItem(
+                    video=row["video"],
+                    uri=milvus.uri,
+                    category=row.get("category") or "",
+                    local=os.path.exists(row["video"]),
+                )
+            )
+
+    items = rank_feed(items)
+    if items:
+        matrix = np.stack([vectors[item.video] for item in items])
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    logger.info(
+        f"Built feed snapshot with {len(items)} videos "
+        f"({sum(item.local for item in items)} local)"
+    )
+    return FeedSnapshot(items, matrix)
+
+
+class FeedSnapshotRefresher:
+    """
+    Keeps the feed snapshot fresh: `snapshot` is the file read at startup (or
+    built with `build` when there is none), and a background thread rebuilds
+    and rewrites it every `refresh_sec`.
+
+    A rebuild that finds no videos (every instance unreachable) is never
+    written, so the file of the last good build survives restarts. It is
+    retried after `retry_sec`, doubling up to `refresh_sec`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        build: Callable[[], FeedSnapshot],
+        refresh_sec: Optional[float] = None,
+        retry_sec: float = 10.0,
+    ):
+        self.path = path
+        self.build = build
+        self.refresh_sec = refresh_sec
+        self.retry_sec = retry_sec
+        self._failed_builds = 0
+        self.snapshot: Optional[FeedSnapshot] = None
+        self.snapshot = self._load_or_build()
+        self._closed = threading.Event()
+
+        if refresh_sec or self._failed_builds:
+            threading.Thread(target=self._refresh_loop, daemon=True).start()
+
+    def refresh(self) -> FeedSnapshot:
+        snapshot = self.build()
+        if not len(snapshot):
+            # Every instance failed: keep serving (and keep the file of) the
+            # previous feed, if there is one
+            self._failed_builds += 1
+            logger.warning(
+                f"Feed snapshot rebuild returned no videos, keeping {self.path}; "
+                f"retrying in {self._next_wait_sec():g}s"
+            )
+            return self.snapshot if self.snapshot is not None else snapshot
+        self._failed_builds = 0
+        snapshot.save(self.path)
+        self.snapshot = snapshot
+        return snapshot
+
+    def close(self):
+        self._closed.set()
+
+    def _load_or_build(self) -> FeedSnapshot:
+        if os.path.exists(self.path):
+            try:
+                snapshot = FeedSnapshot.load(self.path)
+                logger.info(
+                    f"Loaded feed snapshot {self.path} with {len(snapshot)} videos, "
+                    f"{snapshot.age_sec:.0f}s old"
+                )
+                if len(snapshot):
+                    return snapshot
+            except Exception as e:
+                logger.warning(f"Could not read feed snapshot {self.path}: {e}")
+        return self.refresh()
+
+    def _next_wait_sec(self) -> Optional[float]:
+        if not self._failed_builds:
+            return self.refresh_sec or None
+        backoff = self.retry_sec * 2 ** (self._failed_builds - 1)
+        return min(backoff, self.refresh_sec) if self.refresh_sec else backoff
+
+    def _refresh_loop(self):
+        # A snapshot that was already stale at startup is rebuilt right away
+        wait_sec = self._next_wait_sec()
+        if not self._failed_builds:
+            wait_sec = max(0.0, self.refresh_sec - self.snapshot.age_sec)
+        while wait_sec is not None and not self._closed.wait(wait_sec):
+            try:
+                self.refresh()
+            except Exception as e:
+                self._failed_builds += 1
+                logger.error(f"Feed snapshot refresh failed: {e}")
+            wait_sec = self._next_wait_sec()
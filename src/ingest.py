@@ -0,0 +1,327 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from .milvus import MilvusDatabase, MilvusWriteBuffer, insert_task_output_to_milvus
+from .model import MultimodalEmbeddingModel
+from .schemas.base import VideoMetadata
+from .schemas.input import TaskInput
+from .schemas.output import TaskOutput
+
+# Embedding tasks not ready this long after creation are given up as failed
+INGEST_TASK_TIMEOUT_SEC = float(os.environ.get("INGEST_TASK_TIMEOUT_SEC", 1800))
+
+
+class IngestCheckpoint:
+    """
+    Append-only record of the videos that have been embedded and inserted.
+
+    Every finished video is written as one line and fsync'ed, so a crashed or
+    interrupted build can resume from the last finished video.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done: Set[str] = set()
+
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                self._done = {line.rstrip("\n") for line in file if line.strip()}
+            logger.info(f"Loaded checkpoint {path} with {len(self._done)} videos")
+
+    def __contains__(self, video: str) -> bool:
+        return video in self._done
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def mark_done(self, video: str):
+        self.mark_done_many([video])
+
+    def mark_done_many(self, videos: Iterable[str]):
+        with self._lock:
+            new_videos = [video for video in dict.fromkeys(videos) if video not in self]
+            if not new_videos:
+                return
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.path, "a") as file:
+                file.write("".join(video + "\n" for video in new_videos))
+                file.flush()
+                os.fsync(file.fileno())
+            self._done.update(new_videos)
+
+    def reset(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._done = set()
+
+
+@dataclass
+class IngestStats:
+    submitted: int = 0
+    # With a write buffer, videos count as completed once their rows are flushed
+    completed: int = 0
+    buffered: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed_sec: float = 0.0
+
+    @property
+    def videos_per_min(self) -> float:
+        return 60 * self.completed / self.elapsed_sec if self.elapsed_sec else 0.0
+
+
+@dataclass
+class _Job:
+    video: str
+    metadata: VideoMetadata
+    input: Optional[TaskInput] = None
+    task_id: Optional[str] = None
+    embeddings: Optional[List[Dict]] = None
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class EmbeddingIngestPipeline:
+    """
+    Bounded-concurrency embedding ingest.
+
+    Up to `max_in_flight` Twelve Labs embed tasks are kept open at once. Task
+    creation (which uploads the video) and result retrieval run on a worker
+    pool, all open tasks are polled together on every tick, and each finished
+    video is inserted into Milvus and recorded in the checkpoint as soon as its
+    embeddings are available.
+
+    With a `write_buffer`, rows are inserted in batches instead and videos are
+    checkpointed, and counted as completed, only once the flush that stored
+    them has succeeded; `buffered` counts the videos handed to the buffer.
+
+    A task that is not ready `task_timeout_sec` after its creation, whether
+    it is still processing or its status cannot be read, counts as failed.
+    """
+
+    def __init__(
+        self,
+        model: MultimodalEmbeddingModel,
+        milvus: MilvusDatabase,
+        video_collection_name: str = "video_embedding",
+        text_collection_name: str = "text_embedding",
+        checkpoint: Optional[IngestCheckpoint] = None,
+        max_in_flight: int = 8,
+        poll_interval: float = 2.0,
+        write_buffer: Optional[MilvusWriteBuffer] = None,
+        task_timeout_sec: float = INGEST_TASK_TIMEOUT_SEC,
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.model = model
+        self.milvus = milvus
+        self.video_collection_name = video_collection_name
+        self.text_collection_name = text_collection_name
+        self.checkpoint = checkpoint
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.write_buffer = write_buffer
+        self.task_timeout_sec = task_timeout_sec
+
+        self._stats: Optional[IngestStats] = None
+        self._unflushed: Set[str] = set()
+        self._stats_lock = threading.Lock()
+        if write_buffer is not None:
+            if checkpoint is not None:
+                write_buffer.add_flush_callback(checkpoint.mark_done_many)
+            write_buffer.add_flush_callback(self._count_flushed)
+
+    def run(self, items: Iterable[Tuple[VideoMetadata, str]]) -> IngestStats:
+        stats = IngestStats()
+        self._stats = stats
+        start = time.monotonic()
+        pending = self._iter_pending(items, stats)
+
+        creating: Dict[Future, _Job] = {}
+        polling: Dict[str, _Job] = {}
+        retrieving: Dict[Future, _Job] = {}
+        exhausted = False
+        last_poll = 0.0
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            while True:
+                # Keep the number of open tasks at the concurrency limit
+                while not exhausted and (
+                    len(creating) + len(polling) + len(retrieving) < self.max_in_flight
+                ):
+                    job = next(pending, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    creating[executor.submit(self._create_task, job)] = job
+                    stats.submitted += 1
+
+                if not (creating or polling or retrieving):
+                    break
+
+                progressed = False
+
+                for future in [f for f in creating if f.done()]:
+                    job = creating.pop(future)
+                    progressed = True
+                    try:
+                        job.task_id = future.result()
+                    except Exception as e:
+                        stats.failed += 1
+                        logger.info(f"Error creating task for {job.video}: {e}")
+                        continue
+                    if job.embeddings is not None:
+                        # Cache hit: no embedding task to wait for
+                        retrieving[executor.submit(self._retrieve, job)] = job
+                    else:
+                        polling[job.task_id] = job
+
+                if polling and time.monotonic() - last_poll >= self.poll_interval:
+                    last_poll = time.monotonic()
+                    task_ids = list(polling)
+                    statuses = list(executor.map(self._poll_status, task_ids))
+                    # Tasks created before this are given up unless ready
+                    timed_out_before = last_poll - self.task_timeout_sec
+                    for task_id, status in zip(task_ids, statuses):
+                        if status == "ready":
+                            job = polling.pop(task_id)
+                            retrieving[executor.submit(self._retrieve, job)] = job
+                            progressed = True
+                        elif status == "failed":
+                            job = polling.pop(task_id)
+                            stats.failed += 1
+                            progressed = True
+                            logger.info(f"Embedding task {task_id} failed: {job.video}")
+                        elif polling[task_id].submitted_at < timed_out_before:
+                            job = polling.pop(task_id)
+                            stats.failed += 1
+                            progressed = True
+                            logger.info(
+                                f"Embedding task {task_id} timed out after "
+                                f"{self.task_timeout_sec:g}s: {job.video}"
+                            )
+
+                for future in [f for f in retrieving if f.done()]:
+                    job = retrieving.pop(future)
+                    progressed = True
+                    try:
+                        self._insert(job, future.result())
+                        if self.write_buffer is None:
+                            stats.completed += 1
+                        else:
+                            stats.buffered += 1
+                    except Exception as e:
+                        with self._stats_lock:
+                            self._unflushed.discard(job.video)
+                        stats.failed += 1
+                        logger.info(f"Error processing video {job.video}: {e}")
+
+                if not progressed:
+                    # Sleep until a worker finishes or the next status poll is due
+                    timeout = max(
+                        0.0, last_poll + self.poll_interval - time.monotonic()
+                    )
+                    futures = list(creating) + list(retrieving)
+                    if futures:
+                        wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(timeout)
+
+        if self.write_buffer is not None:
+            self.write_buffer.flush("end")
+
+        stats.elapsed_sec = time.monotonic() - start
+        buffered = (
+            f" ({stats.buffered} buffered)" if self.write_buffer is not None else ""
+        )
+        logger.info(
+            f"Ingest finished: {stats.completed} completed{buffered}, "
+            f"{stats.failed} failed, {stats.skipped} skipped "
+            f"in {stats.elapsed_sec:.1f}s "
+            f"({stats.videos_per_min:.1f} videos/min)"
+        )
+        return stats
+
+    def _iter_pending(
+        self, items: Iterable[Tuple[VideoMetadata, str]], stats: IngestStats
+    ) -> Iterator[_Job]:
+        for metadata, video_path in items:
+            if self.checkpoint is not None and video_path in self.checkpoint:
+                stats.skipped += 1
+                continue
+            yield _Job(video=video_path, metadata=metadata)
+
+    def _create_task(self, job: _Job) -> Optional[str]:
+        job.input = TaskInput(
+            video=job.video,
+            text=job.metadata["description"],
+            category=job.metadata.get("category"),
+        )
+        job.embeddings = self.model.lookup_cached_embeddings(job.video)
+        if job.embeddings is not None:
+            logger.info(f"Using cached embeddings for {job.video}")
+            return None
+
+        video_model = self.model.video_embedding_model
+        if job.input.video_type == "url":
+            task = video_model.create_embedding_task(video_url=job.video)
+        else:
+            task = video_model.create_embedding_task(video_file=job.video)
+        job.submitted_at = time.monotonic()
+        return task.id
+
+    def _poll_status(self, task_id: str) -> Optional[str]:
+        try:
+            return self.model.video_embedding_model.task_status(task_id)
+        except Exception as e:
+            # Transient API errors: keep the task and try again on the next tick
+            logger.info(f"Retrieving status of task {task_id} failed: {e}")
+            return None
+
+    def _retrieve(self, job: _Job) -> TaskOutput:
+        video_embeddings = job.embeddings
+        if video_embeddings is None:
+            video_model = self.model.video_embedding_model
+            video_embeddings, _ = video_model.retrieve_embeddings(job.task_id)
+            self.model.store_cached_embeddings(job.video, video_embeddings)
+            logger.info(
+                f"Embedding done for {job.video} in "
+                f"{time.monotonic() - job.submitted_at:.1f}s"
+            )
+        return self.model.build_task_output(
+            job.video, video_embeddings, job.input.text, job.input.category
+        )
+
+    def _count_flushed(self, keys: List[str]):
+        # Flush callbacks run on whichever thread flushed, possibly the age flush
+        with self._stats_lock:
+            for key in keys:
+                if key in self._unflushed:
+                    self._unflushed.remove(key)
+                    self._stats.completed += 1
+
+    def _insert(self, job: _Job, output: TaskOutput):
+        # Runs on the coordinating thread; with a write buffer the rows may be
+        # inserted later, by whichever add fills the buffer or by its age flush
+        if self.write_buffer is not None:
+            with self._stats_lock:
+                self._unflushed.add(job.video)
+        insert_task_output_to_milvus(
+            self.milvus,
+            output,
+            self.video_collection_name,
+            self.text_collection_name,
+            write_buffer=self.write_buffer,
+            key=job.video,
+        )
+        if self.write_buffer is None and self.checkpoint is not None:
+            self.checkpoint.mark_done(job.video)
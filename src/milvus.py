@@ -1,45 +1,292 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from loguru import logger
-from typing import Dict, List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-from pymilvus import MilvusClient
+import numpy as np
 
 from .schemas.output import TaskOutput
 
+if TYPE_CHECKING:
+    from pymilvus import MilvusClient
+
+
+EMBEDDING_DIMENSION = 1024  # The dimension of the Twelve Labs embeddings
+# Scalar fields of the video collection (VARCHAR max length). Each gets an
+# INVERTED index so filters on them do not scan every row.
+VIDEO_SCALAR_FIELDS = {"video": 1024, "embedding_scope": 16, "category": 128}
+# Text rows keep the video they describe (the join key of hybrid search)
+TEXT_SCALAR_FIELDS = {"video": 1024, "category": 128}
+# Video collections keep each embedding scope in its own partition, so video
+# searches never see clip rows
+SCOPE_PARTITIONS = ["video", "clip"]
+# Micro-batching of concurrent single-vector searches (see
+# MilvusSearchBatcher): how long a search waits for others, and the most
+# merged into one request. A window of 0 disables batching; it is off unless
+# set here, and the retrieval service turns it on for its own shards.
+SEARCH_BATCH_WINDOW_MS = float(os.environ.get("SEARCH_BATCH_WINDOW_MS", 0))
+SEARCH_BATCH_MAX_SIZE = int(os.environ.get("SEARCH_BATCH_MAX_SIZE", 32))
+
+
+@dataclass
+class IndexSpec:
+    """Vector index of a collection and the search params used with it."""
+
+    index_type: str = "AUTOINDEX"
+    metric_type: str = "COSINE"
+    params: Dict[str, Any] = field(default_factory=dict)
+    # Default search-time params, e.g. {"ef": 64} (HNSW) or {"nprobe": 16} (IVF)
+    search_params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def higher_is_better(self) -> bool:
+        # COSINE and IP are similarities, L2 is a distance
+        return self.metric_type != "L2"
+
+
+INDEX_PRESETS: Dict[str, IndexSpec] = {
+    "AUTOINDEX": IndexSpec(),
+    "FLAT": IndexSpec("FLAT"),
+    "HNSW": IndexSpec(
+        "HNSW", params={"M": 16, "efConstruction": 200}, search_params={"ef": 64}
+    ),
+    "IVF_FLAT": IndexSpec(
+        "IVF_FLAT", params={"nlist": 128}, search_params={"nprobe": 16}
+    ),
+    "IVF_SQ8": IndexSpec(
+        "IVF_SQ8", params={"nlist": 128}, search_params={"nprobe": 16}
+    ),
+    "IVF_PQ": IndexSpec(
+        "IVF_PQ",
+        params={"nlist": 128, "m": 64, "nbits": 8},
+        search_params={"nprobe": 16},
+    ),
+}
+
+
+def index_spec_from_env() -> IndexSpec:
+    """Build an IndexSpec from INDEX_TYPE / INDEX_METRIC / INDEX_PARAMS / SEARCH_PARAMS."""
+    index_type = os.environ.get("INDEX_TYPE", "AUTOINDEX").upper()
+    if index_type not in INDEX_PRESETS:
+        raise ValueError(
+            f"Unsupported INDEX_TYPE {index_type}, use one of {list(INDEX_PRESETS)}"
+        )
+    preset = INDEX_PRESETS[index_type]
+    return IndexSpec(
+        index_type,
+        metric_type=os.environ.get("INDEX_METRIC", preset.metric_type).upper(),
+        params=json.loads(os.environ.get("INDEX_PARAMS", "null")) or preset.params,
+        search_params=json.loads(os.environ.get("SEARCH_PARAMS", "null"))
+        or preset.search_params,
+    )
+
 
 class MilvusDatabase:
-    def __init__(self, db_name: str):
+    """
+    Milvus database at `db_name` (a server URL or a Milvus Lite file). The
+    connection, and the pymilvus import, happen on first use, so creating
+    one object per node costs nothing for apps that may never query it.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        search_batch_window_ms: float = SEARCH_BATCH_WINDOW_MS,
+        search_batch_max_size: int = SEARCH_BATCH_MAX_SIZE,
+    ):
         self.uri = db_name
-        self.milvus_client = self._create_database(db_name)
+        self._milvus_client: Optional["MilvusClient"] = None
+        self._connect_lock = threading.Lock()
+        # collection -> index, filled on creation or on first search
+        self.index_specs: Dict[str, Optional[IndexSpec]] = {}
+        # collection -> whether rows are partitioned by embedding scope
+        self.scope_partitions: Dict[str, bool] = {}
+        # collections known to be loaded for search and query
+        self.loaded_collections: Set[str] = set()
+        self.search_batcher: Optional[MilvusSearchBatcher] = None
+        self.enable_search_batching(search_batch_window_ms, search_batch_max_size)
+
+    def enable_search_batching(
+        self, window_ms: float, max_size: int = SEARCH_BATCH_MAX_SIZE
+    ):
+        """Batch concurrent searches within `window_ms` of each other (0: off)."""
+        self.search_batcher = None
+        if window_ms > 0:
+            self.search_batcher = MilvusSearchBatcher(self, window_ms / 1000, max_size)
+
+    @property
+    def milvus_client(self) -> "MilvusClient":
+        if self._milvus_client is None:
+            with self._connect_lock:
+                if self._milvus_client is None:
+                    self._milvus_client = self._create_database(self.uri)
+        return self._milvus_client
 
     def _create_database(
         self, db_name: str = "milvus_twelvelabs_demo.db"
-    ) -> MilvusClient:
+    ) -> "MilvusClient":
+        from pymilvus import MilvusClient
+
         # This is a quickstart to create a local vector database
         milvus_client = MilvusClient(db_name)
 
         logger.info("Successfully connected to Milvus")
         return milvus_client
 
-    def create_collection(self, collection_name: str = "twelvelabs_demo_collection"):
+    def create_collection(
+        self,
+        collection_name: str = "twelvelabs_demo_collection",
+        index: Optional[IndexSpec] = None,
+        dimension: int = EMBEDDING_DIMENSION,
+        scalar_fields: Optional[Dict[str, int]] = None,
+        partition_by_scope: bool = False,
+    ):
+        """
+        `scalar_fields` maps VARCHAR field names to their max length, e.g.
+        VIDEO_SCALAR_FIELDS; with `partition_by_scope`, rows are stored in one
+        partition per embedding scope (SCOPE_PARTITIONS).
+        """
+        from pymilvus import DataType
+
         if self.milvus_client.has_collection(collection_name=collection_name):
             self.milvus_client.drop_collection(collection_name=collection_name)
 
+        index = index or IndexSpec()
+        # Explicit primary key, vector and scalar fields; any other field
+        # (text, offsets, ...) stays dynamic, as with the quick setup
+        schema = self.milvus_client.create_schema(
+            auto_id=True, enable_dynamic_field=True
+        )
+        schema.add_field("id", DataType.INT64, is_primary=True)
+        schema.add_field("embeddings_float", DataType.FLOAT_VECTOR, dim=dimension)
+        for field_name, max_length in (scalar_fields or {}).items():
+            schema.add_field(
+                field_name, DataType.VARCHAR, max_length=max_length, default_value=""
+            )
+
+        index_params = self.milvus_client.prepare_index_params()
+        index_params.add_index(
+            field_name="embeddings_float",
+            index_type=index.index_type,
+            metric_type=index.metric_type,
+            params=index.params,
+        )
+        for field_name in scalar_fields or {}:
+            index_params.add_index(field_name=field_name, index_type="INVERTED")
         self.milvus_client.create_collection(
             collection_name=collection_name,
-            dimension=1024,  # The dimension of the Twelve Labs embeddings
-            auto_id=True,
-            vector_field_name="embeddings_float",
+            schema=schema,
+            index_params=index_params,
         )
+        self.index_specs[collection_name] = index
+        self.loaded_collections.add(collection_name)
 
-        logger.info(f"Collection '{collection_name}' created successfully")
+        if partition_by_scope:
+            for partition_name in SCOPE_PARTITIONS:
+                self.milvus_client.create_partition(collection_name, partition_name)
+        self.scope_partitions[collection_name] = partition_by_scope
 
-    def insert(self, collection_name: str, data: Union[Dict, List[Dict]]):
-        insert_result = self.milvus_client.insert(
-            collection_name=collection_name, data=data
+        logger.info(
+            f"Collection '{collection_name}' created successfully with a "
+            f"{index.index_type} index ({index.metric_type}, {index.params})"
         )
+
+    def index_spec(self, collection_name: str) -> Optional[IndexSpec]:
+        """
+        Index of a collection; looked up once for collections built elsewhere.
+        A failed lookup raises and is tried again on the next call, since
+        guessing the metric could reverse the ranking of L2 collections.
+        """
+        if collection_name not in self.index_specs:
+            spec = None
+            try:
+                info = self.milvus_client.describe_index(
+                    collection_name, "embeddings_float"
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Could not describe the index of {collection_name}: {e}"
+                )
+                raise
+            if info:
+                preset = INDEX_PRESETS.get(info["index_type"], IndexSpec())
+                spec = IndexSpec(
+                    info["index_type"],
+                    metric_type=info["metric_type"],
+                    search_params=preset.search_params,
+                )
+            self.index_specs[collection_name] = spec
+        return self.index_specs[collection_name]
+
+    def ensure_loaded(self, collection_name: str):
+        """
+        Load a collection that is not loaded yet, e.g. a Milvus Lite file that
+        was reopened. Checked once per collection.
+        """
+        if collection_name in self.loaded_collections:
+            return
+        try:
+            state = self.milvus_client.get_load_state(collection_name)["state"]
+        except Exception:
+            return  # Missing collection: let the request itself report it
+        if state.name != "Loaded":
+            logger.info(f"Loading collection {collection_name} ({state.name})")
+            self.milvus_client.load_collection(collection_name)
+        self.loaded_collections.add(collection_name)
+
+    def partitioned_by_scope(self, collection_name: str) -> bool:
+        if collection_name not in self.scope_partitions:
+            partitions = self.milvus_client.list_partitions(collection_name)
+            self.scope_partitions[collection_name] = all(
+                p in partitions for p in SCOPE_PARTITIONS
+            )
+        return self.scope_partitions[collection_name]
+
+    def insert(self, collection_name: str, data: Union[Dict, List[Dict]]):
+        if not self.partitioned_by_scope(collection_name):
+            return self.milvus_client.insert(collection_name=collection_name, data=data)
+
+        # One insert per scope partition
+        rows_by_partition: Dict[str, List[Dict]] = {}
+        for row in [data] if isinstance(data, dict) else data:
+            scope = row.get("embedding_scope")
+            partition_name = scope if scope in SCOPE_PARTITIONS else "_default"
+            rows_by_partition.setdefault(partition_name, []).append(row)
+        insert_result = {"insert_count": 0, "ids": []}
+        for partition_name, rows in rows_by_partition.items():
+            res = self.milvus_client.insert(
+                collection_name=collection_name,
+                data=rows,
+                partition_name=partition_name,
+            )
+            insert_result["insert_count"] += res["insert_count"]
+            insert_result["ids"] += list(res["ids"])
         return insert_result
 
+    def buffered_writer(self, **kwargs) -> "MilvusWriteBuffer":
+        """Return a write buffer that batches inserts into this database."""
+        return MilvusWriteBuffer(self, **kwargs)
+
     def query(self, **kwargs):
+        self.ensure_loaded(kwargs["collection_name"])
         return self.milvus_client.query(**kwargs)
 
     def query_by_metadata(
@@ -50,11 +297,13 @@ class MilvusDatabase:
         output_fields: Optional[List[str]] = None,
         **kwargs,
     ) -> List[Dict]:
+        self.ensure_loaded(collection_name)
         query_results = self.milvus_client.query(
             collection_name,
             filter=filter_metadata,
             output_fields=output_fields,
             limit=limit,
+            **kwargs,
         )
         if not len(query_results):
             return []
@@ -64,11 +313,61 @@ class MilvusDatabase:
     def retrieve_similarity(
         self,
         collection_name: str,
-        query_vectors: List[List[float]],
+        query_vectors: List[Union[List[float], np.ndarray]],
         limit: int = 10,
         output_fields: Optional[List[str]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
         **kwargs,
     ) -> List[Dict]:
+        """
+        Hits of the first query vector. `search_params` (e.g. {"ef": 128} or
+        {"nprobe": 32}) override the collection's default search params for
+        this query only. With a search batcher, a single query vector may be
+        searched together with concurrent queries of the same shape.
+        """
+        if self.search_batcher is not None and len(query_vectors) == 1:
+            return self.search_batcher.search(
+                collection_name,
+                query_vectors[0],
+                limit,
+                output_fields,
+                search_params,
+                **kwargs,
+            )
+        search_results = self.retrieve_similarity_batch(
+            collection_name,
+            query_vectors,
+            limit,
+            output_fields,
+            search_params,
+            **kwargs,
+        )
+        if not len(search_results):
+            return []
+
+        return search_results[0]
+
+    def retrieve_similarity_batch(
+        self,
+        collection_name: str,
+        query_vectors: List[Union[List[float], np.ndarray]],
+        limit: int = 10,
+        output_fields: Optional[List[str]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> List[List[Dict]]:
+        """Search all `query_vectors` in one request; one list of hits per vector."""
+        if not len(query_vectors):
+            return []
+        index = self.index_spec(collection_name)
+        if index is not None:
+            kwargs["search_params"] = {
+                "metric_type": index.metric_type,
+                "params": {**index.search_params, **(search_params or {})},
+            }
+        elif search_params:
+            kwargs["search_params"] = {"params": search_params}
+        self.ensure_loaded(collection_name)
         search_results = self.milvus_client.search(
             collection_name=collection_name,
             data=query_vectors,
@@ -76,11 +375,319 @@ class MilvusDatabase:
             output_fields=output_fields,
             **kwargs,
         )
+        return [list(hits) for hits in search_results]
 
-        if not len(search_results):
-            return []
 
-        return search_results[0]
+# Search arguments that may differ between the searches of one batch only if
+# they are equal; searches with any other argument are not batched
+_BATCH_KWARGS = {"filter", "partition_names"}
+
+
+def _hashable(value: Any) -> Hashable:
+    """`value` as a hashable key, with numpy scalars as Python numbers."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+def _batch_key(
+    collection_name: str,
+    limit: int,
+    output_fields: Optional[List[str]],
+    search_params: Optional[Dict[str, Any]],
+    kwargs: Dict[str, Any],
+) -> Optional[Tuple]:
+    """Key of the batch a search may join, None if it cannot be batched."""
+    if not set(kwargs) <= _BATCH_KWARGS:
+        return None
+    return (
+        collection_name,
+        int(limit),
+        _hashable(output_fields),
+        _hashable(search_params or {}),
+        kwargs.get("filter") or "",
+        _hashable(kwargs.get("partition_names")),
+    )
+
+
+class _SearchBatch:
+    def __init__(self):
+        self.vectors: List[Union[List[float], np.ndarray]] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+
+
+class MilvusSearchBatcher:
+    """
+    Merges concurrent single-vector searches into multi-vector searches.
+
+    Searches with the same collection, limit, output fields, filter,
+    partitions and params join the same batch; other search arguments are
+    sent on their own. The first search of a batch waits up to
+    `window_sec` for others (less if `max_batch` join), then runs them all as
+    one `retrieve_similarity_batch` request and hands every caller its own
+    hits; the callers' threads do the work, there is no background thread.
+    A search that arrives while no other search is running is sent right
+    away, so batching only adds latency under load, when it pays off.
+    """
+
+    def __init__(
+        self, milvus: MilvusDatabase, window_sec: float = 0.002, max_batch: int = 32
+    ):
+        self.milvus = milvus
+        self.window_sec = window_sec
+        self.max_batch = max_batch
+
+        self.total_searches = 0
+        self.total_batches = 0
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple, _SearchBatch] = {}
+        self._in_flight = 0
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Union[List[float], np.ndarray],
+        limit: int = 10,
+        output_fields: Optional[List[str]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> List[Dict]:
+        key = _batch_key(collection_name, limit, output_fields, search_params, kwargs)
+        if key is None:
+            return self.milvus.retrieve_similarity_batch(
+                collection_name,
+                [query_vector],
+                limit,
+                output_fields,
+                search_params,
+                **kwargs,
+            )[0]
+        future: Future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _SearchBatch()
+                window_sec = self.window_sec if self._in_flight else 0.0
+                self._in_flight += 1
+            batch.vectors.append(query_vector)
+            batch.futures.append(future)
+            if len(batch.vectors) >= self.max_batch:
+                del self._pending[key]  # later searches start a new batch
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(window_sec)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self.total_searches += len(batch.vectors)
+                self.total_batches += 1
+            try:
+                hits_per_vector = self.milvus.retrieve_similarity_batch(
+                    collection_name,
+                    batch.vectors,
+                    limit,
+                    output_fields,
+                    search_params,
+                    **kwargs,
+                )
+                for batch_future, hits in zip(batch.futures, hits_per_vector):
+                    batch_future.set_result(hits)
+            except Exception as e:
+                for batch_future in batch.futures:
+                    batch_future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+        return future.result()
+
+
+def _estimate_row_bytes(row: Dict) -> int:
+    size = 0
+    for value in row.values():
+        if isinstance(value, np.ndarray):
+            size += value.nbytes
+        elif isinstance(value, (list, tuple)):
+            size += 4 * len(value)  # float32 vectors on the wire
+        elif isinstance(value, str):
+            size += len(value.encode())
+        else:
+            size += 8
+    return size
+
+
+@dataclass
+class FlushStats:
+    rows: Dict[str, int]
+    bytes: int
+    latency_sec: float
+    reason: str
+
+
+class MilvusWriteBuffer:
+    """
+    Collects rows for one or more collections and inserts them in batches.
+
+    Rows are flushed with a single insert per collection once the buffer holds
+    `max_rows` rows or `max_bytes` bytes, or when the oldest buffered row is
+    older than `max_age_sec`. Fewer, larger inserts mean fewer RPCs and fewer
+    small growing segments during a bulk build. Remaining rows are flushed on
+    `close()`, when leaving a `with` block, and at interpreter exit.
+
+    Keys passed to `add` are handed to the flush callbacks once their rows are
+    stored, e.g. to checkpoint videos only after they are really in Milvus.
+    """
+
+    def __init__(
+        self,
+        milvus: MilvusDatabase,
+        max_rows: int = 1000,
+        max_bytes: int = 16 * 1024 * 1024,
+        max_age_sec: Optional[float] = 5.0,
+        history_size: int = 100,
+    ):
+        self.milvus = milvus
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+
+        self.flushes: Deque[FlushStats] = deque(maxlen=history_size)
+        self.total_rows = 0
+        self.total_flushes = 0
+
+        self._lock = threading.RLock()
+        self._rows: Dict[str, List[Dict]] = {}
+        self._keys: List[Hashable] = []
+        self._n_rows = 0
+        self._n_bytes = 0
+        self._oldest: Optional[float] = None
+        self._callbacks: List[Callable[[List[Hashable]], None]] = []
+        self._collections = set()
+        self._closed = threading.Event()
+
+        if max_age_sec:
+            threading.Thread(target=self._flush_by_age, daemon=True).start()
+        atexit.register(self.close)
+
+    def add_flush_callback(self, callback: Callable[[List[Hashable]], None]):
+        self._callbacks.append(callback)
+
+    def add(
+        self,
+        collection_name: str,
+        data: Union[Dict, List[Dict]],
+        key: Optional[Hashable] = None,
+    ):
+        self.add_rows({collection_name: data}, key)
+
+    def add_rows(
+        self,
+        rows_by_collection: Dict[str, Union[Dict, List[Dict]]],
+        key: Optional[Hashable] = None,
+    ):
+        """Buffer rows for several collections that belong to the same `key`."""
+        with self._lock:
+            for collection_name, data in rows_by_collection.items():
+                rows = [data] if isinstance(data, dict) else list(data)
+                self._rows.setdefault(collection_name, []).extend(rows)
+                self._collections.add(collection_name)
+                self._n_rows += len(rows)
+                self._n_bytes += sum(_estimate_row_bytes(row) for row in rows)
+            if key is not None:
+                self._keys.append(key)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+            if self._n_rows >= self.max_rows:
+                self.flush("rows")
+            elif self._n_bytes >= self.max_bytes:
+                self.flush("bytes")
+
+    def flush(self, reason: str = "manual") -> Optional[FlushStats]:
+        with self._lock:
+            if not self._n_rows:
+                return None
+
+            start = time.perf_counter()
+            rows_per_collection = {}
+            try:
+                for collection_name in list(self._rows):
+                    rows = self._rows[collection_name]
+                    if rows:
+                        self.milvus.insert(collection_name, rows)
+                        rows_per_collection[collection_name] = len(rows)
+                    # Inserted rows are dropped right away so that a retry after
+                    # a failure in a later collection does not send them twice
+                    del self._rows[collection_name]
+            except Exception:
+                remaining = [row for rows in self._rows.values() for row in rows]
+                self._n_rows = len(remaining)
+                self._n_bytes = sum(_estimate_row_bytes(row) for row in remaining)
+                raise
+
+            stats = FlushStats(
+                rows=rows_per_collection,
+                bytes=self._n_bytes,
+                latency_sec=time.perf_counter() - start,
+                reason=reason,
+            )
+            keys = self._keys
+            self._keys = []
+            self._n_rows = 0
+            self._n_bytes = 0
+            self._oldest = None
+
+            self.flushes.append(stats)
+            self.total_rows += sum(rows_per_collection.values())
+            self.total_flushes += 1
+            logger.info(
+                f"Flushed {rows_per_collection} ({stats.bytes / 1024:.0f} KiB) "
+                f"in {stats.latency_sec * 1000:.1f} ms, reason={reason}"
+            )
+
+        for callback in self._callbacks:
+            callback(keys)
+        return stats
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self.flush("close")
+        atexit.unregister(self.close)
+
+        # Seal the segments written by the bulk load
+        for collection_name in self._collections:
+            try:
+                self.milvus.milvus_client.flush(collection_name)
+            except Exception as e:
+                logger.warning(f"Could not flush collection {collection_name}: {e}")
+        logger.info(
+            f"Write buffer closed: {self.total_rows} rows in "
+            f"{self.total_flushes} flushes"
+        )
+
+    def __enter__(self) -> "MilvusWriteBuffer":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush_by_age(self):
+        while not self._closed.wait(self.max_age_sec / 4):
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.max_age_sec:
+                try:
+                    self.flush("age")
+                except Exception as e:
+                    logger.error(f"Background flush failed: {e}")
 
 
 def insert_task_output_to_milvus(
@@ -88,9 +695,19 @@ def insert_task_output_to_milvus(
     task_output: TaskOutput,
     video_collection_name: str = "video_embedding",
     text_collection_name: str = "text_embedding",
+    write_buffer: Optional[MilvusWriteBuffer] = None,
+    key: Optional[Hashable] = None,
 ):
     task_output_data = task_output.model_dump()
 
+    if write_buffer is not None:
+        # Rows are inserted later, in batches, by the write buffer
+        rows = {video_collection_name: task_output_data["video_embeddings"]}
+        if task_output_data["text_embedding"]:
+            rows[text_collection_name] = task_output_data["text_embedding"]
+        write_buffer.add_rows(rows, key)
+        return
+
     video_data = task_output_data["video_embeddings"]
     res = milvus.insert(video_collection_name, video_data)
     video_ids = res["ids"]
@@ -1,20 +1,86 @@
 from loguru import logger
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from urllib import request
 
+import numpy as np
+
 from .milvus import MilvusDatabase
-from .models.text_embedding import TextEmbeddingModel
+from .models.core import model_name, video_embedding_scopes
+from .models.embedding_cache import EmbeddingCache
+from .models.text_embedding import TextEmbeddingModel, normalize_query_text
 from .models.video_embedding import VideoEmbeddingModel
 from .schemas.input import TaskInput
-from .schemas.output import RetrievalOutput, TaskOutput
+from .retrieval import (
+    CLIP_AGGREGATIONS,
+    FUSION_METHODS,
+    aggregate_clip_hits,
+    fuse_rankings,
+)
+from .schemas.output import (
+    ClipRetrievalOutput,
+    ClipSegment,
+    HybridRetrievalOutput,
+    RetrievalOutput,
+    TaskOutput,
+)
+from .utils.cache import LRUCache
 
 MILVUS_FILE_DIR = os.environ.get("MILVUS_FILE_DIR", "video-fetch-and-trim/videos")
+# Clip search: candidate videos per result, clip hits fetched per candidate,
+# and whether Milvus groups the hits by video (see retrieve_clips_from_milvus)
+CLIP_GROUP_OVERSAMPLE = int(os.environ.get("CLIP_GROUP_OVERSAMPLE", 2))
+CLIP_HITS_PER_VIDEO = int(os.environ.get("CLIP_HITS_PER_VIDEO", 8))
+CLIP_SEARCH_GROUP_BY = os.environ.get("CLIP_SEARCH_GROUP_BY", "false").lower() == "true"
+# Hybrid search: candidates fetched from each search per result, and the
+# reciprocal rank fusion constant
+HYBRID_OVERSAMPLE = int(os.environ.get("HYBRID_OVERSAMPLE", 2))
+HYBRID_RRF_K = int(os.environ.get("HYBRID_RRF_K", 60))
+
+
+def _video_search_scope(
+    milvus: MilvusDatabase,
+    collection_name: str,
+    category: Optional[str] = None,
+    scope: str = "video",
+) -> Tuple[str, Optional[List[str]]]:
+    """
+    Filter and partitions that restrict a search or query to the rows of one
+    embedding scope (and `category`, if given). Collections partitioned by
+    scope only read that partition; the others filter on `embedding_scope`.
+    """
+    conditions = []
+    partition_names = None
+    if milvus.partitioned_by_scope(collection_name):
+        partition_names = [scope]
+    else:
+        conditions.append(f'embedding_scope=="{scope}"')
+    if category:
+        conditions.append(f'category=="{category}"')
+    return " and ".join(conditions), partition_names
 
 
 class MultimodalEmbeddingModel:
-    def __init__(self):
-        self.video_embedding_model = VideoEmbeddingModel()
-        self.text_embedding_model = TextEmbeddingModel()
+    def __init__(self, client=None, embedding_cache: Optional[EmbeddingCache] = None):
+        # `client` overrides the shared TwelveLabs client (e.g. a fake one in tests)
+        self.video_embedding_model = VideoEmbeddingModel(client)
+        self.text_embedding_model = TextEmbeddingModel(client)
+        # Optional content-hash cache consulted before any embedding request
+        self.embedding_cache = embedding_cache
+        # (milvus uri, collection, video path) -> video-scope seed vector
+        self.seed_vector_cache: LRUCache[np.ndarray] = LRUCache(
+            int(os.environ.get("SEED_VECTOR_CACHE_SIZE", 4096))
+        )
+        # normalized query text -> text embedding, for text-to-video search
+        self.text_query_cache: LRUCache[np.ndarray] = LRUCache(
+            int(os.environ.get("TEXT_QUERY_CACHE_SIZE", 4096))
+        )
+        # Runs the video and text searches of a hybrid search side by side
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("HYBRID_SEARCH_WORKERS", 8)),
+            thread_name_prefix="hybrid-search",
+        )
 
     def generate_embedding(self, input: TaskInput) -> TaskOutput:
         try:
@@ -28,55 +94,110 @@ class MultimodalEmbeddingModel:
                 logger.info(f"Downloaded video from url to {MILVUS_FILE_DIR}")
                 # print(f"Downloaded video from url to {MILVUS_FILE_DIR}")
 
-                video_embeddings, _ = self.video_embedding_model.generate_embedding_url(
-                    video
+                video_embeddings = self._embed_video(
+                    video, self.video_embedding_model.generate_embedding_url
                 )
             elif input.video_type == "file":
-                video_embeddings, _ = (
-                    self.video_embedding_model.generate_embedding_file(video)
+                video_embeddings = self._embed_video(
+                    video, self.video_embedding_model.generate_embedding_file
                 )
             else:
                 raise ValueError('Invalid video type. Should be "url" or "file".')
 
-            video_embeddings_extended = [
-                {
-                    "video": video,
-                    **dict_,
-                }
-                for _, dict_ in enumerate(video_embeddings)
-            ]
-
-            text_embeddings_extended = None
-
-            if input.text is not None:
-                text = input.text
-                text_embeddings = self.text_embedding_model.generate_embedding(text)
-                text_embeddings_extended = {
-                    "text": text,
-                    "embeddings_float": text_embeddings,
-                }
-
-            output_data = {
-                "video_embeddings": video_embeddings_extended,
-                "text_embedding": text_embeddings_extended,
-            }
-
-            return TaskOutput(**output_data)
+            return self.build_task_output(
+                video, video_embeddings, input.text, input.category
+            )
         except Exception as e:
             raise e
 
+    def build_task_output(
+        self,
+        video: str,
+        video_embeddings: List[Dict],
+        text: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> TaskOutput:
+        """Attach the video path and category, and embed the description."""
+        video_embeddings_extended = [
+            {
+                "video": video,
+                "category": category or "",
+                **dict_,
+            }
+            for _, dict_ in enumerate(video_embeddings)
+        ]
+
+        text_embeddings_extended = None
+
+        if text is not None:
+            text_embeddings = self._embed_text(text)
+            text_embeddings_extended = {
+                "text": text,
+                "video": video,
+                "category": category or "",
+                "embeddings_float": text_embeddings,
+            }
+
+        output_data = {
+            "video_embeddings": video_embeddings_extended,
+            "text_embedding": text_embeddings_extended,
+        }
+
+        return TaskOutput(**output_data)
+
+    def lookup_cached_embeddings(self, video: str) -> Optional[List[Dict]]:
+        """Return the cached embeddings of a local video file, if any."""
+        if self.embedding_cache is None or not os.path.isfile(video):
+            return None
+        key = self.embedding_cache.video_key(video, model_name, video_embedding_scopes)
+        return self.embedding_cache.get(key)
+
+    def store_cached_embeddings(self, video: str, video_embeddings: List[Dict]):
+        if self.embedding_cache is None or not os.path.isfile(video):
+            return
+        key = self.embedding_cache.video_key(video, model_name, video_embedding_scopes)
+        self.embedding_cache.put(key, video_embeddings)
+
+    def _embed_video(self, video: str, embed) -> List[Dict]:
+        video_embeddings = self.lookup_cached_embeddings(video)
+        if video_embeddings is None:
+            video_embeddings, _ = embed(video)
+            self.store_cached_embeddings(video, video_embeddings)
+        else:
+            logger.info(f"Using cached embeddings for {video}")
+        return video_embeddings
+
+    def _embed_text(self, text: str) -> Optional[np.ndarray]:
+        """float32 embedding of `text`, whether cached or new; None on failure."""
+        key = None
+        if self.embedding_cache is not None:
+            key = self.embedding_cache.text_key(text, model_name)
+            cached = self.embedding_cache.get(key)
+            if cached is not None:
+                return np.asarray(cached[0]["embeddings_float"], dtype=np.float32)
+
+        text_embeddings = self.text_embedding_model.generate_embedding(text)
+        if text_embeddings is None:
+            return None
+        text_embeddings = np.asarray(text_embeddings, dtype=np.float32)
+        if key is not None:
+            self.embedding_cache.put(key, [{"embeddings_float": text_embeddings}])
+        return text_embeddings
+
     def query_embedding_node(
         self,
         input: TaskInput,
         milvus: MilvusDatabase,
         video_collection_name: str,
         limit: int = 10,
+        partition_names: Optional[List[str]] = None,
     ) -> TaskOutput:
         video_embeddings = milvus.query_by_metadata(
             collection_name=video_collection_name,
             filter_metadata=f'video=="{input.video}"',
             output_fields=None,
             limit=limit,
+            partition_names=partition_names,
         )
         video_embeddings_extended = [
             {
@@ -98,79 +219,507 @@ class MultimodalEmbeddingModel:
         video_collection_name: str,
         text_collection_name: str,
         limit: int = 10,
+        search_params: Optional[Dict] = None,
+        category: Optional[str] = None,
     ) -> RetrievalOutput:
+        """
+        Videos similar to the seed video. `category` restricts the results to
+        videos of that category. `text_collection_name` is not searched here,
+        see `retrieve_hybrid_from_milvus` for the descriptions.
+        """
         logger.info(f"Retrieving similarity from milvus for the video {input.video}")
         # print(f"Retrieving similarity from milvus for the video {input.video}")
 
-        # Replace generate input video into filter due to
-        # the video already exist in our system and had been embedded
-        def _query():
-            task_output = self.query_embedding_node(
-                input, milvus, video_collection_name, limit=10
-            )
-
-            video_embeddings_float = [
-                embedding.embeddings_float
-                for embedding in task_output.video_embeddings
-                if embedding.embedding_scope == "video"
-                and embedding.video == input.video
-            ]
-            return task_output, video_embeddings_float
-
-        def _generate():
-            task_output = self.generate_embedding(input=input)
-
-            video_embeddings_float = [
-                embedding.embeddings_float
-                for embedding in task_output.video_embeddings
-                if embedding.embedding_scope == "video"
-                and embedding.video == input.video
-            ]
-            return task_output, video_embeddings_float
-
-        task_output, video_embeddings_float = _query()
+        # Only video-scope rows are usable results; keep clips out of the top-k
+        # so every shard returns `limit` videos. Collections partitioned by
+        # scope only search the video partition. The seed is dropped from the
+        # hits rather than filtered out, so searches for different seeds share
+        # one filter and can be batched together (MilvusSearchBatcher).
+        video_filter, partition_names = _video_search_scope(
+            milvus, video_collection_name, category
+        )
 
+        # Seed vectors never change once inserted, so repeated clicks on the
+        # same video skip the metadata query (see _seed_vector)
+        seed_vector = self._seed_vector(input, milvus, video_collection_name)
         # TODO: used for user's uploaded videos (in future)
-        if not video_embeddings_float:
-            # TODO hardcoded to generate embedding for user's uploaded video
-            video_embeddings_float = [input.video_embedding]
-
-        if not video_embeddings_float:
+        if seed_vector is None:
             raise ValueError("Error when generating video embedding")
 
         video_results = milvus.retrieve_similarity(
             video_collection_name,
-            video_embeddings_float,  # type:ignore
-            limit,
+            [seed_vector],
+            limit + 1,
             ["video", "embedding_scope", "embeddings_float"],
-            filter=f'video!="{input.video}"',
+            filter=video_filter,
+            partition_names=partition_names,
+            search_params=search_params,
         )
 
         results = {
             "videos": [],
             "text_list": [],
             "video_embeddings": [],
+            "distances": [],
             "milvus_uri": milvus.uri if milvus else None,
         }
         for video_result in video_results:
-            if video_result["entity"]["embedding_scope"] == "video":
+            if len(results["videos"]) == limit:
+                break
+            if (
+                video_result["entity"]["embedding_scope"] == "video"
+                and video_result["entity"]["video"] != input.video
+            ):
                 results["videos"].append(video_result["entity"]["video"])
                 results["video_embeddings"].append(
                     video_result["entity"]["embeddings_float"]
                 )
-
-        if task_output.text_embedding:
-            text_embedding_float = task_output.text_embedding.embeddings_float
-            text_results = milvus.retrieve_similarity(
-                text_collection_name,
-                [text_embedding_float],
-                limit,
-                ["text"],
-                filter=f"video!='{input.video}'",
-            )
-            text_list = [text_result["entity"]["text"] for text_result in text_results]
-            results["text_list"] = text_list
+                results["distances"].append(video_result["distance"])
 
         logger.info(f"Retrieved list of videos: {results['videos']}")
         # print(f"Retrieved list of videos: {results['videos']}")
         return RetrievalOutput(**results)
+
+    def retrieve_similarity_batch(
+        self,
+        inputs: List[TaskInput],
+        milvus: MilvusDatabase,
+        video_collection_name: str,
+        limit: int = 10,
+        search_params: Optional[Dict] = None,
+        category: Optional[str] = None,
+    ) -> List[RetrievalOutput]:
+        """
+        Similar videos for many seed videos (watch history, recommended tiles,
+        feed warm-up) with one multi-vector search instead of one per seed.
+
+        Seed vectors come from the inputs, the seed cache, or a single query
+        for all the remaining seeds. Each seed gets `limit + 1` hits so that
+        dropping the seed itself still leaves `limit` results. Seeds not found
+        in the collection get an empty result. Text retrieval is not batched.
+        """
+        scope_filter, partition_names = _video_search_scope(
+            milvus, video_collection_name
+        )
+
+        seed_vectors: Dict[str, np.ndarray] = {}
+        missing = []
+        for input in inputs:
+            if input.video_embedding is not None and len(input.video_embedding):
+                seed_vectors[input.video] = input.video_embedding
+                continue
+            cache_key = (milvus.uri, video_collection_name, input.video)
+            seed_vector = self.seed_vector_cache.get(cache_key)
+            if seed_vector is not None:
+                seed_vectors[input.video] = seed_vector
+            else:
+                missing.append(input.video)
+
+        if missing:
+            missing = list(dict.fromkeys(missing))
+            videos = ", ".join(f'"{video}"' for video in missing)
+            # Room for a second video-scope row per seed (e.g. after a re-ingest)
+            query_limit = 2 * len(missing)
+            rows = milvus.query_by_metadata(
+                collection_name=video_collection_name,
+                filter_metadata=" and ".join(
+                    filter(None, [f"video in [{videos}]", scope_filter])
+                ),
+                output_fields=["video", "embeddings_float"],
+                limit=query_limit,
+                partition_names=partition_names,
+            )
+            for row in rows:
+                if row["video"] in seed_vectors:
+                    continue
+                seed_vector = np.asarray(row["embeddings_float"], dtype=np.float32)
+                seed_vectors[row["video"]] = seed_vector
+                self.seed_vector_cache.put(
+                    (milvus.uri, video_collection_name, row["video"]), seed_vector
+                )
+            if len(rows) >= query_limit:
+                # Extra rows may have used up the limit: look up the rest one by one
+                for video in missing:
+                    if video not in seed_vectors:
+                        seed_vector = self._seed_vector(
+                            TaskInput(video=video), milvus, video_collection_name
+                        )
+                        if seed_vector is not None:
+                            seed_vectors[video] = seed_vector
+
+        seeds = [input.video for input in inputs if input.video in seed_vectors]
+        video_filter, _ = _video_search_scope(milvus, video_collection_name, category)
+        hits_per_seed = milvus.retrieve_similarity_batch(
+            video_collection_name,
+            [seed_vectors[seed] for seed in seeds],
+            limit + 1,
+            ["video", "embeddings_float"],
+            search_params=search_params,
+            filter=video_filter,
+            partition_names=partition_names,
+        )
+        hits_by_seed = dict(zip(seeds, hits_per_seed))
+
+        outputs = []
+        for input in inputs:
+            results = {
+                "videos": [],
+                "video_embeddings": [],
+                "distances": [],
+                "milvus_uri": milvus.uri,
+            }
+            for hit in hits_by_seed.get(input.video, []):
+                if hit["entity"]["video"] == input.video:
+                    continue
+                results["videos"].append(hit["entity"]["video"])
+                results["video_embeddings"].append(hit["entity"]["embeddings_float"])
+                results["distances"].append(hit["distance"])
+            for field in ["videos", "video_embeddings", "distances"]:
+                results[field] = results[field][:limit]
+            outputs.append(RetrievalOutput(**results))
+        logger.info(
+            f"Retrieved similar videos for {len(seeds)}/{len(inputs)} seeds "
+            f"in one search"
+        )
+        return outputs
+
+    def embed_query_text(self, text: str) -> np.ndarray:
+        """
+        Embedding of a search query. Queries that only differ in case, Unicode
+        form or whitespace share one embedding, computed once and then served
+        from memory (and from the embedding cache across restarts).
+        """
+        query = normalize_query_text(text)
+        if not query:
+            raise ValueError("Empty text query")
+        query_vector = self.text_query_cache.get(query)
+        if query_vector is None:
+            query_vector = self._embed_text(query)
+            if query_vector is None:
+                raise ValueError(f"Error when generating text embedding for {text!r}")
+            self.text_query_cache.put(query, query_vector)
+        return query_vector
+
+    def retrieve_videos_by_text(
+        self,
+        text: str,
+        milvus: MilvusDatabase,
+        video_collection_name: str,
+        limit: int = 10,
+        search_params: Optional[Dict] = None,
+        category: Optional[str] = None,
+    ) -> RetrievalOutput:
+        """
+        Videos ranked by the similarity of their video-scope embedding to the
+        text query (text and video embeddings share one space).
+        """
+        query_vector = self.embed_query_text(text)
+
+        video_filter, partition_names = _video_search_scope(
+            milvus, video_collection_name, category
+        )
+
+        hits = milvus.retrieve_similarity(
+            video_collection_name,
+            [query_vector],
+            limit,
+            ["video", "embeddings_float"],
+            filter=video_filter,
+            partition_names=partition_names,
+            search_params=search_params,
+        )
+        results = {
+            "videos": [hit["entity"]["video"] for hit in hits],
+            "video_embeddings": [hit["entity"]["embeddings_float"] for hit in hits],
+            "distances": [hit["distance"] for hit in hits],
+            "milvus_uri": milvus.uri,
+        }
+        logger.info(f"Retrieved videos for text query {text!r}: {results['videos']}")
+        return RetrievalOutput(**results)
+
+    def retrieve_hybrid_from_milvus(
+        self,
+        input: TaskInput,
+        milvus: MilvusDatabase,
+        video_collection_name: str,
+        text_collection_name: str,
+        limit: int = 10,
+        fusion: str = "rrf",
+        video_weight: float = 1.0,
+        text_weight: float = 1.0,
+        search_params: Optional[Dict] = None,
+        category: Optional[str] = None,
+    ) -> HybridRetrievalOutput:
+        """
+        One ranked list of videos from the video and the text collections.
+
+        The seed video's embedding is searched in the video collection while,
+        in parallel, the text query (`input.text`, or else the seed's stored
+        description) is searched in the text collection. Text hits are joined
+        to their videos through the `video` field of the text rows, and both
+        lists are fused with `fuse_rankings` ("rrf" or "weighted"), so the
+        latency is that of the slower search rather than the sum of both.
+        """
+        if fusion not in FUSION_METHODS:
+            raise ValueError(
+                f"Unsupported fusion {fusion}, use one of {FUSION_METHODS}"
+            )
+        n_candidates = limit * HYBRID_OVERSAMPLE
+        video_future = self.search_executor.submit(
+            self._hybrid_video_hits,
+            input,
+            milvus,
+            video_collection_name,
+            n_candidates,
+            search_params,
+            category,
+        )
+        text_future = self.search_executor.submit(
+            self._hybrid_text_hits,
+            input,
+            milvus,
+            text_collection_name,
+            n_candidates,
+            category,
+        )
+        video_hits, text_hits = video_future.result(), text_future.result()
+        if video_hits is None and text_hits is None:
+            raise ValueError(f"No embedding and no text to search for {input.video}")
+        video_hits, text_hits = video_hits or {}, text_hits or {}
+
+        index = milvus.index_spec(video_collection_name)
+        fused = fuse_rankings(
+            [
+                [(video, hit["distance"]) for video, hit in video_hits.items()],
+                [(video, hit["distance"]) for video, hit in text_hits.items()],
+            ],
+            fusion,
+            [video_weight, text_weight],
+            higher_is_better=index is None or index.higher_is_better,
+            rrf_k=HYBRID_RRF_K,
+        )[:limit]
+
+        results = {
+            "videos": [],
+            "text_list": [],
+            "video_embeddings": [],
+            "distances": [],
+            "video_distances": [],
+            "text_distances": [],
+            "milvus_uri": milvus.uri,
+        }
+        for video, score in fused:
+            video_hit, text_hit = video_hits.get(video), text_hits.get(video)
+            results["videos"].append(video)
+            results["distances"].append(score)
+            results["video_embeddings"].append(
+                video_hit["entity"]["embeddings_float"] if video_hit else []
+            )
+            results["text_list"].append(text_hit["entity"]["text"] if text_hit else "")
+            results["video_distances"].append(
+                video_hit["distance"] if video_hit else None
+            )
+            results["text_distances"].append(text_hit["distance"] if text_hit else None)
+        logger.info(
+            f"Fused {len(video_hits)} video and {len(text_hits)} text hits ({fusion}): "
+            f"{results['videos']}"
+        )
+        return HybridRetrievalOutput(**results)
+
+    def _hybrid_video_hits(
+        self,
+        input: TaskInput,
+        milvus: MilvusDatabase,
+        video_collection_name: str,
+        limit: int,
+        search_params: Optional[Dict],
+        category: Optional[str],
+    ) -> Optional[Dict[str, Dict]]:
+        """Video-scope hits by video, best first; None without a seed vector."""
+        seed_vector = self._seed_vector(input, milvus, video_collection_name)
+        if seed_vector is None:
+            return None
+        # The seed is dropped from the hits so the filter can be shared (see
+        # retrieve_similarity_from_milvus)
+        video_filter, partition_names = _video_search_scope(
+            milvus, video_collection_name, category
+        )
+        hits = milvus.retrieve_similarity(
+            video_collection_name,
+            [seed_vector],
+            limit + 1,
+            ["video", "embeddings_float"],
+            filter=video_filter,
+            partition_names=partition_names,
+            search_params=search_params,
+        )
+        hits = [hit for hit in hits if hit["entity"]["video"] != input.video]
+        return {hit["entity"]["video"]: hit for hit in hits[:limit]}
+
+    def _hybrid_text_hits(
+        self,
+        input: TaskInput,
+        milvus: MilvusDatabase,
+        text_collection_name: str,
+        limit: int,
+        category: Optional[str],
+    ) -> Optional[Dict[str, Dict]]:
+        """
+        Description hits by video (the best one per video), best first; None
+        without a text query or stored description.
+        """
+        if input.text and normalize_query_text(input.text):
+            text_vector = self.embed_query_text(input.text)
+        else:
+            rows = milvus.query_by_metadata(
+                collection_name=text_collection_name,
+                filter_metadata=f'video=="{input.video}"',
+                output_fields=["embeddings_float"],
+                limit=1,
+            )
+            if not rows:
+                return None
+            text_vector = np.asarray(rows[0]["embeddings_float"], dtype=np.float32)
+
+        # Rows stored before descriptions had a video cannot be joined
+        text_filter = 'video!=""'
+        if category:
+            text_filter += f' and category=="{category}"'
+        hits = milvus.retrieve_similarity(
+            text_collection_name,
+            [text_vector],
+            limit + 1,
+            ["video", "text"],
+            filter=text_filter,
+        )
+        hits = [hit for hit in hits if hit["entity"]["video"] != input.video]
+        text_hits: Dict[str, Dict] = {}
+        for hit in hits[:limit]:
+            text_hits.setdefault(hit["entity"]["video"], hit)
+        return text_hits
+
+    def retrieve_clips_from_milvus(
+        self,
+        input: TaskInput,
+        milvus: MilvusDatabase,
+        video_collection_name: str,
+        limit: int = 10,
+        aggregation: str = "max",
+        top_m: int = 3,
+        clips_per_video: int = 3,
+        search_params: Optional[Dict] = None,
+        category: Optional[str] = None,
+        group_by: bool = CLIP_SEARCH_GROUP_BY,
+    ) -> ClipRetrievalOutput:
+        """
+        Videos whose clips best match the seed video, with the time ranges
+        that matched.
+
+        Clip rows are searched for up to `CLIP_HITS_PER_VIDEO` hits per
+        candidate video, and videos are ranked by the `aggregation` of their
+        clip scores ("max", "mean" or "top_m", see `aggregate_clip_hits`).
+        `limit * CLIP_GROUP_OVERSAMPLE` candidate videos are considered. With
+        `group_by`, Milvus groups the hits by video instead (one group per
+        candidate video); Milvus Lite may skip good groups when grouping, so
+        it is off by default. The seed video itself is excluded.
+        """
+        if aggregation not in CLIP_AGGREGATIONS:
+            raise ValueError(
+                f"Unsupported aggregation {aggregation}, use one of {CLIP_AGGREGATIONS}"
+            )
+        seed_vector = self._seed_vector(input, milvus, video_collection_name)
+        if seed_vector is None:
+            raise ValueError("Error when generating video embedding")
+
+        scope_filter, partition_names = _video_search_scope(
+            milvus, video_collection_name, category, scope="clip"
+        )
+        clip_filter = " and ".join(
+            filter(None, [f'video!="{input.video}"', scope_filter])
+        )
+
+        n_videos = limit * CLIP_GROUP_OVERSAMPLE
+        search_kwargs = {}
+        if group_by:
+            group_size = clips_per_video
+            if aggregation == "mean":
+                group_size = max(clips_per_video, CLIP_HITS_PER_VIDEO)
+            elif aggregation == "top_m":
+                group_size = max(clips_per_video, top_m)
+            search_kwargs = {
+                "group_by_field": "video",
+                "group_size": group_size,
+                "strict_group_size": False,
+            }
+        else:
+            # Milvus caps the top-k of a search at 16384
+            n_videos = min(n_videos * CLIP_HITS_PER_VIDEO, 16384)
+
+        hits = milvus.retrieve_similarity(
+            video_collection_name,
+            [seed_vector],
+            n_videos,
+            ["video", "start_offset_sec", "end_offset_sec"],
+            filter=clip_filter,
+            partition_names=partition_names,
+            search_params=search_params,
+            **search_kwargs,
+        )
+
+        index = milvus.index_spec(video_collection_name)
+        ranked = aggregate_clip_hits(
+            [hit["entity"]["video"] for hit in hits],
+            [hit["distance"] for hit in hits],
+            aggregation,
+            top_m,
+            higher_is_better=index is None or index.higher_is_better,
+        )[:limit]
+
+        results = {
+            "videos": [],
+            "distances": [],
+            "segments": [],
+            "milvus_uri": milvus.uri,
+        }
+        for video, score, hit_indices in ranked:
+            results["videos"].append(video)
+            results["distances"].append(score)
+            results["segments"].append([
+                ClipSegment(
+                    start_offset_sec=hits[i]["entity"]["start_offset_sec"],
+                    end_offset_sec=hits[i]["entity"]["end_offset_sec"],
+                    distance=hits[i]["distance"],
+                )
+                for i in hit_indices[:clips_per_video]
+            ])
+        logger.info(
+            f"Retrieved {len(ranked)} videos from {len(hits)} clip hits ({aggregation})"
+        )
+        return ClipRetrievalOutput(**results)
+
+    def _seed_vector(
+        self, input: TaskInput, milvus: MilvusDatabase, video_collection_name: str
+    ) -> Optional[np.ndarray]:
+        """Video-scope vector of the seed: from the input, the cache or Milvus."""
+        if input.video_embedding is not None and len(input.video_embedding):
+            return input.video_embedding
+        cache_key = (milvus.uri, video_collection_name, input.video)
+        seed_vector = self.seed_vector_cache.get(cache_key)
+        if seed_vector is None:
+            scope_filter, partition_names = _video_search_scope(
+                milvus, video_collection_name
+            )
+            rows = milvus.query_by_metadata(
+                collection_name=video_collection_name,
+                filter_metadata=" and ".join(
+                    filter(None, [f'video=="{input.video}"', scope_filter])
+                ),
+                output_fields=["embeddings_float"],
+                limit=1,
+                partition_names=partition_names,
+            )
+            if not rows:
+                return None
+            seed_vector = np.asarray(rows[0]["embeddings_float"], dtype=np.float32)
+            self.seed_vector_cache.put(cache_key, seed_vector)
+        return seed_vector
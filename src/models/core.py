@@ -1,10 +1,36 @@
 import os
+import threading
+
 from dotenv import load_dotenv
-from twelvelabs import TwelveLabs
 
 
 load_dotenv(override=True)
-_TWELVE_LABS_API_KEY = os.getenv("TWELVE_LABS_API_KEY", "")
-twelvelabs_client = TwelveLabs(api_key=_TWELVE_LABS_API_KEY)
 
 model_name = "Marengo-retrieval-2.7"
+video_embedding_scopes = ["clip", "video"]
+
+_twelvelabs_client = None
+_twelvelabs_client_lock = threading.Lock()
+
+
+def get_twelvelabs_client():
+    """
+    Shared TwelveLabs client, created on first use: apps that only retrieve
+    never import the SDK or need an API key.
+    """
+    global _twelvelabs_client
+    with _twelvelabs_client_lock:
+        if _twelvelabs_client is None:
+            from twelvelabs import TwelveLabs
+
+            _twelvelabs_client = TwelveLabs(
+                api_key=os.getenv("TWELVE_LABS_API_KEY", "")
+            )
+    return _twelvelabs_client
+
+
+def __getattr__(name: str):
+    # `twelvelabs_client` used to be a module attribute created at import time
+    if name == "twelvelabs_client":
+        return get_twelvelabs_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from ..utils.cache import LRUCache
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _pack_embeddings(embeddings: List[Dict]) -> Tuple[str, bytes]:
+    """Split segments into JSON metadata and one float32 blob of all vectors."""
+    vectors = []
+    metadata = []
+    for embedding in embeddings:
+        vector = embedding.get("embeddings_float")
+        vector = np.asarray([] if vector is None else vector, dtype=np.float32)
+        vectors.append(vector)
+        metadata.append({
+            **{k: v for k, v in embedding.items() if k != "embeddings_float"},
+            "dimension": len(vector),
+        })
+    blob = np.concatenate(vectors).tobytes() if vectors else b""
+    return json.dumps(metadata), blob
+
+
+def _unpack_embeddings(metadata_json: str, blob: bytes) -> List[Dict]:
+    # Read-only float32 views into the blob, no per-float conversion
+    vectors = np.frombuffer(blob, dtype=np.float32)
+    embeddings = []
+    offset = 0
+    for metadata in json.loads(metadata_json):
+        dimension = metadata.pop("dimension")
+        embeddings.append({
+            **metadata,
+            "embeddings_float": vectors[offset : offset + dimension],
+        })
+        offset += dimension
+    return embeddings
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by the content of the embedded media.
+
+    Video entries are keyed by a SHA-256 of the file bytes plus the model name
+    and embedding scopes, so a clip that was already embedded (under any path)
+    never needs a new Twelve Labs task. Text entries are keyed by the text
+    itself. Entries live in a SQLite file; once its payload exceeds
+    `max_bytes` the least recently used entries are evicted. File hashes are
+    memoized for the `hash_cache_size` most recently hashed files.
+    """
+
+    def __init__(
+        self,
+        path: str = "embedding_cache.db",
+        max_bytes: int = 1 << 30,
+        hash_cache_size: int = 10000,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # (path, mtime, size) -> SHA-256 of the file
+        self._file_hashes: LRUCache[str] = LRUCache(hash_cache_size)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " metadata TEXT NOT NULL,"
+            " vectors BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access"
+            " ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        (self.total_bytes,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()
+
+    def file_digest(self, video_file: str) -> str:
+        """SHA-256 of a file, memoized per (path, mtime, size)."""
+        stat = os.stat(video_file)
+        identity = (os.path.abspath(video_file), stat.st_mtime_ns, stat.st_size)
+        digest = self._file_hashes.get(identity)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(video_file, "rb") as file:
+                for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._file_hashes.put(identity, digest)
+        return digest
+
+    def video_key(self, video_file: str, model_name: str, scopes: Iterable[str]) -> str:
+        digest = self.file_digest(video_file)
+        return f"video:{model_name}:{','.join(sorted(scopes))}:{digest}"
+
+    def text_key(self, text: str, model_name: str) -> str:
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return f"text:{model_name}:{digest}"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata, vectors FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self.hits += 1
+        return _unpack_embeddings(*row)
+
+    def put(self, key: str, embeddings: List[Dict]):
+        metadata, vectors = _pack_embeddings(embeddings)
+        size = len(metadata) + len(vectors)
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)",
+                (key, metadata, vectors, size, time.time()),
+            )
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM embeddings WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "bytes": self.total_bytes,
+        }
+
+    def log_stats(self):
+        logger.info(f"Embedding cache {self.path}: {self.stats()}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
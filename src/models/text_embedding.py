@@ -1,11 +1,16 @@
+import unicodedata
 from typing import List
 
-from .core import model_name, twelvelabs_client
+from .core import get_twelvelabs_client, model_name
 
 
 class TextEmbeddingModel:
-    def __init__(self):
-        self.twelvelabs_client = twelvelabs_client
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def twelvelabs_client(self):
+        return self._client or get_twelvelabs_client()
 
     def generate_embedding(self, text: str) -> List[List[float]]:
         res = self.twelvelabs_client.embed.create(model_name=model_name, text=text)
@@ -16,3 +21,8 @@ class TextEmbeddingModel:
             return embeddings[0]
         else:
             return None
+
+
+def normalize_query_text(text: str) -> str:
+    """Unicode-normalized, case-folded text with collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
@@ -1,19 +1,24 @@
 from loguru import logger
-from typing import Dict, List, Tuple, Optional
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional
 
-from twelvelabs.models.embed import EmbeddingsTask
-
-from .core import model_name, twelvelabs_client
+from .core import get_twelvelabs_client, model_name, video_embedding_scopes
 from ..utils.process_video import upscale_video_resolution, get_video_duration
 
+if TYPE_CHECKING:
+    from twelvelabs.models.embed import EmbeddingsTask
+
 
 class VideoEmbeddingModel:
-    def __init__(self):
-        self.twelvelabs_client = twelvelabs_client
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def twelvelabs_client(self):
+        return self._client or get_twelvelabs_client()
 
     def generate_embedding_url(
         self, video_url: str
-    ) -> Tuple[List[Dict], EmbeddingsTask]:
+    ) -> Tuple[List[Dict], "EmbeddingsTask"]:
         """
         Generate embeddings for a given video URL using the Twelve Labs API.
 
@@ -39,54 +44,12 @@ class VideoEmbeddingModel:
             execution, or retrieval.
         """
 
-        # Create an embedding task
-        video_duration = get_video_duration(video_url)
-
-        if not video_duration:
-            task = self.twelvelabs_client.embed.task.create(
-                model_name=model_name,
-                video_url=video_url,
-                video_embedding_scopes=["clip", "video"],
-            )
-        else:
-            task = self.twelvelabs_client.embed.task.create(
-                model_name=model_name,
-                video_url=video_url,
-                video_start_offset_sec=0,
-                video_end_offset_sec=video_duration,
-                video_embedding_scopes=["clip", "video"],
-            )
-
-        logger.info(
-            f"Created task: id={task.id} model_name={task.model_name} status={task.status}"
-        )
-
-        # Define a callback function to monitor task progress
-        def on_task_update(task: EmbeddingsTask):
-            logger.info(f"  Status={task.status}")
-
-        # Wait for the task to complete
-        status = task.wait_for_done(sleep_interval=2, callback=on_task_update)
-        logger.info(f"Embedding done: {status}")
-
-        # Retrieve the task result
-        task_result = self.twelvelabs_client.embed.task.retrieve(task.id)
-
-        # Extract and return the embeddings
-        embeddings = []
-        for v in task_result.video_embedding.segments:
-            embeddings.append({
-                "embeddings_float": v.embeddings_float,
-                "start_offset_sec": v.start_offset_sec,
-                "end_offset_sec": v.end_offset_sec,
-                "embedding_scope": v.embedding_scope,
-            })
-
-        return embeddings, task_result
+        task = self.create_embedding_task(video_url=video_url)
+        return self._wait_and_retrieve(task)
 
     def generate_embedding_file(
         self, video_file: str
-    ) -> Tuple[List[Dict], EmbeddingsTask]:
+    ) -> Tuple[List[Dict], "EmbeddingsTask"]:
         """
         Generate embeddings for a given video file using the Twelve Labs API.
 
@@ -120,40 +83,55 @@ class VideoEmbeddingModel:
             - File size: Must not exceed 2 GB.
         """
 
-        # Create an embedding task
-        video_duration = get_video_duration(video_file)
+        task = self.create_embedding_task(video_file=video_file)
+        return self._wait_and_retrieve(task)
+
+    def create_embedding_task(
+        self,
+        video_file: Optional[str] = None,
+        video_url: Optional[str] = None,
+    ) -> "EmbeddingsTask":
+        """
+        Create (but do not wait for) an embedding task for a video file or URL.
+
+        The returned task can be polled with `task_status` and, once it is
+        "ready", its embeddings can be fetched with `retrieve_embeddings`.
+        """
+        if (video_file is None) == (video_url is None):
+            raise ValueError("Exactly one of video_file or video_url is required.")
+
+        video_source = {"video_file": video_file, "video_url": video_url}
+        video_source = {k: v for k, v in video_source.items() if v is not None}
+
+        video_duration = get_video_duration(video_file or video_url)
 
         if not video_duration:
             task = self.twelvelabs_client.embed.task.create(
                 model_name=model_name,
-                video_file=video_file,
-                video_embedding_scopes=["clip", "video"],
+                **video_source,
+                video_embedding_scopes=video_embedding_scopes,
             )
         else:
             task = self.twelvelabs_client.embed.task.create(
                 model_name=model_name,
-                video_file=video_file,
+                **video_source,
                 video_start_offset_sec=0,
                 video_end_offset_sec=video_duration,
-                video_embedding_scopes=["clip", "video"],
+                video_embedding_scopes=video_embedding_scopes,
             )
 
         logger.info(
             f"Created task: id={task.id} model_name={task.model_name} status={task.status}"
         )
+        return task
 
-        # Define a callback function to monitor task progress
-        def on_task_update(task: EmbeddingsTask):
-            logger.info(f"  Status={task.status}")
+    def task_status(self, task_id: str) -> str:
+        return self.twelvelabs_client.embed.task.status(task_id).status
 
-        # Wait for the task to complete
-        status = task.wait_for_done(sleep_interval=2, callback=on_task_update)
-        logger.info(f"Embedding done: {status}")
-
-        # Retrieve the task result
-        task_result = self.twelvelabs_client.embed.task.retrieve(task.id)
+    def retrieve_embeddings(self, task_id: str) -> Tuple[List[Dict], "EmbeddingsTask"]:
+        """Retrieve a finished task and extract its embeddings and metadata."""
+        task_result = self.twelvelabs_client.embed.task.retrieve(task_id)
 
-        # Extract and return the embeddings
         embeddings = []
         for v in task_result.video_embedding.segments:
             embeddings.append({
@@ -165,5 +143,19 @@ class VideoEmbeddingModel:
 
         return embeddings, task_result
 
+    def _wait_and_retrieve(
+        self, task: "EmbeddingsTask"
+    ) -> Tuple[List[Dict], "EmbeddingsTask"]:
+        # Define a callback function to monitor task progress
+        def on_task_update(task: "EmbeddingsTask"):
+            logger.info(f"  Status={task.status}")
+
+        # Wait for the task to complete
+        status = task.wait_for_done(sleep_interval=2, callback=on_task_update)
+        logger.info(f"Embedding done: {status}")
+
+        # Retrieve the task result and extract the embeddings
+        return self.retrieve_embeddings(task.id)
+
     def preprocess_video(self, video_url: str) -> str:
         return upscale_video_resolution(video_url)
@@ -0,0 +1,344 @@
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import numpy as np
+from loguru import logger
+
+from .milvus import MilvusDatabase
+from .schemas.output import RetrievalOutput
+
+T = TypeVar("T")
+
+
+class RankedVideo(NamedTuple):
+    video: str
+    distance: float
+    embedding: np.ndarray
+    milvus_uri: str
+
+
+def iter_ranked(output: RetrievalOutput) -> Iterator[RankedVideo]:
+    for video, distance, embedding in zip(
+        output.videos, output.distances, output.video_embeddings
+    ):
+        yield RankedVideo(video, distance, embedding, output.milvus_uri)
+
+
+def merge_top_k(
+    outputs: Iterable[RetrievalOutput],
+    k: int,
+    higher_is_better: bool = True,
+) -> List[RankedVideo]:
+    """
+    Merge per-shard results into one global top-k ranking.
+
+    Each shard's list is already ranked, so a lazy k-way heap merge only looks
+    at as many entries as needed to emit `k` distinct videos. A video returned
+    by several shards keeps its best score. With COSINE/IP metrics a higher
+    distance is more similar; pass `higher_is_better=False` for L2.
+    """
+    shard_lists = [
+        sorted(iter_ranked(output), key=lambda r: r.distance, reverse=higher_is_better)
+        for output in outputs
+    ]
+
+    top_k: List[RankedVideo] = []
+    seen = set()
+    for ranked in heapq.merge(
+        *shard_lists, key=lambda r: r.distance, reverse=higher_is_better
+    ):
+        if ranked.video in seen:
+            continue
+        seen.add(ranked.video)
+        top_k.append(ranked)
+        if len(top_k) == k:
+            break
+    return top_k
+
+
+CLIP_AGGREGATIONS = ("max", "mean", "top_m")
+
+
+def aggregate_clip_hits(
+    videos: Sequence[str],
+    distances: Sequence[float],
+    aggregation: str = "max",
+    top_m: int = 3,
+    higher_is_better: bool = True,
+) -> List[Tuple[str, float, np.ndarray]]:
+    """
+    Rank videos by the scores of their clip hits, in one vectorized pass.
+
+    `aggregation` is "max" (best clip), "mean" (all the video's hits) or
+    "top_m" (mean of its best `top_m` hits; fewer if it has fewer). Returns
+    (video, score, hit indices best first) per video, best video first.
+    """
+    if aggregation not in CLIP_AGGREGATIONS:
+        raise ValueError(
+            f"Unsupported aggregation {aggregation}, use one of {CLIP_AGGREGATIONS}"
+        )
+    if not len(videos):
+        return []
+
+    names, codes = np.unique(np.asarray(videos, dtype=object), return_inverse=True)
+    # Work with "higher is better" scores whatever the metric
+    sign = 1.0 if higher_is_better else -1.0
+    scores = sign * np.asarray(distances, dtype=np.float64)
+
+    # Hits grouped by video, best first within each video
+    order = np.lexsort((-scores, codes))
+    sorted_codes, sorted_scores = codes[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+
+    if aggregation == "max":
+        aggregated = sorted_scores[starts]
+    elif aggregation == "mean":
+        aggregated = np.add.reduceat(sorted_scores, starts) / counts
+    else:
+        rank = np.arange(len(order)) - np.repeat(starts, counts)
+        best = rank < top_m
+        aggregated = np.bincount(
+            sorted_codes[best], sorted_scores[best], minlength=len(names)
+        )[sorted_codes[starts]] / np.minimum(counts, top_m)
+
+    ranked = []
+    for group in np.argsort(-aggregated, kind="stable"):
+        start = starts[group]
+        ranked.append((
+            names[sorted_codes[start]],
+            float(sign * aggregated[group]),
+            order[start : start + counts[group]],
+        ))
+    return ranked
+
+
+FUSION_METHODS = ("rrf", "weighted")
+
+
+def fuse_rankings(
+    rankings: Sequence[Sequence[Tuple[str, float]]],
+    method: str = "rrf",
+    weights: Optional[Sequence[float]] = None,
+    higher_is_better: bool = True,
+    rrf_k: int = 60,
+) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked (video, distance) lists into one ranking, best first.
+
+    "rrf" (reciprocal rank fusion) scores a video with the sum over lists of
+    weight / (rrf_k + rank), so only ranks matter and the lists need not be
+    on the same scale. "weighted" min-max normalizes each list's distances
+    to [0, 1] (1 = best) and sums them times their weight. A video missing
+    from a list gets nothing from it. Fused scores are higher-is-better.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unsupported fusion {method}, use one of {FUSION_METHODS}")
+    weights = weights or [1.0] * len(rankings)
+
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        if method == "rrf":
+            for rank, (video, _) in enumerate(ranking, start=1):
+                fused[video] = fused.get(video, 0.0) + weight / (rrf_k + rank)
+            continue
+        distances = np.array([distance for _, distance in ranking], dtype=np.float64)
+        if not higher_is_better:
+            distances = -distances
+        spread = distances.max() - distances.min()
+        normalized = np.ones_like(distances)
+        if spread:
+            normalized = (distances - distances.min()) / spread
+        for (video, _), score in zip(ranking, normalized):
+            fused[video] = fused.get(video, 0.0) + weight * float(score)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class ShardLatencyTracker:
+    """Sliding window of recent per-shard latencies."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, shard: str, latency_sec: float):
+        with self._lock:
+            self._latencies.setdefault(shard, deque(maxlen=self.window)).append(
+                latency_sec
+            )
+
+    def percentile(self, shard: str, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies.get(shard, ()))
+        if len(latencies) < max(min_samples, 1):
+            return None
+        index = min(len(latencies) - 1, int(q * len(latencies)))
+        return latencies[index]
+
+
+@dataclass
+class FanoutResult(Generic[T]):
+    # shard uri -> (instance that answered, result)
+    results: Dict[str, Tuple[MilvusDatabase, T]] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    hedged: List[str] = field(default_factory=list)
+
+
+class ShardFanout:
+    """
+    Scatter a call to every shard on a long-lived thread pool.
+
+    Shards that have not answered within `timeout_sec` are reported as timed
+    out and the partial results are returned. If a shard has replicas and
+    is still running after its own p95 latency, the same call is sent to a
+    replica (hedged request) and whichever answers first is used.
+    """
+
+    def __init__(
+        self,
+        shards: List[MilvusDatabase],
+        replicas: Optional[Dict[str, List[MilvusDatabase]]] = None,
+        timeout_sec: Optional[float] = 2.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        max_workers: Optional[int] = None,
+    ):
+        self.shards = shards
+        self.replicas = replicas or {}
+        self.timeout_sec = timeout_sec
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = ShardLatencyTracker()
+
+        n_instances = len(shards) + sum(len(r) for r in self.replicas.values())
+        # Threads of timed-out calls stay busy until Milvus answers, so leave
+        # headroom for stragglers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(4, 4 * n_instances),
+            thread_name_prefix="shard-fanout",
+        )
+
+    def run(
+        self,
+        fn: Callable[[MilvusDatabase], T],
+        timeout_sec: Optional[float] = None,
+    ) -> FanoutResult[T]:
+        timeout_sec = self.timeout_sec if timeout_sec is None else timeout_sec
+        start = time.monotonic()
+        deadline = start + timeout_sec if timeout_sec is not None else None
+
+        result: FanoutResult[T] = FanoutResult()
+        futures: Dict[Future, Tuple[str, MilvusDatabase]] = {}
+        hedge_at: Dict[str, float] = {}
+        errors: Dict[str, List[str]] = {}
+        untried = {uri: list(replicas) for uri, replicas in self.replicas.items()}
+
+        for shard in self.shards:
+            futures[self._submit(fn, shard)] = (shard.uri, shard)
+            p95 = self.latencies.percentile(
+                shard.uri, self.hedge_quantile, self.hedge_min_samples
+            )
+            if self.hedge and self.replicas.get(shard.uri) and p95 is not None:
+                hedge_at[shard.uri] = start + p95
+
+        def unresolved() -> List[str]:
+            return [
+                s.uri
+                for s in self.shards
+                if s.uri not in result.results and s.uri not in result.failed
+            ]
+
+        while unresolved():
+            pending = [f for f, (uri, _) in futures.items() if uri in unresolved()]
+            now = time.monotonic()
+            wake_up = [t for uri, t in hedge_at.items() if uri in unresolved()]
+            if deadline is not None:
+                wake_up.append(deadline)
+            timeout = max(0.0, min(wake_up) - now) if wake_up else None
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                uri, instance = futures.pop(future)
+                if uri in result.results:
+                    continue  # the other copy of a hedged request won
+                try:
+                    result.results[uri] = (instance, future.result())
+                except Exception as e:
+                    errors.setdefault(uri, []).append(f"{instance.uri}: {e}")
+                    if any(u == uri for u, _ in futures.values()):
+                        continue  # another copy is still running
+                    if untried.get(uri):
+                        # Fail over to a replica right away
+                        replica = untried[uri].pop(0)
+                        futures[self._submit(fn, replica, uri)] = (uri, replica)
+                    else:
+                        result.failed[uri] = "; ".join(errors[uri])
+
+            now = time.monotonic()
+            for uri in [u for u, t in hedge_at.items() if t <= now]:
+                del hedge_at[uri]
+                if uri in unresolved() and untried.get(uri):
+                    replica = untried[uri].pop(0)
+                    logger.info(f"Hedging slow shard {uri} to replica {replica.uri}")
+                    futures[self._submit(fn, replica, uri)] = (uri, replica)
+                    result.hedged.append(uri)
+
+            if deadline is not None and now >= deadline:
+                result.timed_out = unresolved()
+                break
+
+        if result.timed_out:
+            logger.warning(f"Shards timed out after {timeout_sec}s: {result.timed_out}")
+        return result
+
+    def _submit(
+        self,
+        fn: Callable[[MilvusDatabase], T],
+        instance: MilvusDatabase,
+        shard_uri: Optional[str] = None,
+    ) -> Future:
+        shard_uri = shard_uri or instance.uri
+        start = time.monotonic()
+        future = self.executor.submit(fn, instance)
+        # Latency is recorded even for calls that finish after the deadline,
+        # so slow shards keep their p95 up to date
+        future.add_done_callback(
+            lambda _: self.latencies.record(shard_uri, time.monotonic() - start)
+        )
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_replicas(value: str) -> Dict[str, List[str]]:
+    """Parse "primary=replica1|replica2,primary2=replica3" into a mapping."""
+    replicas: Dict[str, List[str]] = {}
+    for entry in filter(None, (e.strip() for e in value.split(","))):
+        primary, _, urls = entry.partition("=")
+        replicas[primary.strip()] = [u.strip() for u in urls.split("|") if u.strip()]
+    return replicas
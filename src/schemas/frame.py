@@ -0,0 +1,71 @@
+import json
+import struct
+from typing import Any, List
+
+import numpy as np
+from pydantic import BaseModel
+
+# Accept / Content-Type of binary responses from the retrieval service
+FRAME_MEDIA_TYPE = "application/octet-stream"
+
+_MAGIC = b"EMBFRM01"
+_HEADER_LENGTH = struct.Struct("<I")
+_VECTOR_KEY = "$vector"
+
+
+def encode_frame(model: BaseModel) -> bytes:
+    """
+    Binary form of a response model: the vectors travel as raw float32 bytes
+    instead of base64 strings inside the JSON.
+
+    A frame is a magic string, the length of a JSON header, the header, and
+    every vector of the model concatenated as little-endian float32. The
+    header is the model's data with each vector replaced by
+    {"$vector": [offset, length]}, counted in floats from the start of the
+    vectors.
+    """
+    vectors: List[np.ndarray] = []
+    n_floats = 0
+
+    def strip(value: Any) -> Any:
+        nonlocal n_floats
+        if isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value, dtype="<f4")
+            vectors.append(array)
+            n_floats += len(array)
+            return {_VECTOR_KEY: [n_floats - len(array), len(array)]}
+        if isinstance(value, dict):
+            return {key: strip(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [strip(item) for item in value]
+        return value
+
+    header = json.dumps(strip(model.model_dump()), separators=(",", ":")).encode()
+    # Pad so the vectors start 4-byte aligned and can be viewed in place
+    header += b" " * (-len(header) % 4)
+    return b"".join([_MAGIC, _HEADER_LENGTH.pack(len(header)), header, *vectors])
+
+
+def decode_frame(data: bytes) -> Any:
+    """
+    Data of a frame made by `encode_frame`, ready for `Model.model_validate`.
+    Vectors are float32 views of `data`, not copies.
+    """
+    if data[: len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not an embedding frame")
+    (header_length,) = _HEADER_LENGTH.unpack_from(data, len(_MAGIC))
+    start = len(_MAGIC) + _HEADER_LENGTH.size
+    header = json.loads(data[start : start + header_length])
+    floats = np.frombuffer(data, dtype="<f4", offset=start + header_length)
+
+    def restore(value: Any) -> Any:
+        if isinstance(value, dict):
+            if len(value) == 1 and _VECTOR_KEY in value:
+                offset, length = value[_VECTOR_KEY]
+                return floats[offset : offset + length]
+            return {key: restore(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [restore(item) for item in value]
+        return value
+
+    return restore(header)
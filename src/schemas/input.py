@@ -1,22 +1,32 @@
 from typing import Optional
 
 from pydantic import BaseModel, Field, model_validator
-from ..utils.validate_video import is_valid_video_url, is_valid_video_file
+from .vector import Embedding
+from ..utils.validate_video import (
+    ValidationLevel,
+    is_valid_video_file,
+    is_valid_video_url,
+)
 
 
 class TaskInput(BaseModel):
     video: str
-    video_embedding: Optional[list[float]] = None  # Optional, can be set later
+    video_embedding: Optional[Embedding] = None  # Optional, can be set later
     video_type: str = Field(default="file")  # automatically set based on validator
     text: str | None = None
+    category: str | None = None  # Stored with the embeddings for filtering
 
     @model_validator(mode="after")
     def set_video_type(self) -> "TaskInput":
         """
         Set 'video_type' based on whether 'video' is a URL or file after validation.
+
+        Only the cheap checks run here (URL syntax, file stat and extension):
+        a TaskInput is built for every retrieval and must not do media or
+        network I/O. Call the validators with a higher level to check more.
         """
-        if is_valid_video_url(self.video):
+        if is_valid_video_url(self.video, ValidationLevel.STAT):
             self.video_type = "url"
-        elif is_valid_video_file(self.video):
+        elif is_valid_video_file(self.video, ValidationLevel.STAT):
             self.video_type = "file"
         return self
@@ -1,18 +1,23 @@
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
+from .vector import Embedding, empty_embedding
+
 
 class VideoEmbedding(BaseModel):
     video: str
-    embeddings_float: List[float] = Field(default_factory=list)
+    embeddings_float: Embedding = Field(default_factory=empty_embedding)
     embedding_scope: str
+    category: str = ""
     start_offset_sec: float
     end_offset_sec: float
 
 
 class TextEmbedding(BaseModel):
     text: str
-    embeddings_float: List[float] = Field(default_factory=list)
+    video: str = ""  # the video this text describes
+    category: str = ""
+    embeddings_float: Embedding = Field(default_factory=empty_embedding)
 
 
 class TaskOutput(BaseModel):
@@ -23,5 +28,69 @@ class TaskOutput(BaseModel):
 class RetrievalOutput(BaseModel):
     videos: List[str] = Field(default_factory=list)
     text_list: List[str] = Field(default=[])
-    video_embeddings: List[List[float]] = Field(default_factory=list)
+    video_embeddings: List[Embedding] = Field(default_factory=list)
+    # Similarity of each video to the query, aligned with `videos`
+    distances: List[float] = Field(default_factory=list)
+    milvus_uri: str
+
+
+class ClipSegment(BaseModel):
+    start_offset_sec: float
+    end_offset_sec: float
+    distance: float  # similarity of this clip to the query
+
+
+class ClipRetrievalOutput(BaseModel):
+    videos: List[str] = Field(default_factory=list)
+    # Aggregated clip score of each video, aligned with `videos`
+    distances: List[float] = Field(default_factory=list)
+    # Best-matching clips of each video, best first, aligned with `videos`
+    segments: List[List[ClipSegment]] = Field(default_factory=list)
     milvus_uri: str
+
+
+class HybridRetrievalOutput(RetrievalOutput):
+    """
+    Fused video and text search results. `distances` holds the fused scores;
+    `video_embeddings` is empty for videos found only through their text, and
+    `text_list` has the best-matching description of each video ("" if none).
+    """
+
+    # Score of each video in each search, None where it was not a hit
+    video_distances: List[Optional[float]] = Field(default_factory=list)
+    text_distances: List[Optional[float]] = Field(default_factory=list)
+
+
+class VideoAttributes(BaseModel):
+    video_path: str
+    video_embedding: Embedding
+    uri: str
+    distance: Optional[float] = None  # similarity to the query, if retrieved
+
+
+class VideoClipAttributes(BaseModel):
+    video_path: str
+    uri: str
+    distance: float  # aggregated clip score
+    segments: List[ClipSegment]  # best-matching time ranges, best first
+
+
+class DistributedRetrievalOutput(BaseModel):
+    videos: List[VideoAttributes]
+    # Shards that missed the deadline or failed; `videos` is partial if any
+    timed_out_shards: List[str] = []
+    failed_shards: List[str] = []
+
+
+class DistributedClipRetrievalOutput(BaseModel):
+    videos: List[VideoClipAttributes]
+    timed_out_shards: List[str] = []
+    failed_shards: List[str] = []
+
+
+class FeedOutput(BaseModel):
+    videos: List[Optional[VideoAttributes]]  # None pads a short feed
+
+
+class BatchRetrievalOutput(BaseModel):
+    results: List[DistributedRetrievalOutput]  # one per seed, in order
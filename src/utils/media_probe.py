@@ -0,0 +1,255 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from fractions import Fraction
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+from .validate_video import video_extensions
+
+MEDIA_PROBE_INDEX = os.environ.get("MEDIA_PROBE_INDEX", "media_probe.json")
+# Files probed one at a time are written to the index at most this often
+MEDIA_PROBE_SAVE_SEC = float(os.environ.get("MEDIA_PROBE_SAVE_SEC", 30))
+
+
+@dataclass
+class MediaInfo:
+    duration: Optional[float]  # seconds
+    width: Optional[int]
+    height: Optional[int]
+    fps: Optional[float]
+    frame_count: Optional[int]
+    video_codec: Optional[str]
+    audio_codec: Optional[str]
+    format_name: Optional[str]
+
+
+class ProbeError(Exception):
+    """ffprobe ran but could not read the media."""
+
+
+def probe_media(source: str) -> MediaInfo:
+    """
+    Duration, resolution, fps, frame count and codecs of a file or URL, from a
+    single ffprobe run (container and stream headers, nothing is decoded).
+    """
+    import ffmpeg
+
+    try:
+        probe = ffmpeg.probe(source)
+    except ffmpeg.Error as e:
+        raise ProbeError((e.stderr or b"").decode(errors="replace").strip()) from e
+
+    streams = probe.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    media_format = probe.get("format", {})
+
+    duration = _to_float(media_format.get("duration") or video.get("duration"))
+    fps = None
+    for rate in (video.get("avg_frame_rate"), video.get("r_frame_rate")):
+        if rate and rate != "0/0":
+            fps = float(Fraction(rate))
+            break
+    frame_count = _to_int(video.get("nb_frames"))
+    if frame_count is None and duration and fps:
+        frame_count = round(duration * fps)
+
+    return MediaInfo(
+        duration=duration,
+        width=_to_int(video.get("width")),
+        height=_to_int(video.get("height")),
+        fps=fps,
+        frame_count=frame_count,
+        video_codec=video.get("codec_name"),
+        audio_codec=audio.get("codec_name"),
+        format_name=media_format.get("format_name"),
+    )
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _probe_for_index(path: str) -> Tuple[str, Optional[MediaInfo], bool]:
+    """Process-pool worker: (path, info, whether the result can be cached)."""
+    try:
+        return path, probe_media(path), True
+    except ProbeError as e:
+        logger.error(f"Error probing {path}: {e}")
+        return path, None, True
+    except Exception as e:
+        logger.warning(f"Could not probe {path}: {e}")
+        return path, None, False
+
+
+class MediaProbe:
+    """
+    ffprobe results for local videos, persisted in a JSON sidecar index.
+
+    Entries are keyed by absolute path and only used while the file's mtime
+    and size match, so an edited or replaced video is probed again. Files
+    ffprobe cannot read are remembered as such, and files that no longer
+    exist are dropped when the index is loaded. URLs are probed every time.
+    `probe_many` fills the index for a whole batch with a process pool and
+    writes it once at the end; files probed by `get` are written at most
+    every `save_interval_sec`, and at exit.
+    """
+
+    def __init__(
+        self,
+        index_path: str = MEDIA_PROBE_INDEX,
+        save_interval_sec: float = MEDIA_PROBE_SAVE_SEC,
+    ):
+        self.index_path = index_path
+        self.save_interval_sec = save_interval_sec
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._entries: Optional[Dict[str, Dict]] = None  # loaded on first use
+        # Whether the index file is behind the entries, and when it was written
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        atexit.register(self.flush_index)
+
+    def get(self, source: str) -> Optional[MediaInfo]:
+        """Media info of a file (from the index when unchanged) or a URL."""
+        if "://" in source:
+            return _probe_for_index(source)[1]
+
+        identity = _file_identity(source)
+        if identity is None:
+            logger.info(f"File does not exist: {source}")
+            return None
+        with self._lock:
+            entry = self._index().get(identity[0])
+            if entry is not None and entry["identity"] == list(identity[1:]):
+                self.hits += 1
+                return MediaInfo(**entry["info"]) if entry["info"] else None
+            self.misses += 1
+
+        _, info, cacheable = _probe_for_index(source)
+        if cacheable:
+            with self._lock:
+                self._store(identity, info)
+                self._dirty = True
+                if time.monotonic() - self._saved_at >= self.save_interval_sec:
+                    self.save_index()
+        return info
+
+    def probe_many(
+        self, paths: Iterable[str], max_workers: Optional[int] = None
+    ) -> Dict[str, Optional[MediaInfo]]:
+        """Probe the files missing from the index in parallel processes."""
+        results: Dict[str, Optional[MediaInfo]] = {}
+        pending: Dict[str, Tuple[str, int, int]] = {}
+        with self._lock:
+            for path in paths:
+                identity = _file_identity(path)
+                if identity is None:
+                    continue
+                entry = self._index().get(identity[0])
+                if entry is not None and entry["identity"] == list(identity[1:]):
+                    self.hits += 1
+                    results[path] = (
+                        MediaInfo(**entry["info"]) if entry["info"] else None
+                    )
+                else:
+                    self.misses += 1
+                    pending[path] = identity
+
+        if pending:
+            logger.info(f"Probing {len(pending)} videos ({len(results)} indexed)")
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                for path, info, cacheable in executor.map(
+                    _probe_for_index, list(pending), chunksize=8
+                ):
+                    results[path] = info
+                    if cacheable:
+                        with self._lock:
+                            self._store(pending[path], info)
+            self.save_index()
+        return results
+
+    def probe_directory(
+        self, directory: str, max_workers: Optional[int] = None
+    ) -> Dict[str, Optional[MediaInfo]]:
+        paths = [
+            os.path.join(directory, name)
+            for name in sorted(os.listdir(directory))
+            if os.path.splitext(name)[1].lower() in video_extensions
+        ]
+        return self.probe_many(paths, max_workers)
+
+    def save_index(self):
+        """Write the index atomically so a crash never leaves it truncated."""
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.index_path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as file:
+                    json.dump(self._index(), file)
+                os.replace(tmp_path, self.index_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+    def flush_index(self):
+        """Save the index if files probed by `get` have not been saved yet."""
+        with self._lock:
+            if self._dirty:
+                self.save_index()
+
+    def _index(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path) as file:
+                        self._entries = json.load(file)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable probe index: {e}")
+            # Files deleted since the last run (e.g. temp videos) would only grow it
+            deleted = [path for path in self._entries if not os.path.exists(path)]
+            for path in deleted:
+                del self._entries[path]
+            if deleted:
+                logger.info(f"Dropped {len(deleted)} deleted files from the probe index")
+                self._dirty = True
+        return self._entries
+
+    def _store(self, identity: Tuple[str, int, int], info: Optional[MediaInfo]):
+        self._index()[identity[0]] = {
+            "identity": list(identity[1:]),
+            "info": asdict(info) if info else None,
+        }
+
+
+def _file_identity(path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+# Shared by the embedding models and build_database
+media_probe = MediaProbe()
@@ -1,28 +1,44 @@
 from loguru import logger
+import math
 import os
+import shutil
+import tempfile
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
 
-import cv2
-import ffmpeg
+from .media_probe import MediaInfo, ProbeError, media_probe, probe_media
+
+# Smallest width/height accepted by the embedding API
+MIN_VIDEO_SIDE = int(os.environ.get("MIN_VIDEO_SIDE", 360))
+PREPROCESS_WORKERS = int(os.environ.get("PREPROCESS_WORKERS", 4))
+PREPROCESS_VCODEC = os.environ.get("PREPROCESS_VCODEC", "libx264")
+PREPROCESS_X264_PRESET = os.environ.get("PREPROCESS_X264_PRESET", "veryfast")
+# Audio codecs that can be copied into an mp4 container as they are
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "opus", "alac"}
 
 
 def upscale_video_resolution(
-    video_url: str, output_dir_relative: str = "../static/processed_file"
+    video_url: str,
+    output_dir_relative: str = "../static/processed_file",
+    min_side: int = MIN_VIDEO_SIDE,
+    aspect_ratio: Optional[float] = None,
+    min_duration_sec: Optional[float] = None,
+    max_duration_sec: Optional[float] = None,
+    vcodec: str = PREPROCESS_VCODEC,
 ) -> str:
-    # Download the video from the URL to a temporary file
-    temp_path = "temp_video.mp4"
-    urllib.request.urlretrieve(video_url, temp_path)
-
-    # Open the video
-    video = cv2.VideoCapture(temp_path)
-    if not video.isOpened():
-        raise ValueError("Could not open video from URL")
-
-    # Get original video properties
-    original_width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
-    original_height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = video.get(cv2.CAP_PROP_FPS)
-
+    """
+    Copy a video (URL or local path) into the processed folder, normalized for
+    the embedding API, and return the new path.
+
+    Videos whose smaller side is below `min_side` are upscaled, keeping their
+    aspect ratio. Optionally, they are padded (letterboxed) to `aspect_ratio`,
+    extended to `min_duration_sec` by holding the last frame, and cut at
+    `max_duration_sec`. Everything runs in a single ffmpeg process that keeps
+    the audio track and encodes with `vcodec` (H.264 by default, which
+    browsers can play); videos that already comply are copied unchanged.
+    Temp files are unique per call, so calls can run concurrently.
+    """
     # Define output_path automatically
     current_dir = os.path.dirname(__file__)
     output_dir = os.path.join(current_dir, output_dir_relative)
@@ -36,72 +52,191 @@ def upscale_video_resolution(
 
     output_path = os.path.join(output_dir, output_name)
 
-    # Check if upscaling is needed
-    if original_width >= 360 and original_height >= 360:
-        logger.info(
-            "Video resolution is already sufficient (>= 360x360). No upscaling needed."
-        )
-        video.release()
-        os.rename(temp_path, output_path)  # Just move the original file
-        return output_path
-
-    # Calculate the scaling factor to make the smaller dimension at least 360
-    aspect_ratio = original_width / original_height
-    if original_width < 360:
-        target_width = 360
-        target_height = int(target_width / aspect_ratio)
-    elif original_height < 360:
-        target_height = 360
-        target_width = int(target_height * aspect_ratio)
-    else:
-        target_width, target_height = (
-            original_width,
-            original_height,
-        )  # Shouldn't hit this due to prior check
-
-    # Define the codec and create VideoWriter object
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(output_path, fourcc, fps, (target_width, target_height))
-
-    # Check if VideoWriter is opened successfully
-    if not out.isOpened():
-        video.release()
-        raise ValueError(
-            f"Failed to open VideoWriter with codec 'mp4v' at {output_path}"
+    # Download the video from the URL to a temporary file
+    temp_path = None
+    source_path = video_url
+    if "://" in video_url:
+        fd, temp_path = tempfile.mkstemp(suffix=".download", dir=output_dir)
+        os.close(fd)
+        source_path = temp_path
+    try:
+        if temp_path:
+            urllib.request.urlretrieve(video_url, temp_path)
+
+        # Get original video properties, without opening the video. Local
+        # files go through the shared probe index; downloads are probed once
+        if temp_path is None:
+            info = media_probe.get(source_path)
+            if info is None:
+                raise ValueError(f"Could not open video {video_url}")
+        else:
+            try:
+                info = probe_media(source_path)
+            except ProbeError as e:
+                raise ValueError(f"Could not open video {video_url}: {e}") from e
+        if not info.width or not info.height:
+            raise ValueError(f"No video stream in {video_url}")
+
+        normalization = _normalize_args(
+            info, min_side, aspect_ratio, min_duration_sec, max_duration_sec
         )
+        if normalization is None:
+            logger.info(
+                f"Video resolution is already sufficient (>= {min_side}x{min_side})."
+                " No upscaling needed."
+            )
+            _place(source_path, output_path, move=temp_path is not None)
+            return output_path
+
+        _transcode(source_path, output_path, info, normalization, vcodec)
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
 
-    # Process each frame
-    while video.isOpened():
-        ret, frame = video.read()
-        if not ret:
-            break
-        # Resize the frame to the new resolution
-        resized_frame = cv2.resize(
-            frame, (target_width, target_height), interpolation=cv2.INTER_LINEAR
-        )
-        out.write(resized_frame)
+    return output_path
 
-    # Release resources
-    video.release()
-    out.release()
-    cv2.destroyAllWindows()
 
-    # Clean up temporary file
-    if os.path.exists(temp_path):
-        os.remove(temp_path)
+class _Normalization(NamedTuple):
+    scaled: Tuple[int, int]  # size after upscaling
+    padded: Optional[Tuple[int, int]]  # size after letterboxing
+    pad_sec: float  # last frame held this long
+    cut_sec: Optional[float]  # output cut at this duration
+
+
+def _even(value: float) -> int:
+    # libx264 with yuv420p needs even dimensions
+    return max(2, 2 * math.ceil(value / 2))
+
+
+def _normalize_args(
+    info: MediaInfo,
+    min_side: int,
+    aspect_ratio: Optional[float],
+    min_duration_sec: Optional[float],
+    max_duration_sec: Optional[float],
+) -> Optional[_Normalization]:
+    """What to change in the video, None if it already complies."""
+    width, height = info.width, info.height
+
+    # Calculate the scaling factor to make the smaller dimension at least min_side
+    scale = max(1.0, min_side / min(width, height))
+    scaled = (width, height)
+    if scale > 1.0:
+        scaled = (_even(width * scale), _even(height * scale))
+
+    padded = None
+    if aspect_ratio and abs(scaled[0] / scaled[1] - aspect_ratio) > 0.01:
+        if scaled[0] / scaled[1] < aspect_ratio:
+            padded = (_even(scaled[1] * aspect_ratio), scaled[1])
+        else:
+            padded = (scaled[0], _even(scaled[0] / aspect_ratio))
+
+    pad_sec = 0.0
+    if min_duration_sec and info.duration and info.duration < min_duration_sec:
+        pad_sec = min_duration_sec - info.duration
+    cut_sec = None
+    if max_duration_sec and (info.duration is None or info.duration > max_duration_sec):
+        cut_sec = max_duration_sec
+
+    if scaled == (width, height) and padded is None and not pad_sec and not cut_sec:
+        return None
+    return _Normalization(scaled, padded, pad_sec, cut_sec)
+
+
+def _transcode(
+    source_path: str,
+    output_path: str,
+    info: MediaInfo,
+    normalization: _Normalization,
+    vcodec: str,
+):
+    import ffmpeg
+
+    scaled, padded, pad_sec, cut_sec = normalization
+    stream = ffmpeg.input(source_path)
+    video = stream.video
+    if scaled != (info.width, info.height):
+        video = video.filter("scale", scaled[0], scaled[1], flags="bilinear")
+    if padded is not None:
+        video = video.filter(
+            "pad", padded[0], padded[1], "(ow-iw)/2", "(oh-ih)/2", color="black"
+        )
+    if pad_sec:
+        video = video.filter("tpad", stop_mode="clone", stop_duration=pad_sec)
+    streams = [video]
+    if info.audio_codec:
+        audio = stream.audio
+        if pad_sec:
+            audio = audio.filter("apad", pad_dur=pad_sec)
+        streams.append(audio)
+
+    output_kwargs = {"pix_fmt": "yuv420p", "movflags": "+faststart"}
+    if vcodec == "libx264":
+        output_kwargs.update(vcodec=vcodec, preset=PREPROCESS_X264_PRESET, crf=23)
+    else:
+        output_kwargs.update(vcodec=vcodec, **{"q:v": 4})
+    if info.audio_codec:
+        # Re-encoding audio costs about as much as the video, copy it if possible
+        copy_audio = not pad_sec and info.audio_codec in MP4_AUDIO_CODECS
+        output_kwargs["acodec"] = "copy" if copy_audio else "aac"
+    if cut_sec:
+        output_kwargs["t"] = cut_sec
+
+    # Written next to the output and renamed, so readers never see a partial file
+    fd, temp_output = tempfile.mkstemp(suffix=".mp4", dir=os.path.dirname(output_path))
+    os.close(fd)
+    os.chmod(temp_output, 0o644)
+    try:
+        ffmpeg.output(*streams, temp_output, **output_kwargs).overwrite_output().run(
+            quiet=True
+        )
+        os.replace(temp_output, output_path)
+    except ffmpeg.Error as e:
+        raise ValueError(
+            f"ffmpeg failed on {source_path}: {e.stderr.decode(errors='replace')}"
+        ) from e
+    finally:
+        if os.path.exists(temp_output):
+            os.remove(temp_output)
 
     logger.info(
-        f"Video upscaled to {target_width}x{target_height} and saved to {output_path}"
+        f"Video normalized to {(padded or scaled)[0]}x{(padded or scaled)[1]} "
+        f"and saved to {output_path}"
     )
-    return output_path
 
 
-def get_video_duration(video_source: str):
-    try:
-        probe = ffmpeg.probe(video_source)
-        duration = float(probe["format"]["duration"])  # duration in seconds
-    except ffmpeg.Error as e:
-        logger.error(f"Error: {e.stderr.decode()}")
-        return None
+def _place(source_path: str, output_path: str, move: bool):
+    if move:
+        os.chmod(source_path, 0o644)
+        os.replace(source_path, output_path)  # Just move the original file
+    elif os.path.abspath(source_path) != os.path.abspath(output_path):
+        shutil.copyfile(source_path, output_path)
+
+
+def preprocess_videos(
+    videos: Iterable[str], max_workers: int = PREPROCESS_WORKERS, **kwargs
+) -> Dict[str, Optional[str]]:
+    """
+    Run `upscale_video_resolution` over many videos in a thread pool (each job
+    is an ffmpeg process). Returns video -> processed path, None if it failed.
+    """
+    videos = list(dict.fromkeys(videos))
+    results: Dict[str, Optional[str]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            video: executor.submit(upscale_video_resolution, video, **kwargs)
+            for video in videos
+        }
+        for video, future in futures.items():
+            try:
+                results[video] = future.result()
+            except Exception as e:
+                logger.error(f"Could not preprocess {video}: {e}")
+                results[video] = None
+    return results
+
 
-    return duration
+def get_video_duration(video_source: str):
+    """Duration in seconds, from the shared probe index for local files."""
+    info = media_probe.get(video_source)
+    return info.duration if info else None
@@ -1,18 +1,50 @@
 from loguru import logger
 import requests
 from urllib.parse import urlparse
-import cv2
 import os
+import stat
+from enum import IntEnum
+from typing import Optional
+
+from .cache import LRUCache
 
 valid_video_types = {"video/mp4", "video/webm", "video/ogg", "video/avi", "video/mpeg"}
+video_extensions = {
+    ".mp4", ".m4v", ".mov", ".webm", ".mkv", ".avi", ".mpeg", ".mpg", ".ts",
+    ".ogv", ".ogg", ".flv", ".3gp", ".wmv",
+}  # fmt: skip
+
+
+class ValidationLevel(IntEnum):
+    """How thoroughly a video is checked; each level includes the previous one."""
+
+    # File: exists, non-empty, video extension. URL: well-formed http(s) URL
+    STAT = 1
+    # File: container signature in the first bytes. URL: HEAD content type
+    HEADER = 2
+    # File: OpenCV opens it and decodes a frame. URL: same as HEADER
+    DECODE = 3
 
 
-def is_valid_video_url(url: str) -> bool:
+# Results keyed by (path, mtime, size, level): a file that changes is checked again
+_file_results: LRUCache[bool] = LRUCache(
+    int(os.environ.get("VIDEO_VALIDATION_CACHE_SIZE", 4096))
+)
+_url_results: LRUCache[bool] = LRUCache(
+    int(os.environ.get("VIDEO_VALIDATION_CACHE_SIZE", 4096))
+)
+
+
+def is_valid_video_url(
+    url: str, level: ValidationLevel = ValidationLevel.HEADER
+) -> bool:
     """
     Validate if a URL points to a valid video.
 
     Args:
         url (str): The URL to check.
+        level (ValidationLevel): STAT only parses the URL; HEADER (and DECODE)
+            also request it and check its content type, once per URL.
 
     Returns:
         bool: True if the URL is a valid video, False otherwise.
@@ -21,11 +53,16 @@ def is_valid_video_url(url: str) -> bool:
         # Step 1: Check if the URL is well-formed
         parsed_url = urlparse(url)
         if not all([
-            parsed_url.scheme,
+            parsed_url.scheme in ("http", "https"),
             parsed_url.netloc,
         ]):  # Must have scheme and domain
             logger.info(f"Invalid URL format: {url}")
             return False
+        if level == ValidationLevel.STAT:
+            return True
+        cached = _url_results.get(url)
+        if cached is not None:
+            return cached
 
         # Step 2: Send a HEAD request to check content type
         headers = {"User-Agent": "Mozilla/5.0"}  # Avoid server blocks
@@ -36,6 +73,7 @@ def is_valid_video_url(url: str) -> bool:
             response = requests.get(
                 url, headers=headers, stream=True, timeout=5, allow_redirects=True
             )
+            response.close()
 
         # Check status code
         if response.status_code != 200:
@@ -44,48 +82,117 @@ def is_valid_video_url(url: str) -> bool:
 
         # Step 3: Check content type
         content_type = response.headers.get("Content-Type", "").lower()
-        if content_type not in valid_video_types:
+        is_video = content_type in valid_video_types
+        if not is_video:
             logger.info(f"URL is not a video, content-type: {content_type}")
-            return False
-
-        return True
+        _url_results.put(url, is_video)
+        return is_video
     except requests.exceptions.RequestException as e:
+        # Not cached: the next check retries
         logger.info(f"Network error: {e}")
         return False
     except Exception as e:
         logger.info(f"Unexpected error: {e}")
         return False
-    finally:
-        pass
 
 
-def is_valid_video_file(file_path: str) -> bool:
+def is_valid_video_file(
+    file_path: str, level: ValidationLevel = ValidationLevel.DECODE
+) -> bool:
     """
     Validate if a local file is a valid video.
 
+    Only `os.stat` runs on every call; the file itself is read (HEADER) or
+    decoded (DECODE) once per (path, mtime, size).
+
     Args:
         file_path (str): Path to the local video file.
+        level (ValidationLevel): How thoroughly to check the file.
 
     Returns:
         bool: True if the file is a valid video, False otherwise.
     """
+    # Step 1: Check if the file exists and is a file
     try:
-        # Step 1: Check if the file exists and is a file
-        if not os.path.exists(file_path):
-            logger.info(f"File does not exist: {file_path}")
-            return False
-        if not os.path.isfile(file_path):
-            logger.info(f"Path is not a file: {file_path}")
-            return False
+        file_stat = os.stat(file_path)
+    except OSError:
+        logger.info(f"File does not exist: {file_path}")
+        return False
+    if not stat.S_ISREG(file_stat.st_mode):
+        logger.info(f"Path is not a file: {file_path}")
+        return False
 
-        # Step 2: Open the video with OpenCV
+    key = (os.path.abspath(file_path), file_stat.st_mtime_ns, file_stat.st_size, level)
+    cached = _file_results.get(key)
+    if cached is not None:
+        return cached
+    is_valid = _check_video_file(file_path, file_stat.st_size, level)
+    _file_results.put(key, is_valid)
+    return is_valid
+
+
+def _check_video_file(file_path: str, size: int, level: ValidationLevel) -> bool:
+    # Step 2: Non-empty file with a video extension
+    if size == 0:
+        logger.info(f"Video file is empty: {file_path}")
+        return False
+    if os.path.splitext(file_path)[1].lower() not in video_extensions:
+        logger.info(f"Not a video file extension: {file_path}")
+        return False
+    if level == ValidationLevel.STAT:
+        return True
+
+    # Step 3: Container signature, without decoding anything
+    container = sniff_video_container(file_path)
+    if container is None:
+        logger.info(f"Unknown video container: {file_path}")
+        return False
+    if level == ValidationLevel.HEADER:
+        return True
+
+    # Step 4: Open the video with OpenCV and decode a frame
+    return _decode_video_file(file_path)
+
+
+def sniff_video_container(file_path: str) -> Optional[str]:
+    """Name of the container format from the file signature, or None."""
+    try:
+        with open(file_path, "rb") as file:
+            head = file.read(189)
+    except OSError as e:
+        logger.info(f"Cannot read video file: {e}")
+        return None
+
+    if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide"):
+        return "mp4"  # ISO base media / QuickTime box
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "matroska"  # also WebM
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "avi"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] in (b"\x00\x00\x01\xba", b"\x00\x00\x01\xb3"):
+        return "mpeg"
+    if head[:1] == b"\x47" and head[188:189] == b"\x47":
+        return "mpegts"
+    if head[:3] == b"FLV":
+        return "flv"
+    if head[:4] == b"\x30\x26\xb2\x75":
+        return "asf"
+    return None
+
+
+def _decode_video_file(file_path: str) -> bool:
+    import cv2  # slow to import, only needed once a file is really decoded
+
+    try:
         video = cv2.VideoCapture(file_path)
         if not video.isOpened():
             logger.info(f"Cannot open video file: {file_path}")
             video.release()
             return False
 
-        # Step 3: Check if at least one frame can be read
+        # Check if at least one frame can be read
         ret, frame = video.read()
         if not ret:
             logger.info(f"Video is empty or corrupted: {file_path}")
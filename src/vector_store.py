@@ -0,0 +1,115 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+Vector = Union[Sequence[float], np.ndarray]
+
+
+class SessionVectorStore:
+    """
+    Small in-process vector index for the videos a UI session has seen.
+
+    Vectors live in one contiguous float32 matrix (grown by doubling) with a
+    path -> row map, so adding a video copies its floats straight into the
+    matrix and cosine top-k is a single matrix-vector product. This answers
+    "more like this" and already-seen checks without a Milvus round trip.
+    """
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 64):
+        self.dim = dim
+        self._capacity = capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+        self.paths: List[str] = []
+        self.uris: List[Optional[str]] = []
+        self.seen: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._rows
+
+    def add(self, path: str, vector: Vector, uri: Optional[str] = None) -> int:
+        """Add a video and return its row; known paths keep their vector."""
+        row = self._rows.get(path)
+        if row is not None:
+            return row
+        if self._matrix is None:
+            self.dim = self.dim or len(vector)
+            self._matrix = np.empty((self._capacity, self.dim), dtype=np.float32)
+            self._norms = np.empty(self._capacity, dtype=np.float32)
+        row = len(self.paths)
+        if row == len(self._matrix):
+            self._grow()
+        self._matrix[row] = vector
+        self._norms[row] = np.linalg.norm(self._matrix[row])
+        self._rows[path] = row
+        self.paths.append(path)
+        self.uris.append(uri)
+        return row
+
+    def get(self, path: str) -> np.ndarray:
+        """Read-only view of the vector of `path`."""
+        vector = self._matrix[self._rows[path]]
+        vector.flags.writeable = False
+        return vector
+
+    def uri(self, path: str) -> Optional[str]:
+        return self.uris[self._rows[path]]
+
+    def mark_seen(self, path: str):
+        self.seen.add(path)
+
+    def similarities(self, query: Union[str, Vector]) -> np.ndarray:
+        """Cosine similarity of `query` (a path or a vector) to every row."""
+        n = len(self.paths)
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+        if isinstance(query, str):
+            query = self._matrix[self._rows[query]]
+        query = np.asarray(query, dtype=np.float32)
+        norms = self._norms[:n] * np.linalg.norm(query)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = self._matrix[:n] @ query / norms
+        return np.nan_to_num(scores, nan=-1.0)
+
+    def top_k(
+        self,
+        query: Union[str, Vector],
+        k: int,
+        exclude: Iterable[str] = (),
+        exclude_seen: bool = False,
+    ) -> List[Tuple[str, float]]:
+        """Return up to `k` (path, cosine similarity) pairs, best first."""
+        scores = self.similarities(query)
+        excluded = set(exclude)
+        if isinstance(query, str):
+            excluded.add(query)
+        if exclude_seen:
+            excluded |= self.seen
+        for path in excluded:
+            row = self._rows.get(path)
+            if row is not None:
+                scores[row] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        # argpartition finds the top-k in O(n), only those k are sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.paths[row], float(scores[row])) for row in top]
+
+    def is_duplicate(self, vector: Vector, threshold: float = 0.98) -> bool:
+        """Whether a near-identical video (e.g. a re-upload) is already stored."""
+        scores = self.similarities(vector)
+        return bool(len(scores)) and float(scores.max()) >= threshold
+
+    def _grow(self):
+        capacity = 2 * len(self._matrix)
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        matrix[: len(self._matrix)] = self._matrix
+        norms = np.empty(capacity, dtype=np.float32)
+        norms[: len(self._norms)] = self._norms
+        self._matrix, self._norms = matrix, norms
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+from loguru import logger
+
+from benchmarks.fake_twelvelabs import FakeTwelveLabs
+from src.milvus import (
+    TEXT_SCALAR_FIELDS,
+    VIDEO_SCALAR_FIELDS,
+    MilvusDatabase,
+    insert_task_output_to_milvus,
+)
+from src.model import MultimodalEmbeddingModel
+from src.schemas.input import TaskInput
+from src.utils.media_probe import media_probe
+
+N_VIDEOS = 12
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logs():
+    logger.remove()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def media_probe_index(tmp_path_factory):
+    """Probes of the test videos go to a throwaway index, not the developer's."""
+    index_path = media_probe.index_path
+    media_probe.flush_index()
+    media_probe.index_path = str(tmp_path_factory.mktemp("probe") / "media_probe.json")
+    media_probe._entries = None
+    yield media_probe
+    media_probe.flush_index()
+    media_probe.index_path = index_path
+    media_probe._entries = None
+
+
+@pytest.fixture(scope="session")
+def fake_client():
+    return FakeTwelveLabs(latency_sec=0, upload_sec=0, text_latency_sec=0)
+
+
+@pytest.fixture(scope="session", params=[True, False], ids=["partitioned", "flat"])
+def search_db(request, tmp_path_factory, fake_client):
+    """
+    Milvus Lite database of N_VIDEOS fake videos (3 clips each) in categories
+    "a" and "b", with their descriptions, and the model that built it.
+    """
+    folder = tmp_path_factory.mktemp("milvus")
+    milvus = MilvusDatabase(str(folder / "search.db"), search_batch_window_ms=0)
+    milvus.create_collection(
+        "video_embedding",
+        scalar_fields=VIDEO_SCALAR_FIELDS,
+        partition_by_scope=request.param,
+    )
+    milvus.create_collection("text_embedding", scalar_fields=TEXT_SCALAR_FIELDS)
+
+    model = MultimodalEmbeddingModel(client=fake_client)
+    videos = []
+    for i in range(N_VIDEOS):
+        path = str(folder / f"video_{i}.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(1024))
+        input_ = TaskInput(video=path, text=f"video {i}", category="ab"[i % 2])
+        insert_task_output_to_milvus(milvus, model.generate_embedding(input_))
+        videos.append(path)
+    milvus.milvus_client.flush("video_embedding")
+    milvus.milvus_client.flush("text_embedding")
+    return model, milvus, videos
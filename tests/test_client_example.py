@@ -0,0 +1,102 @@
+import hashlib
+import os
+import threading
+
+import pytest
+from flask import Flask, Response
+from werkzeug.serving import make_server
+
+from src.fastapi import client_example
+from src.fastapi.client_example import DownloadProgress, download_file
+from src.fastapi.server import file_server
+
+
+def serve(app):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def digest(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    folder = tmp_path / "served"
+    folder.mkdir()
+    (folder / "video.mp4").write_bytes(os.urandom(256 * 1024))
+    monkeypatch.setattr(file_server, "BASE_DIR", folder)
+    monkeypatch.setattr(client_example, "PARALLEL_DOWNLOAD_MIN_BYTES", 64 * 1024)
+    server, uri = serve(file_server.app)
+    yield folder, uri
+    server.shutdown()
+
+
+def test_parallel_download(served, tmp_path):
+    folder, uri = served
+    local_path = tmp_path / "video.mp4"
+
+    headers = download_file(uri, "video.mp4", str(local_path), chunk_size=8192)
+
+    assert headers["Content-Length"] == str(256 * 1024)
+    assert digest(local_path) == digest(folder / "video.mp4")
+    assert not os.path.exists(f"{local_path}.etag")
+    assert not os.path.exists(f"{local_path}.progress")
+
+
+def test_resume_after_interrupted_download(served, tmp_path, monkeypatch):
+    folder, uri = served
+    local_path = tmp_path / "video.mp4"
+    advance = DownloadProgress.advance
+    calls = []
+
+    def crash(self, index, position):
+        advance(self, index, position)
+        calls.append(position)
+        if len(calls) == 10:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(DownloadProgress, "advance", crash)
+    with pytest.raises(KeyboardInterrupt):
+        download_file(uri, "video.mp4", str(local_path), chunk_size=8192)
+    monkeypatch.setattr(DownloadProgress, "advance", advance)
+
+    progress = DownloadProgress.load(f"{local_path}.progress")
+    written = progress.total - progress.missing_bytes
+    assert 0 < written < progress.total
+
+    requested = []
+    get = client_example.requests.Session.get
+
+    def spy(self, url, headers=None, **kwargs):
+        requested.append(headers or {})
+        return get(self, url, headers=headers, **kwargs)
+
+    monkeypatch.setattr(client_example.requests.Session, "get", spy)
+    download_file(uri, "video.mp4", str(local_path), chunk_size=8192)
+
+    assert digest(local_path) == digest(folder / "video.mp4")
+    assert all("Range" in headers for headers in requested)
+    assert not os.path.exists(f"{local_path}.progress")
+
+
+def test_unknown_length_is_streamed(tmp_path):
+    data = os.urandom(100_000)
+    app = Flask(__name__)
+
+    @app.route("/files/<path:file_path>")
+    def chunked(file_path):
+        return Response(data[i : i + 4096] for i in range(0, len(data), 4096))
+
+    server, uri = serve(app)
+    try:
+        local_path = tmp_path / "video.mp4"
+        headers = download_file(uri, "video.mp4", str(local_path))
+    finally:
+        server.shutdown()
+
+    assert headers["Content-Length"] == str(len(data))
+    assert local_path.read_bytes() == data
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.models.embedding_cache import EmbeddingCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_bytes=1 << 20)
+    yield cache
+    cache.close()
+
+
+def segments(seed, dimension=256):
+    vector = np.random.default_rng(seed).random(dimension, dtype=np.float32)
+    return [{"embeddings_float": vector, "embedding_scope": "video", "start": 0.0}]
+
+
+def test_round_trip(cache):
+    cache.put("a", segments(0))
+
+    (segment,) = cache.get("a")
+
+    assert segment["embedding_scope"] == "video"
+    expected = segments(0)[0]["embeddings_float"]
+    np.testing.assert_array_equal(segment["embeddings_float"], expected)
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    entry_bytes = len(segments(0)[0]["embeddings_float"]) * 4
+    max_bytes = 3 * entry_bytes + 200  # three entries and their metadata
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_bytes=max_bytes)
+    for key in "abc":
+        cache.put(key, segments(ord(key)))
+    cache.get("a")  # "b" is now the least recently used
+
+    cache.put("d", segments(3))
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.evictions == 1
+    assert cache.total_bytes <= cache.max_bytes
+    assert len(EmbeddingCache(cache.path)) == 3
+    cache.close()
+
+
+def test_file_hashes_are_bounded_and_follow_changes(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), hash_cache_size=2)
+    paths = []
+    for name in "abc":
+        path = tmp_path / f"{name}.mp4"
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+
+    digests = [cache.file_digest(path) for path in paths]
+
+    assert len(set(digests)) == 3
+    assert len(cache._file_hashes) == 2
+    key = cache.video_key(paths[0], "model", ["video", "clip"])
+    assert key == cache.video_key(paths[0], "model", ["clip", "video"])
+    with open(paths[0], "ab") as f:
+        f.write(b"changed")
+    os.utime(paths[0], ns=(0, 10**9))
+    assert cache.file_digest(paths[0]) != digests[0]
+    cache.close()
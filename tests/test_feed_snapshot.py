@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from src.feed_snapshot import (
+    FeedItem,
+    FeedSnapshot,
+    FeedSnapshotRefresher,
+    build_feed_snapshot,
+    rank_feed,
+)
+
+
+class FakeInstance:
+    def __init__(self, uri, rows, partitioned=True, down=False):
+        self.uri = uri
+        self.rows = rows
+        self.partitioned = partitioned
+        self.down = down
+        self.queries = []
+
+    def partitioned_by_scope(self, collection_name):
+        if self.down:
+            raise ConnectionError(f"{self.uri} is unreachable")
+        return self.partitioned
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        return self.rows
+
+
+def row(video, category="", value=0.0):
+    return {"video": video, "category": category, "embeddings_float": [value] * 4}
+
+
+def test_snapshot_round_trip(tmp_path):
+    items = [FeedItem("a.mp4", "http://a", "x"), FeedItem("b.mp4", "http://b")]
+    vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+    path = str(tmp_path / "feed.bin")
+
+    FeedSnapshot(items, vectors, created_at=123.0).save(path)
+    loaded = FeedSnapshot.load(path)
+
+    assert loaded.items == items
+    assert loaded.created_at == 123.0
+    np.testing.assert_array_equal(loaded.vectors, vectors)
+
+
+def test_rank_feed_puts_local_first_and_interleaves_categories():
+    items = [
+        FeedItem("a1", "u", "a"),
+        FeedItem("a2", "u", "a"),
+        FeedItem("b1", "u", "b"),
+        FeedItem("local", "u", "a", local=True),
+    ]
+    assert [item.video for item in rank_feed(items)] == ["local", "a1", "b1", "a2"]
+
+
+def test_unreachable_instance_is_skipped():
+    up = FakeInstance("http://up", [row("a.mp4", "x", 1.0)], partitioned=False)
+    down = FakeInstance("http://down", [row("b.mp4")], down=True)
+    duplicate = FakeInstance("http://dup", [row("a.mp4", "x", 2.0)])
+
+    snapshot = build_feed_snapshot([down, up, duplicate], "videos")
+
+    assert [(item.video, item.uri) for item in snapshot.items] == [
+        ("a.mp4", "http://up")
+    ]
+    assert snapshot.vectors[0][0] == 1.0
+    assert up.queries[0]["filter"] == 'embedding_scope=="video"'
+    assert duplicate.queries[0]["partition_names"] == ["video"]
+    assert not down.queries
+
+
+def test_refresher_keeps_previous_feed_when_rebuild_is_empty(tmp_path):
+    path = str(tmp_path / "feed.bin")
+    snapshots = [
+        FeedSnapshot([FeedItem("a.mp4", "u")], np.ones((1, 4), np.float32)),
+        FeedSnapshot([], np.zeros((0, 0), np.float32)),
+    ]
+    refresher = FeedSnapshotRefresher(path, build=lambda: snapshots.pop(0))
+
+    assert len(refresher.snapshot) == 1
+    assert refresher.refresh() is refresher.snapshot
+    assert len(FeedSnapshot.load(path)) == 1
+
+
+def test_empty_first_build_is_not_saved_and_retried(tmp_path):
+    path = str(tmp_path / "feed.bin")
+    empty = FeedSnapshot([], np.zeros((0, 0), np.float32))
+    good = FeedSnapshot([FeedItem("a.mp4", "u")], np.ones((1, 4), np.float32))
+    builds = [empty, empty, good]
+    built = threading.Event()
+
+    def build():
+        snapshot = builds.pop(0)
+        if not builds:
+            built.set()
+        return snapshot
+
+    refresher = FeedSnapshotRefresher(path, build, refresh_sec=3600, retry_sec=0.05)
+
+    assert len(refresher.snapshot) == 0
+    assert not os.path.exists(path)
+    assert built.wait(2)
+    deadline = time.monotonic() + 2
+    while not len(refresher.snapshot) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(refresher.snapshot) == 1
+    assert len(FeedSnapshot.load(path)) == 1
+    refresher.close()
+
+
+def test_empty_snapshot_file_is_rebuilt_at_startup(tmp_path):
+    path = str(tmp_path / "feed.bin")
+    FeedSnapshot([], np.zeros((0, 0), np.float32)).save(path)
+    good = FeedSnapshot([FeedItem("a.mp4", "u")], np.ones((1, 4), np.float32))
+
+    refresher = FeedSnapshotRefresher(path, build=lambda: good)
+
+    assert len(refresher.snapshot) == 1
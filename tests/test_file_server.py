@@ -0,0 +1,66 @@
+import os
+
+import pytest
+from werkzeug.wsgi import FileWrapper
+
+from src.fastapi.server import file_server
+
+
+class RecordingFileWrapper(FileWrapper):
+    """`wsgi.file_wrapper` that remembers what it wrapped, like gunicorn's."""
+
+    wrapped = []
+
+    def __init__(self, filelike, buffer_size=8192):
+        super().__init__(filelike, buffer_size)
+        self.wrapped.append(filelike)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    data = os.urandom(100_000)
+    (tmp_path / "video.mp4").write_bytes(data)
+    monkeypatch.setattr(file_server, "BASE_DIR", tmp_path)
+    RecordingFileWrapper.wrapped = []
+    return file_server.app.test_client(), data
+
+
+def test_range_is_handed_to_the_file_wrapper(client):
+    test_client, data = client
+
+    response = test_client.get(
+        "/files/video.mp4",
+        headers={"Range": "bytes=1000-4999"},
+        environ_base={"wsgi.file_wrapper": RecordingFileWrapper},
+    )
+
+    assert response.status_code == 206
+    assert response.data == data[1000:5000]
+    # send_file wraps the whole file first; the range replaces it
+    whole_file, range_file = RecordingFileWrapper.wrapped
+    assert whole_file.closed
+    assert isinstance(range_file, file_server.RangeFile)
+    assert os.fstat(range_file.fileno()).st_size == len(data)
+
+
+def test_range_without_file_wrapper(client):
+    test_client, data = client
+
+    response = test_client.get("/files/video.mp4", headers={"Range": "bytes=-10"})
+
+    assert response.status_code == 206
+    assert response.data == data[-10:]
+    assert not RecordingFileWrapper.wrapped
+
+
+def test_conditional_requests(client):
+    test_client, data = client
+
+    full = test_client.get("/files/video.mp4")
+    cached = test_client.get(
+        "/files/video.mp4", headers={"If-None-Match": full.headers["ETag"]}
+    )
+
+    assert full.data == data
+    assert full.headers["Accept-Ranges"] == "bytes"
+    assert cached.status_code == 304
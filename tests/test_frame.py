@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src.schemas.frame import decode_frame, encode_frame
+from src.schemas.output import DistributedRetrievalOutput, FeedOutput, VideoAttributes
+
+
+def video(path, n):
+    return VideoAttributes(
+        video_path=path,
+        video_embedding=np.arange(n, dtype=np.float32) + n,
+        uri="http://node:19530",
+        distance=0.5,
+    )
+
+
+def test_round_trip():
+    output = DistributedRetrievalOutput(
+        videos=[video("a.mp4", 3), video("b.mp4", 5)], timed_out_shards=["x"]
+    )
+
+    decoded = DistributedRetrievalOutput.model_validate(
+        decode_frame(encode_frame(output))
+    )
+
+    assert [v.video_path for v in decoded.videos] == ["a.mp4", "b.mp4"]
+    assert decoded.timed_out_shards == ["x"]
+    for original, restored in zip(output.videos, decoded.videos):
+        np.testing.assert_array_equal(
+            restored.video_embedding, original.video_embedding
+        )
+        assert restored.video_embedding.dtype == np.float32
+
+
+def test_vectors_are_views_of_the_frame():
+    frame = encode_frame(FeedOutput(videos=[video("a.mp4", 4), None]))
+
+    data = decode_frame(frame)
+
+    assert data["videos"][1] is None
+    assert data["videos"][0]["video_embedding"].base is not None
+    assert not data["videos"][0]["video_embedding"].flags.writeable
+
+
+def test_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        decode_frame(b'{"videos": []}')
@@ -0,0 +1,88 @@
+import pytest
+
+from benchmarks.bench_ingest import make_items, new_milvus
+from benchmarks.fake_twelvelabs import FakeTwelveLabs
+from src.ingest import EmbeddingIngestPipeline, IngestCheckpoint
+from src.model import MultimodalEmbeddingModel
+
+
+@pytest.fixture(scope="module")
+def milvus(tmp_path_factory):
+    return new_milvus(str(tmp_path_factory.mktemp("milvus")), "ingest")
+
+
+def test_pipeline_inserts_and_checkpoints(milvus, tmp_path):
+    items = make_items(str(tmp_path), 5)
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.txt"))
+    model = MultimodalEmbeddingModel(
+        client=FakeTwelveLabs(latency_sec=0.05, upload_sec=0, text_latency_sec=0)
+    )
+    pipeline = EmbeddingIngestPipeline(
+        model, milvus, checkpoint=checkpoint, max_in_flight=2, poll_interval=0.01
+    )
+
+    stats = pipeline.run(items)
+    again = pipeline.run(items)
+
+    assert (stats.completed, stats.failed) == (5, 0)
+    assert (again.submitted, again.skipped) == (0, 5)
+    assert len(IngestCheckpoint(checkpoint.path)) == 5
+
+
+def test_tasks_that_never_finish_time_out(milvus, tmp_path):
+    items = make_items(str(tmp_path), 3)
+    client = FakeTwelveLabs(latency_sec=3600, upload_sec=0, text_latency_sec=0)
+    pipeline = EmbeddingIngestPipeline(
+        MultimodalEmbeddingModel(client=client),
+        milvus,
+        poll_interval=0.01,
+        task_timeout_sec=0.1,
+    )
+
+    stats = pipeline.run(items)
+
+    assert (stats.submitted, stats.completed, stats.failed) == (3, 0, 3)
+
+
+def test_unreadable_status_times_out(milvus, tmp_path, monkeypatch):
+    items = make_items(str(tmp_path), 2)
+    client = FakeTwelveLabs(latency_sec=0, upload_sec=0, text_latency_sec=0)
+
+    def status(task_id):
+        raise ConnectionError("status unavailable")
+
+    monkeypatch.setattr(client.embed.task, "status", status)
+    pipeline = EmbeddingIngestPipeline(
+        MultimodalEmbeddingModel(client=client),
+        milvus,
+        poll_interval=0.01,
+        task_timeout_sec=0.1,
+    )
+
+    stats = pipeline.run(items)
+
+    assert (stats.completed, stats.failed) == (0, 2)
+
+
+def test_buffered_videos_complete_when_flushed(milvus, tmp_path, monkeypatch):
+    items = make_items(str(tmp_path), 3)
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.txt"))
+    model = MultimodalEmbeddingModel(
+        client=FakeTwelveLabs(latency_sec=0, upload_sec=0, text_latency_sec=0)
+    )
+
+    with milvus.buffered_writer(max_rows=10_000, max_age_sec=None) as write_buffer:
+        pipeline = EmbeddingIngestPipeline(
+            model,
+            milvus,
+            checkpoint=checkpoint,
+            poll_interval=0.01,
+            write_buffer=write_buffer,
+        )
+        # Rows still buffered when the run ends are not completed yet
+        with monkeypatch.context() as patch:
+            patch.setattr(write_buffer, "flush", lambda reason="manual": None)
+            stats = pipeline.run(items)
+        assert (stats.buffered, stats.completed, len(checkpoint)) == (3, 0, 0)
+
+    assert (stats.buffered, stats.completed, len(checkpoint)) == (3, 3, 3)
@@ -0,0 +1,78 @@
+import json
+import os
+
+from src.utils import media_probe as media_probe_module
+from src.utils.media_probe import MediaInfo, MediaProbe, ProbeError
+
+
+def fake_probe(calls):
+    def probe_media(source):
+        calls.append(source)
+        if source.endswith(".bad"):
+            raise ProbeError("invalid data")
+        return MediaInfo(12.5, 1280, 720, 30.0, 375, "h264", "aac", "mp4")
+
+    return probe_media
+
+
+def make_files(tmp_path, names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(b"video")
+        paths.append(str(path))
+    return paths
+
+
+def test_index_is_saved_once_per_interval(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(media_probe_module, "probe_media", fake_probe(calls))
+    probe = MediaProbe(str(tmp_path / "probe.json"), save_interval_sec=3600)
+    paths = make_files(tmp_path, ["a.mp4", "b.mp4", "c.bad"])
+
+    assert probe.get(paths[0]).duration == 12.5
+    assert probe.get(paths[2]) is None
+    probe.get(paths[1])
+    assert not os.path.exists(probe.index_path)
+
+    probe.flush_index()
+    with open(probe.index_path) as f:
+        assert len(json.load(f)) == 3
+
+    reloaded = MediaProbe(probe.index_path)
+    assert reloaded.get(paths[0]).frame_count == 375
+    assert reloaded.get(paths[2]) is None  # unreadable files are remembered
+    assert (reloaded.hits, reloaded.misses) == (2, 0)
+    assert len(calls) == 3
+
+
+def test_changed_file_is_probed_again(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(media_probe_module, "probe_media", fake_probe(calls))
+    probe = MediaProbe(str(tmp_path / "probe.json"), save_interval_sec=0)
+    (path,) = make_files(tmp_path, ["a.mp4"])
+
+    probe.get(path)
+    with open(path, "ab") as f:
+        f.write(b"more")
+    probe.get(path)
+    probe.get(path)
+
+    assert calls == [path, path]
+    assert os.path.exists(probe.index_path)  # saved on every miss with interval 0
+
+
+def test_deleted_files_are_dropped_on_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_probe_module, "probe_media", fake_probe([]))
+    probe = MediaProbe(str(tmp_path / "probe.json"), save_interval_sec=0)
+    kept, deleted = make_files(tmp_path, ["kept.mp4", "deleted.mp4"])
+    probe.get(kept)
+    probe.get(deleted)
+    os.remove(deleted)
+
+    reloaded = MediaProbe(probe.index_path)
+    assert reloaded.get(kept) is not None
+    reloaded.flush_index()
+
+    with open(probe.index_path) as f:
+        assert list(json.load(f)) == [os.path.abspath(kept)]
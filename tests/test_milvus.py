@@ -0,0 +1,180 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.milvus import (
+    MilvusDatabase,
+    MilvusSearchBatcher,
+    MilvusWriteBuffer,
+    _batch_key,
+)
+
+
+class FakeMilvus:
+    """Records the batches it is asked to search; hits echo the vectors."""
+
+    def __init__(self, delay_sec=0.0, error=None):
+        self.delay_sec = delay_sec
+        self.error = error
+        self.batches = []
+
+    def retrieve_similarity_batch(
+        self, collection_name, vectors, limit, output_fields, search_params, **kwargs
+    ):
+        self.batches.append((list(vectors), kwargs))
+        time.sleep(self.delay_sec)
+        if self.error:
+            raise self.error
+        return [[{"id": vector}] for vector in vectors]
+
+
+def test_batch_key_normalizes_arguments():
+    kwargs = {"filter": 'category=="a"'}
+    key = _batch_key("videos", 10, ["video"], {"ef": 64}, kwargs)
+    assert key == _batch_key(
+        "videos", np.int64(10), ["video"], {"ef": np.int64(64)}, kwargs
+    )
+    assert key != _batch_key("videos", 10, ["video"], {"ef": 64}, {})
+    assert _batch_key("videos", 10, None, None, {"partition_names": ["video"]}) == (
+        _batch_key("videos", 10, None, {}, {"partition_names": ("video",)})
+    )
+    assert _batch_key("videos", 10, None, None, {"anns_field": "v"}) is None
+
+
+def test_lone_search_is_sent_right_away():
+    milvus = FakeMilvus()
+    batcher = MilvusSearchBatcher(milvus, window_sec=10)
+
+    start = time.perf_counter()
+    assert batcher.search("videos", 1) == [{"id": 1}]
+    assert time.perf_counter() - start < 1
+    assert batcher.search("videos", 2, anns_field="v") == [{"id": 2}]
+    assert batcher.total_searches == 1  # the unbatchable search went directly
+
+
+def test_concurrent_searches_share_a_batch():
+    milvus = FakeMilvus(delay_sec=0.1)
+    batcher = MilvusSearchBatcher(milvus, window_sec=0.5, max_batch=3)
+    results = {}
+
+    def search(vector, **kwargs):
+        results[vector] = batcher.search("videos", vector, **kwargs)
+
+    # The first search runs alone and keeps the batcher busy while the others
+    # arrive: three with the same filter fill one batch, one has its own
+    threads = [threading.Thread(target=search, args=(0,))]
+    threads[0].start()
+    time.sleep(0.02)
+    for vector in [1, 2, 3]:
+        threads.append(threading.Thread(target=search, args=(vector,)))
+    threads.append(
+        threading.Thread(target=search, args=(4,), kwargs={"filter": 'category=="a"'})
+    )
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {v: [{"id": v}] for v in range(5)}
+    assert sorted(sorted(vectors) for vectors, _ in milvus.batches) == [
+        [0],
+        [1, 2, 3],
+        [4],
+    ]
+    assert (batcher.total_searches, batcher.total_batches) == (5, 3)
+
+
+def test_errors_reach_every_caller():
+    batcher = MilvusSearchBatcher(FakeMilvus(error=RuntimeError("down")))
+    with pytest.raises(RuntimeError, match="down"):
+        batcher.search("videos", 1)
+
+
+class FakeInsertMilvus:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.inserts = []
+        self.sealed = []
+        self.milvus_client = self
+
+    def insert(self, collection_name, rows):
+        if collection_name == self.fail_on:
+            raise ConnectionError("insert failed")
+        self.inserts.append((collection_name, len(rows)))
+
+    def flush(self, collection_name):
+        self.sealed.append(collection_name)
+
+
+def test_write_buffer_flushes_on_rows_and_bytes():
+    milvus = FakeInsertMilvus()
+    flushed_keys = []
+    buffer = MilvusWriteBuffer(milvus, max_rows=3, max_bytes=10_000, max_age_sec=None)
+    buffer.add_flush_callback(flushed_keys.extend)
+
+    buffer.add("videos", [{"video": "a"}, {"video": "a"}], key="a")
+    assert milvus.inserts == []
+    buffer.add_rows({"videos": {"video": "b"}, "texts": {"text": "b"}}, key="b")
+    assert sorted(milvus.inserts) == [("texts", 1), ("videos", 3)]
+    assert buffer.flushes[-1].reason == "rows"
+    assert flushed_keys == ["a", "b"]
+
+    buffer.add("videos", {"embeddings_float": np.zeros(4096, np.float32)}, key="c")
+    assert buffer.flushes[-1].reason == "bytes"
+    assert flushed_keys == ["a", "b", "c"]
+
+    buffer.add("videos", {"video": "d"})
+    buffer.close()
+    assert buffer.flushes[-1].reason == "close"
+    assert (buffer.total_rows, buffer.total_flushes) == (6, 3)
+    assert sorted(milvus.sealed) == ["texts", "videos"]
+
+
+def test_write_buffer_flushes_by_age():
+    milvus = FakeInsertMilvus()
+    with MilvusWriteBuffer(milvus, max_age_sec=0.1) as buffer:
+        buffer.add("videos", {"video": "a"})
+        deadline = time.monotonic() + 2
+        while not milvus.inserts and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert milvus.inserts == [("videos", 1)]
+        assert buffer.flushes[-1].reason == "age"
+
+
+def test_failed_flush_keeps_only_the_rows_not_inserted():
+    milvus = FakeInsertMilvus(fail_on="texts")
+    buffer = MilvusWriteBuffer(milvus, max_age_sec=None)
+    buffer.add_rows({"videos": [{"video": "a"}], "texts": [{"text": "a"}]}, key="a")
+
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+    milvus.fail_on = None
+    buffer.flush()
+
+    assert milvus.inserts == [("videos", 1), ("texts", 1)]
+    buffer.close()
+
+
+def test_failed_index_lookup_is_not_cached():
+    class Client:
+        calls = 0
+
+        def describe_index(self, collection_name, field_name):
+            self.calls += 1
+            if self.calls == 1:
+                raise ConnectionError("describe failed")
+            return {"index_type": "HNSW", "metric_type": "L2"}
+
+    milvus = MilvusDatabase("http://unused")
+    milvus._milvus_client = Client()
+
+    with pytest.raises(ConnectionError):
+        milvus.index_spec("videos")
+    spec = milvus.index_spec("videos")
+
+    assert (spec.index_type, spec.higher_is_better) == ("HNSW", False)
+    assert spec.search_params == {"ef": 64}
+    assert milvus.index_spec("videos") is spec
+    assert milvus._milvus_client.calls == 2
@@ -0,0 +1,205 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.milvus import (
+    VIDEO_SCALAR_FIELDS,
+    MilvusDatabase,
+    insert_task_output_to_milvus,
+)
+from src.model import MultimodalEmbeddingModel, _video_search_scope
+from src.models.embedding_cache import EmbeddingCache
+from src.schemas.input import TaskInput
+
+
+class FakeMilvus:
+    def __init__(self, partitioned):
+        self.partitioned = partitioned
+
+    def partitioned_by_scope(self, collection_name):
+        return self.partitioned
+
+
+def test_video_search_scope():
+    assert _video_search_scope(FakeMilvus(True), "videos") == ("", ["video"])
+    assert _video_search_scope(FakeMilvus(False), "videos") == (
+        'embedding_scope=="video"',
+        None,
+    )
+    assert _video_search_scope(FakeMilvus(True), "videos", "news", "clip") == (
+        'category=="news"',
+        ["clip"],
+    )
+    assert _video_search_scope(FakeMilvus(False), "videos", "news") == (
+        'embedding_scope=="video" and category=="news"',
+        None,
+    )
+
+
+def test_similarity_returns_other_videos_only(search_db):
+    model, milvus, videos = search_db
+
+    output = model.retrieve_similarity_from_milvus(
+        TaskInput(video=videos[0]), milvus, "video_embedding", "text_embedding", 5
+    )
+
+    assert len(output.videos) == 5
+    assert len(set(output.videos)) == 5  # one video-scope row each, no clips
+    assert videos[0] not in output.videos
+    assert output.distances == sorted(output.distances, reverse=True)
+
+
+def test_similarity_category_filter(search_db):
+    model, milvus, videos = search_db
+
+    output = model.retrieve_similarity_from_milvus(
+        TaskInput(video=videos[0]),
+        milvus,
+        "video_embedding",
+        "text_embedding",
+        limit=20,
+        category="b",
+    )
+
+    assert set(output.videos) == set(videos[1::2])
+
+
+def test_batch_matches_single_searches(search_db):
+    model, milvus, videos = search_db
+    inputs = [TaskInput(video=video) for video in videos[:3]]
+    inputs.append(TaskInput(video="missing.mp4"))
+
+    batch = model.retrieve_similarity_batch(inputs, milvus, "video_embedding", 4)
+
+    for input_, output in zip(inputs[:3], batch):
+        single = model.retrieve_similarity_from_milvus(
+            input_, milvus, "video_embedding", "text_embedding", 4
+        )
+        assert output.videos == single.videos
+    assert batch[3].videos == []
+
+
+def test_batch_with_reingested_seeds(fake_client, tmp_path):
+    milvus = MilvusDatabase(str(tmp_path / "reingest.db"), search_batch_window_ms=0)
+    milvus.create_collection("video_embedding", scalar_fields=VIDEO_SCALAR_FIELDS)
+    model = MultimodalEmbeddingModel(client=fake_client)
+    videos = []
+    for i in range(4):
+        path = str(tmp_path / f"video_{i}.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(1024))
+        output = model.generate_embedding(TaskInput(video=path))
+        insert_task_output_to_milvus(milvus, output)
+        if i == 0:  # re-ingested: a second video-scope row
+            insert_task_output_to_milvus(milvus, output)
+        videos.append(path)
+    milvus.milvus_client.flush("video_embedding")
+
+    batch = model.retrieve_similarity_batch(
+        [TaskInput(video=video) for video in videos[:3]], milvus, "video_embedding"
+    )
+
+    for video, output in zip(videos[:3], batch):
+        assert output.videos
+        assert video not in output.videos
+
+
+def test_seed_vector_is_cached(search_db, monkeypatch):
+    model, milvus, videos = search_db
+    model.seed_vector_cache.clear()
+    queries = []
+    query_by_metadata = milvus.query_by_metadata
+
+    def spy(*args, **kwargs):
+        queries.append(kwargs)
+        return query_by_metadata(*args, **kwargs)
+
+    monkeypatch.setattr(milvus, "query_by_metadata", spy)
+    for _ in range(2):
+        output = model.retrieve_similarity_from_milvus(
+            TaskInput(video=videos[1]), milvus, "video_embedding", "text_embedding", 3
+        )
+        assert len(output.videos) == 3
+    assert len(queries) == 1
+
+    with pytest.raises(ValueError):
+        model.retrieve_similarity_from_milvus(
+            TaskInput(video="missing.mp4"), milvus, "video_embedding", "text_embedding"
+        )
+
+
+def test_clip_search_returns_segments(search_db):
+    model, milvus, videos = search_db
+
+    output = model.retrieve_clips_from_milvus(
+        TaskInput(video=videos[0]), milvus, "video_embedding", limit=4
+    )
+
+    assert len(output.videos) == 4
+    assert videos[0] not in output.videos
+    for segments, distance in zip(output.segments, output.distances):
+        assert 1 <= len(segments) <= 3
+        assert segments[0].distance == pytest.approx(distance)
+        assert all(s.end_offset_sec - s.start_offset_sec == 6.0 for s in segments)
+
+
+def test_embed_text_is_float32_with_and_without_cache(fake_client, tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    model = MultimodalEmbeddingModel(client=fake_client, embedding_cache=cache)
+
+    new = model._embed_text("a cat on a skateboard")
+    cached = model._embed_text("a cat on a skateboard")
+    uncached = MultimodalEmbeddingModel(client=fake_client)._embed_text(
+        "a cat on a skateboard"
+    )
+
+    for embedding in (new, cached, uncached):
+        assert isinstance(embedding, np.ndarray)
+        assert embedding.dtype == np.float32
+    np.testing.assert_array_equal(new, cached)
+    np.testing.assert_array_equal(new, uncached)
+    assert cache.hits == 1 and cache.misses == 1
+    cache.close()
+
+
+def test_query_text_is_normalized_and_cached(search_db):
+    model, milvus, videos = search_db
+    model.text_query_cache.clear()
+
+    first = model.embed_query_text("  Video  3 ")
+    assert model.embed_query_text("video 3") is first
+    with pytest.raises(ValueError):
+        model.embed_query_text("   ")
+
+    output = model.retrieve_videos_by_text("video 3", milvus, "video_embedding", 4)
+    assert len(output.videos) == 4
+    assert output.distances == sorted(output.distances, reverse=True)
+    in_category = model.retrieve_videos_by_text(
+        "video 3", milvus, "video_embedding", 20, category="a"
+    )
+    assert set(in_category.videos) == set(videos[0::2])
+
+
+def test_hybrid_fuses_video_and_text_hits(search_db):
+    model, milvus, videos = search_db
+
+    output = model.retrieve_hybrid_from_milvus(
+        TaskInput(video=videos[0]), milvus, "video_embedding", "text_embedding", 5
+    )
+
+    assert len(output.videos) == 5
+    assert len(set(output.videos)) == 5
+    assert output.distances == sorted(output.distances, reverse=True)
+    for video_distance, text_distance in zip(
+        output.video_distances, output.text_distances
+    ):
+        assert video_distance is not None or text_distance is not None
+    with pytest.raises(ValueError):
+        model.retrieve_hybrid_from_milvus(
+            TaskInput(video=videos[0]),
+            milvus,
+            "video_embedding",
+            "text_embedding",
+            fusion="max",
+        )
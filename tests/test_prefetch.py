@@ -0,0 +1,55 @@
+import threading
+import time
+
+from src.fastapi import replica_cache as replica_cache_module
+from src.fastapi.prefetch import VideoPrefetcher
+from src.fastapi.replica_cache import VideoReplicaCache
+
+
+def fake_download(uri, filename, local_path):
+    with open(local_path, "wb") as f:
+        f.write(filename.encode())
+    return {"Content-Length": str(len(filename))}
+
+
+def test_prefetch_downloads_remote_videos(tmp_path):
+    prefetcher = VideoPrefetcher(max_workers=2, download=fake_download)
+    local = tmp_path / "local.mp4"
+    local.write_bytes(b"original")
+    paths = [str(tmp_path / f"{i}.mp4") for i in range(4)]
+
+    futures = prefetcher.prefetch(
+        [("http://node", str(local))] + [("http://node", p) for p in paths],
+        eager_top_n=5,
+        timeout_sec=5,
+    )
+
+    assert [f.result(timeout=0) for f in futures] == [str(local)] + paths
+    assert local.read_bytes() == b"original"
+    assert open(paths[2], "rb").read() == b"2.mp4"
+
+
+def test_slow_revalidation_does_not_block_other_videos(tmp_path, monkeypatch):
+    cache = VideoReplicaCache(
+        str(tmp_path / "index.json"), revalidate_after_sec=0, download=fake_download
+    )
+    slow = str(tmp_path / "slow.mp4")
+    cache.fetch("http://slow", slow)
+    release = threading.Event()
+
+    def file_headers(uri, filename):
+        release.wait(5)  # an unreachable node
+        return {"Content-Length": str(len(filename))}
+
+    monkeypatch.setattr(replica_cache_module, "file_headers", file_headers)
+    prefetcher = VideoPrefetcher(max_workers=1, download=fake_download, cache=cache)
+    blocked = threading.Thread(target=prefetcher.submit, args=("http://slow", slow))
+    blocked.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    future = prefetcher.submit("http://fast", str(tmp_path / "fast.mp4"))
+    assert future.result(timeout=1) == str(tmp_path / "fast.mp4")
+    assert time.monotonic() - start < 1
+    release.set()
+    blocked.join()
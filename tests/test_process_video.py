@@ -0,0 +1,26 @@
+from src.utils import process_video
+from src.utils.media_probe import MediaInfo, MediaProbe
+
+
+def test_local_videos_are_probed_through_the_index(tmp_path, monkeypatch):
+    probe = MediaProbe(str(tmp_path / "probe.json"))
+    monkeypatch.setattr(process_video, "media_probe", probe)
+    calls = []
+
+    def probe_media(source):
+        calls.append(source)
+        return MediaInfo(6.0, 1280, 720, 30.0, 180, "h264", "aac", "mov,mp4")
+
+    monkeypatch.setattr("src.utils.media_probe.probe_media", probe_media)
+    monkeypatch.setattr(process_video, "probe_media", None)  # must not be used
+    source = tmp_path / "clip.mp4"
+    source.write_bytes(b"video")
+
+    for _ in range(2):
+        output = process_video.upscale_video_resolution(
+            str(source), output_dir_relative=str(tmp_path / "out")
+        )
+
+    assert open(output, "rb").read() == b"video"
+    assert calls == [str(source)]
+    assert (probe.hits, probe.misses) == (1, 1)
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+
+from src.fastapi import replica_cache as replica_cache_module
+from src.fastapi.replica_cache import VideoReplicaCache
+
+
+def fake_download(content=b"video"):
+    def download(uri, filename, local_path):
+        with open(local_path, "wb") as f:
+            f.write(content)
+        return {"Content-Length": str(len(content)), "ETag": '"v1"'}
+
+    return download
+
+
+def new_cache(tmp_path, **kwargs):
+    kwargs.setdefault("download", fake_download())
+    return VideoReplicaCache(str(tmp_path / "index.json"), **kwargs)
+
+
+def last_access(cache, path):
+    with open(cache.index_path) as f:
+        return json.load(f)[path]["last_access"]
+
+
+def test_fetch_then_hit(tmp_path):
+    cache = new_cache(tmp_path)
+    path = str(tmp_path / "a.mp4")
+
+    assert cache.fetch("http://node", path) == path
+    assert cache.fetch("http://node", path) == path
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert path in new_cache(tmp_path)  # the download saved the index
+
+
+def test_revalidation_does_not_hold_the_lock(tmp_path, monkeypatch):
+    cache = new_cache(tmp_path, revalidate_after_sec=0)
+    path = str(tmp_path / "a.mp4")
+    cache.fetch("http://node", path)
+    acquired = []
+
+    def use_cache():
+        if cache._lock.acquire(timeout=1):
+            acquired.append(True)
+            cache._lock.release()
+
+    def file_headers(uri, filename):
+        # Another request must be able to use the cache meanwhile
+        thread = threading.Thread(target=use_cache)
+        thread.start()
+        thread.join()
+        return {"Content-Length": "5", "ETag": '"v1"'}
+
+    monkeypatch.setattr(replica_cache_module, "file_headers", file_headers)
+    assert cache.get(path) == path
+    assert acquired == [True]
+
+
+def test_changed_origin_drops_the_replica(tmp_path, monkeypatch):
+    cache = new_cache(tmp_path, revalidate_after_sec=0, save_interval_sec=0)
+    path = str(tmp_path / "a.mp4")
+    cache.fetch("http://node", path)
+    monkeypatch.setattr(
+        replica_cache_module,
+        "file_headers",
+        lambda uri, filename: {"Content-Length": "5", "ETag": '"v2"'},
+    )
+
+    assert cache.get(path) is None
+    assert path not in cache
+    assert path not in new_cache(tmp_path)
+
+
+def test_hits_save_access_times_at_most_every_interval(tmp_path):
+    cache = new_cache(tmp_path, save_interval_sec=3600)
+    path = str(tmp_path / "a.mp4")
+    cache.fetch("http://node", path)
+    fetched_at = last_access(cache, path)
+
+    cache.get(path)
+    assert last_access(cache, path) == fetched_at
+    cache.flush_index()
+    assert last_access(cache, path) > fetched_at
+
+    cache.save_interval_sec = 0
+    cache.get(path)
+    assert last_access(cache, path) == cache._entries[path].last_access
+    assert not os.path.exists(path + ".part")
@@ -0,0 +1,195 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.retrieval import (
+    ShardFanout,
+    aggregate_clip_hits,
+    fuse_rankings,
+    merge_top_k,
+    parse_replicas,
+)
+from src.schemas.output import RetrievalOutput
+
+
+def test_aggregate_clip_hits_max_mean_top_m():
+    videos = ["a", "b", "a", "b", "a", "c"]
+    distances = [0.9, 0.8, 0.1, 0.7, 0.2, 0.5]
+
+    by_max = aggregate_clip_hits(videos, distances, "max")
+    by_mean = aggregate_clip_hits(videos, distances, "mean")
+    by_top_2 = aggregate_clip_hits(videos, distances, "top_m", top_m=2)
+
+    assert [(v, round(s, 6)) for v, s, _ in by_max] == [
+        ("a", 0.9),
+        ("b", 0.8),
+        ("c", 0.5),
+    ]
+    assert [(v, round(s, 6)) for v, s, _ in by_mean] == [
+        ("b", 0.75),
+        ("c", 0.5),
+        ("a", 0.4),
+    ]
+    assert [(v, round(s, 6)) for v, s, _ in by_top_2] == [
+        ("b", 0.75),
+        ("a", 0.55),
+        ("c", 0.5),
+    ]
+    # Hit indices of each video, best clip first
+    assert list(by_max[0][2]) == [0, 4, 2]
+
+
+def test_aggregate_clip_hits_lower_is_better():
+    ranked = aggregate_clip_hits(
+        ["a", "b", "a"], [0.3, 0.1, 0.2], "max", higher_is_better=False
+    )
+    assert [(v, s) for v, s, _ in ranked] == [("b", 0.1), ("a", 0.2)]
+    assert list(ranked[1][2]) == [2, 0]
+
+
+def test_aggregate_clip_hits_edge_cases():
+    assert aggregate_clip_hits([], [], "mean") == []
+    with pytest.raises(ValueError):
+        aggregate_clip_hits(["a"], [np.float32(1.0)], "median")
+
+
+def test_fuse_rankings_rrf():
+    video = [("a", 0.9), ("b", 0.8), ("c", 0.7)]
+    text = [("c", 0.6), ("a", 0.5)]
+
+    fused = fuse_rankings([video, text], "rrf", rrf_k=0)
+
+    assert [v for v, _ in fused] == ["a", "c", "b"]
+    assert fused[0][1] == pytest.approx(1 / 1 + 1 / 2)
+    assert fused[1][1] == pytest.approx(1 / 3 + 1 / 1)
+    weighted = fuse_rankings([video, text], "rrf", weights=[1.0, 0.0], rrf_k=0)
+    assert [v for v, _ in weighted] == ["a", "b", "c"]
+
+
+def test_fuse_rankings_weighted():
+    video = [("a", 0.1), ("b", 0.3), ("c", 0.5)]  # distances, lower is better
+    text = [("b", 2.0)]
+
+    fused = dict(fuse_rankings([video, text], "weighted", higher_is_better=False))
+
+    assert fused["a"] == pytest.approx(1.0)
+    assert fused["b"] == pytest.approx(0.5 + 1.0)  # a single hit normalizes to 1
+    assert fused["c"] == pytest.approx(0.0)
+    assert fuse_rankings([[], []]) == []
+    with pytest.raises(ValueError):
+        fuse_rankings([video], "max")
+
+
+def shard_output(uri, hits):
+    return RetrievalOutput(
+        milvus_uri=uri,
+        videos=[video for video, _ in hits],
+        distances=[distance for _, distance in hits],
+        video_embeddings=[np.full(2, distance, np.float32) for _, distance in hits],
+    )
+
+
+def test_merge_top_k_across_shards():
+    outputs = [
+        shard_output("http://a", [("a1", 0.9), ("dup", 0.5), ("a2", 0.3)]),
+        # Not sorted by the shard: the merge must not rely on its order
+        shard_output("http://b", [("b2", 0.4), ("b1", 0.8), ("dup", 0.7)]),
+        shard_output("http://c", []),
+    ]
+
+    top = merge_top_k(outputs, 4)
+
+    assert [(r.video, r.distance) for r in top] == [
+        ("a1", 0.9),
+        ("b1", 0.8),
+        ("dup", 0.7),  # best score of the duplicate wins
+        ("b2", 0.4),
+    ]
+    assert top[2].milvus_uri == "http://b"
+    np.testing.assert_array_equal(top[2].embedding, np.full(2, 0.7, np.float32))
+    assert len(merge_top_k(outputs, 10)) == 5
+
+
+def test_merge_top_k_lower_is_better():
+    outputs = [
+        shard_output("http://a", [("a1", 0.1), ("a2", 0.6)]),
+        shard_output("http://b", [("b1", 0.2), ("a1", 0.05)]),
+    ]
+
+    top = merge_top_k(outputs, 2, higher_is_better=False)
+
+    assert [(r.video, r.distance, r.milvus_uri) for r in top] == [
+        ("a1", 0.05, "http://b"),
+        ("b1", 0.2, "http://b"),
+    ]
+
+
+def shard(uri, delay_sec=0.0, error=None):
+    return SimpleNamespace(uri=uri, delay_sec=delay_sec, error=error)
+
+
+def call(instance):
+    time.sleep(instance.delay_sec)
+    if instance.error:
+        raise instance.error
+    return instance.uri
+
+
+def test_fanout_reports_timed_out_shards():
+    fanout = ShardFanout([shard("a"), shard("b", delay_sec=1.0)], timeout_sec=0.1)
+
+    start = time.monotonic()
+    result = fanout.run(call)
+
+    assert time.monotonic() - start < 0.5
+    assert {uri: value for uri, (_, value) in result.results.items()} == {"a": "a"}
+    assert result.timed_out == ["b"]
+    fanout.shutdown()
+
+
+def test_fanout_fails_over_to_a_replica():
+    down = ConnectionError("down")
+    fanout = ShardFanout(
+        [shard("a", error=down), shard("b", error=down)],
+        replicas={"a": [shard("a-replica")]},
+        timeout_sec=1.0,
+    )
+
+    result = fanout.run(call)
+
+    instance, value = result.results["a"]
+    assert (instance.uri, value) == ("a-replica", "a-replica")
+    assert list(result.failed) == ["b"]
+    assert "down" in result.failed["b"]
+    assert result.timed_out == []
+    fanout.shutdown()
+
+
+def test_fanout_hedges_a_slow_shard():
+    primary, replica = shard("a"), shard("a-replica")
+    fanout = ShardFanout(
+        [primary], replicas={"a": [replica]}, timeout_sec=2.0, hedge_min_samples=5
+    )
+    for _ in range(5):
+        fanout.latencies.record("a", 0.01)
+    primary.delay_sec = 1.0
+
+    start = time.monotonic()
+    result = fanout.run(call)
+
+    assert time.monotonic() - start < 0.5
+    assert result.results["a"][1] == "a-replica"
+    assert result.hedged == ["a"]
+    fanout.shutdown()
+
+
+def test_parse_replicas():
+    assert parse_replicas("") == {}
+    assert parse_replicas(
+        "http://a:19530=http://b:19530|http://c:19530, http://d:19530=http://e:19530"
+    ) == {
+        "http://a:19530": ["http://b:19530", "http://c:19530"],
+        "http://d:19530": ["http://e:19530"],
+    }
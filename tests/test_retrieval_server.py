@@ -0,0 +1,111 @@
+import importlib
+import sys
+import types
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.fastapi.retrieval_client import RetrievalClient
+from src.milvus import MilvusDatabase
+from src.schemas.frame import FRAME_MEDIA_TYPE, decode_frame
+from src.schemas.output import DistributedRetrievalOutput, FeedOutput, VideoAttributes
+from src.schemas.vector import embedding_to_base64
+
+
+def fake_video(path):
+    return VideoAttributes(
+        video_path=path, video_embedding=np.ones(4, np.float32), uri="http://a"
+    )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    backend = types.ModuleType("src.distributed_backend")
+    backend.DB_URLs = ["http://a"]
+    # Never connected: the database client is created on first use
+    backend.milvus_instances = [MilvusDatabase("http://a")]
+    backend.replica_instances = {"http://a": [MilvusDatabase("http://b")]}
+    backend.init = lambda n: [fake_video("feed.mp4")] + [None] * (n - 1)
+    backend.calls = []
+
+    def retrieve(video_path, video_embedding, k, timeout_sec):
+        backend.calls.append((video_path, video_embedding, k))
+        return DistributedRetrievalOutput(videos=[fake_video("hit.mp4")])
+
+    def retrieve_clips(video_path, video_embedding, k, aggregation, timeout_sec):
+        raise ValueError(f"Unsupported aggregation {aggregation}")
+
+    backend.retrieve = retrieve
+    backend.retrieve_clips = retrieve_clips
+    monkeypatch.setitem(sys.modules, "src.distributed_backend", backend)
+    monkeypatch.delitem(sys.modules, "src.fastapi.server.retrieval_server", False)
+    retrieval_server = importlib.import_module("src.fastapi.server.retrieval_server")
+
+    with TestClient(retrieval_server.app) as test_client:
+        yield test_client, backend
+
+
+def test_service_batches_its_searches(client):
+    _, backend = client
+    assert MilvusDatabase("http://c").search_batcher is None
+    assert backend.milvus_instances[0].search_batcher is not None
+    assert backend.replica_instances["http://a"][0].search_batcher is not None
+
+
+def test_feed_json_and_binary(client):
+    test_client, _ = client
+
+    json_feed = FeedOutput.model_validate_json(test_client.get("/feed?n=3").content)
+    response = test_client.get("/feed?n=3", headers={"Accept": FRAME_MEDIA_TYPE})
+    binary_feed = FeedOutput.model_validate(decode_frame(response.content))
+
+    for feed in (json_feed, binary_feed):
+        assert feed.videos[0].video_path == "feed.mp4"
+        assert feed.videos[1:] == [None, None]
+
+
+def test_retrieve_passes_the_seed_embedding(client):
+    test_client, backend = client
+    embedding = np.arange(4, dtype=np.float32)
+    body = {
+        "video_path": "seed.mp4",
+        "video_embedding": embedding_to_base64(embedding),
+        "k": 7,
+    }
+
+    response = test_client.post("/retrieve", json=body)
+
+    assert response.status_code == 200
+    path, seed_embedding, k = backend.calls[0]
+    assert (path, k) == ("seed.mp4", 7)
+    np.testing.assert_array_equal(seed_embedding, embedding)
+
+
+@pytest.mark.parametrize("k", [0, -1, 10**6])
+def test_out_of_range_k_is_rejected(client, k):
+    test_client, backend = client
+    for path, body in [
+        ("/retrieve", {"video_path": "seed.mp4", "k": k}),
+        ("/retrieve/batch", {"seeds": [], "k": k}),
+        ("/search/text", {"query": "cats", "k": k}),
+        ("/retrieve/clips", {"video_path": "seed.mp4", "k": k}),
+    ]:
+        assert test_client.post(path, json=body).status_code == 422
+    assert test_client.get(f"/feed?n={k}").status_code == 422
+    assert backend.calls == []
+
+
+def test_value_error_is_a_bad_request(client):
+    test_client, _ = client
+    response = test_client.post(
+        "/retrieve/clips", json={"video_path": "seed.mp4", "aggregation": "median"}
+    )
+    assert response.status_code == 400
+    assert "median" in response.json()["detail"]
+
+
+def test_client_reports_an_unreachable_service():
+    client = RetrievalClient("http://127.0.0.1:9")
+    with pytest.raises(ConnectionError, match="retrieval_server"):
+        client.wait_until_ready(timeout_sec=0.2, interval_sec=0.1)
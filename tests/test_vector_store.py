@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from src.vector_store import SessionVectorStore
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32)
+
+
+def test_grows_and_keeps_vectors(vectors):
+    store = SessionVectorStore(capacity=4)
+    for i, vector in enumerate(vectors):
+        assert store.add(f"v{i}.mp4", vector, uri=f"http://{i % 3}") == i
+    assert store.add("v0.mp4", vectors[1]) == 0  # known paths keep their vector
+
+    assert len(store) == 50
+    np.testing.assert_array_equal(store.get("v7.mp4"), vectors[7])
+    assert store.uri("v7.mp4") == "http://1"
+    with pytest.raises(ValueError):
+        store.get("v7.mp4")[0] = 1.0
+
+
+def test_top_k_matches_brute_force(vectors):
+    store = SessionVectorStore(capacity=4)
+    for i, vector in enumerate(vectors):
+        store.add(f"v{i}.mp4", vector)
+    store.mark_seen("v1.mp4")
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    cosine = normalized @ normalized[0]
+
+    top = store.top_k("v0.mp4", 5, exclude=["v2.mp4"], exclude_seen=True)
+
+    expected = [i for i in np.argsort(-cosine) if i not in (0, 1, 2)][:5]
+    assert [path for path, _ in top] == [f"v{i}.mp4" for i in expected]
+    for (_, score), i in zip(top, expected):
+        assert score == pytest.approx(cosine[i], abs=1e-5)
+    assert len(store.top_k(vectors[3], 100)) == 50
+    assert SessionVectorStore().top_k(vectors[0], 3) == []
+
+
+def test_duplicates_and_zero_vectors(vectors):
+    store = SessionVectorStore()
+    store.add("zero.mp4", np.zeros(8, np.float32))
+    store.add("a.mp4", vectors[0])
+
+    assert store.is_duplicate(vectors[0] * 2)
+    assert not store.is_duplicate(vectors[1])
+    assert store.similarities(vectors[0])[0] == -1.0